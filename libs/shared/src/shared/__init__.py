@@ -1,4 +1,5 @@
 from .schemas import ErrorResponse
-from .jwks import JWKSClient
+from .jwks import AsyncJWKSClient, JWKSClient
+from .auth import BearerAuthenticator
 
-__all__ = ["ErrorResponse", "JWKSClient"]
+__all__ = ["ErrorResponse", "AsyncJWKSClient", "JWKSClient", "BearerAuthenticator"]
@@ -0,0 +1,165 @@
+"""Bearer-token authentication shared by the downstream services.
+
+``BearerAuthenticator`` is the single JWT validation pipeline used by the
+wallet and payments services: parse the unverified header, look up the
+signing key through ``AsyncJWKSClient``, verify signature/audience/issuer with
+python-jose, then apply the service's accepted scopes and numeric-subject
+rules. Verified claims are cached in a ``VerifiedTokenCache`` so repeat
+tokens skip the RSA work, and each stage is timed in the
+``jwt_auth_stage_seconds`` histogram.
+
+Usage in a service::
+
+    authenticator = BearerAuthenticator(
+        service="wallet",
+        jwks_url=settings.jwks_url,
+        audience=settings.jwt_audience,
+        issuer=settings.jwt_issuer,
+        accepted_scopes={"access", "wallet_access"},
+    )
+
+    async def get_current_user_id(request: Request) -> int:
+        return await authenticator(request)
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from fastapi import HTTPException, Request, status
+from jose import JWTError, jwt
+from prometheus_client import Histogram
+
+from .jwks import AsyncJWKSClient
+from .token_cache import VerifiedTokenCache
+
+logger = logging.getLogger(__name__)
+
+auth_stage_seconds = Histogram(
+    "jwt_auth_stage_seconds",
+    "Time spent in each stage of bearer-token authentication",
+    ["service", "stage"],
+    buckets=(0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25, 1.0),
+)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+class BearerAuthenticator:
+    """Async FastAPI dependency that resolves the caller's numeric user id."""
+
+    def __init__(
+        self,
+        *,
+        service: str,
+        jwks_url: str,
+        audience: str,
+        issuer: str,
+        accepted_scopes: Iterable[str] = ("access",),
+        jwks_cache_ttl: float = 300,
+        token_cache_max_entries: int = 10_000,
+        jwks_client: AsyncJWKSClient | None = None,
+    ) -> None:
+        self.service = service
+        self.audience = audience
+        self.issuer = issuer
+        self.accepted_scopes = frozenset(accepted_scopes)
+        self.jwks_client = jwks_client or AsyncJWKSClient(jwks_url, cache_ttl=jwks_cache_ttl)
+        self.token_cache = VerifiedTokenCache(
+            service,
+            max_entries=token_cache_max_entries,
+            key_version=lambda: self.jwks_client.key_set_version,
+        )
+
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            auth_stage_seconds.labels(service=self.service, stage=stage).observe(time.perf_counter() - start)
+
+    async def verify(self, token: str) -> dict[str, Any]:
+        """Return verified claims for ``token``, using the cache when possible."""
+        with self._stage("cache_lookup"):
+            claims = self.token_cache.get(token)
+        if claims is not None:
+            return claims
+
+        with self._stage("header_parse"):
+            try:
+                header = jwt.get_unverified_header(token)
+            except JWTError as exc:
+                logger.warning("%s.auth.invalid_header", self.service, extra={"error": str(exc)})
+                msg = "Invalid token"
+                raise _unauthorized(msg) from exc
+        kid = header.get("kid")
+        if not kid:
+            msg = "Token missing key identifier"
+            raise _unauthorized(msg)
+
+        with self._stage("key_lookup"):
+            try:
+                public_key = await self.jwks_client.get_key(kid)
+            except KeyError as exc:
+                logger.warning("%s.auth.unknown_kid", self.service, extra={"kid": kid})
+                msg = "Unknown signing key"
+                raise _unauthorized(msg) from exc
+            except Exception as exc:  # noqa: BLE001
+                logger.error("%s.auth.jwks_fetch_failed", self.service, extra={"error": str(exc)})
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Unable to validate token (JWKS fetch failed)",
+                ) from exc
+
+        with self._stage("signature_verify"):
+            try:
+                claims = jwt.decode(
+                    token,
+                    public_key,
+                    algorithms=["RS256"],
+                    audience=self.audience,
+                    issuer=self.issuer,
+                )
+            except JWTError as exc:
+                logger.warning("%s.auth.jwt_decode_failed", self.service, extra={"error": str(exc)})
+                msg = "Invalid token"
+                raise _unauthorized(msg) from exc
+
+        self.token_cache.put(token, claims)
+        return claims
+
+    def user_id_from_claims(self, claims: dict[str, Any]) -> int:
+        """Apply scope and subject rules to verified claims."""
+        scope = claims.get("scope")
+        if scope not in self.accepted_scopes:
+            logger.info("%s.auth.scope_rejected", self.service, extra={"scope": scope})
+            msg = "Invalid token scope"
+            raise _unauthorized(msg)
+
+        sub = claims.get("sub")
+        if sub is None:
+            msg = "Missing subject"
+            raise _unauthorized(msg)
+        if isinstance(sub, str) and sub.isdigit():
+            return int(sub)
+
+        # Future: support UUID or non-numeric subjects via separate dependency.
+        logger.info("%s.auth.unsupported_subject_format", self.service, extra={"subject": sub})
+        msg = "Unsupported subject format (expected numeric)"
+        raise _unauthorized(msg)
+
+    async def __call__(self, request: Request) -> int:
+        auth = request.headers.get("authorization")
+        if not auth or not auth.lower().startswith("bearer "):
+            msg = "Missing bearer token"
+            raise _unauthorized(msg)
+        token = auth.split(" ", 1)[1].strip()
+        claims = await self.verify(token)
+        return self.user_id_from_claims(claims)
@@ -1,23 +1,46 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import logging
 import threading
 import time
-from typing import Dict
+from collections.abc import Callable
+from typing import Any
 
 import httpx
-from jose import jwt
-from jose.exceptions import JWTError
+from jose import jwk
+from jose.backends.base import Key
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_jwks(data: dict[str, Any]) -> dict[str, Key]:
+    """Return parsed public key objects keyed by ``kid``."""
+    keys: dict[str, Key] = {}
+    for entry in data.get("keys", []):
+        kid = entry.get("kid")
+        if not kid:
+            continue
+        keys[kid] = jwk.construct(entry, algorithm=entry.get("alg", "RS256"))
+    if not keys:
+        msg = "JWKS endpoint returned no signing keys"
+        raise ValueError(msg)
+    return keys
 
 
 class JWKSClient:
-    """Fetch and cache JSON Web Key Sets for RSA signature verification."""
+    """Fetch and cache JSON Web Key Sets for RSA signature verification.
+
+    Blocking client kept for synchronous callers; request handlers should use
+    ``AsyncJWKSClient`` so a refresh never stalls the event loop.
+    """
 
     def __init__(self, jwks_url: str, cache_ttl: int = 300) -> None:
         self.jwks_url = jwks_url
         self.cache_ttl = cache_ttl
         self._lock = threading.Lock()
-        self._keys: Dict[str, str] = {}
+        self._keys: dict[str, str] = {}
         self._expires_at: float = 0.0
 
     def get_key(self, kid: str) -> str:
@@ -27,21 +50,158 @@ class JWKSClient:
                 self._refresh_keys()
             key = self._keys.get(kid)
         if not key:
-            raise KeyError(f"Signing key with kid={kid} not found in JWKS")
+            msg = f"Signing key with kid={kid} not found in JWKS"
+            raise KeyError(msg)
         return key
 
     def _refresh_keys(self) -> None:
         response = httpx.get(self.jwks_url, timeout=5.0)
         response.raise_for_status()
-        data = response.json()
-        keys: Dict[str, str] = {}
-        for jwk in data.get("keys", []):
-            kid = jwk.get("kid")
-            if not kid:
-                continue
-            pem = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(jwk))
-            keys[kid] = pem
-        if not keys:
-            raise ValueError("JWKS endpoint returned no signing keys")
-        self._keys = keys
+        keys = _parse_jwks(response.json())
+        self._keys = {kid: key.to_pem().decode("utf-8") for kid, key in keys.items()}
         self._expires_at = time.time() + self.cache_ttl
+
+
+class AsyncJWKSClient:
+    """Non-blocking JWKS cache with background refresh.
+
+    * Keys are refreshed in the background once ``refresh_ahead`` seconds
+      remain before expiry, and stale keys keep being served while a refresh
+      is running or failing (up to ``max_stale`` seconds past expiry).
+    * All concurrent misses share one in-flight fetch (singleflight).
+    * Unknown ``kid`` values are negatively cached for ``negative_ttl`` seconds
+      and a miss never refetches more often than ``min_refresh_interval``, so
+      forged key ids cannot hammer the identity service. A kid never seen
+      before may still force one refetch inside that interval (a key rotated
+      in right after the last fetch), limited separately to one per
+      ``unknown_kid_refresh_interval``, before it is cached as a miss.
+    * Parsed key objects are cached, so callers skip PEM parsing per request.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        cache_ttl: float = 300,
+        refresh_ahead: float = 60,
+        max_stale: float = 300,
+        negative_ttl: float = 60,
+        min_refresh_interval: float = 10,
+        unknown_kid_refresh_interval: float = 1,
+        timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.jwks_url = jwks_url
+        self.cache_ttl = cache_ttl
+        self.refresh_ahead = min(refresh_ahead, cache_ttl)
+        self.max_stale = max_stale
+        self.negative_ttl = negative_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.unknown_kid_refresh_interval = unknown_kid_refresh_interval
+        self.timeout = timeout
+        self._transport = transport
+        self._clock = clock
+        self._keys: dict[str, Key] = {}
+        self._fetched_at = float("-inf")
+        self._attempted_at = float("-inf")
+        self._forced_at = float("-inf")
+        self._expires_at = 0.0
+        self._unknown_kids: dict[str, float] = {}
+        self._fingerprint: frozenset[tuple[str, str]] = frozenset()
+        # Bumped whenever a refresh returns a different key set; caches of
+        # verified tokens compare against it to drop results from old keys.
+        self.key_set_version = 0
+        self._inflight: asyncio.Task[None] | None = None
+
+    async def get_key(self, kid: str) -> Key:
+        """Return the parsed public key for ``kid``.
+
+        Raises ``KeyError`` for a kid the identity service does not publish and
+        propagates fetch errors when no usable cached key set exists.
+        """
+        now = self._clock()
+        key = self._keys.get(kid)
+        if key is not None:
+            if now < self._expires_at - self.refresh_ahead:
+                return key
+            if now < self._expires_at + self.max_stale:
+                self._refresh_in_background()
+                return key
+            await self._refresh()
+            return self._lookup(kid)
+
+        negative_until = self._unknown_kids.get(kid)
+        if negative_until is not None:
+            if now < negative_until:
+                msg = f"Signing key with kid={kid} not found in JWKS"
+                raise KeyError(msg)
+            del self._unknown_kids[kid]
+        fetching = self._inflight is not None and not self._inflight.done()
+        if self._keys and not fetching and now - self._fetched_at < self.min_refresh_interval:
+            # An unseen kid may be a freshly rotated key: force one refetch,
+            # on its own rate limit, before caching it as a miss
+            if now - self._forced_at < self.unknown_kid_refresh_interval:
+                self._remember_unknown(kid, now)
+                msg = f"Signing key with kid={kid} not found in JWKS"
+                raise KeyError(msg)
+            self._forced_at = now
+        await self._refresh()
+        return self._lookup(kid)
+
+    def _lookup(self, kid: str) -> Key:
+        key = self._keys.get(kid)
+        if key is None:
+            self._remember_unknown(kid, self._clock())
+            msg = f"Signing key with kid={kid} not found in JWKS"
+            raise KeyError(msg)
+        return key
+
+    def _remember_unknown(self, kid: str, now: float) -> None:
+        if len(self._unknown_kids) >= 10_000:
+            self._unknown_kids = {k: v for k, v in self._unknown_kids.items() if v > now}
+            if len(self._unknown_kids) >= 10_000:
+                self._unknown_kids.clear()
+        self._unknown_kids[kid] = now + self.negative_ttl
+
+    def _start_fetch(self) -> asyncio.Task[None]:
+        if self._inflight is None or self._inflight.done():
+            self._attempted_at = self._clock()
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(_log_fetch_failure)
+        return self._inflight
+
+    async def _refresh(self) -> None:
+        # Shield so one cancelled caller does not abort the shared fetch
+        await asyncio.shield(self._start_fetch())
+
+    def _refresh_in_background(self) -> None:
+        # Back off between attempts so a failing identity service is not hammered
+        if self._clock() - self._attempted_at >= self.min_refresh_interval:
+            self._start_fetch()
+
+    async def _fetch(self) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout, transport=self._transport) as client:
+            response = await client.get(self.jwks_url)
+        response.raise_for_status()
+        keys = _parse_jwks(response.json())
+        fingerprint = frozenset(
+            (kid, json.dumps(key.to_dict(), sort_keys=True, default=str)) for kid, key in keys.items()
+        )
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self.key_set_version += 1
+        now = self._clock()
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + self.cache_ttl
+        # Keys that just appeared are no longer unknown
+        for kid in keys:
+            self._unknown_kids.pop(kid, None)
+
+
+def _log_fetch_failure(task: asyncio.Task[None]) -> None:
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("jwks.refresh_failed", extra={"error": str(exc)})
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from prometheus_client import Counter
+
+token_cache_requests_total = Counter(
+    "jwt_verified_token_cache_requests_total",
+    "Lookups in the verified JWT cache",
+    ["cache", "result"],
+)
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of already-verified JWT claims.
+
+    Clients reuse one access token for its whole lifetime, so re-running the
+    RS256 signature check on every request is repeated work. Entries are
+    keyed by a SHA-256 digest of the token (raw tokens are never retained),
+    live until the token's ``exp`` claim, and are all dropped when
+    ``key_version`` reports that the JWKS key set has changed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 10_000,
+        key_version: Callable[[], int] | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self._key_version = key_version or (lambda: 0)
+        self._version = self._key_version()
+        self._clock = clock
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def _check_version(self) -> None:
+        version = self._key_version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, token: str) -> dict[str, Any] | None:
+        """Return cached claims for ``token`` if it was verified and has not expired."""
+        self._check_version()
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            token_cache_requests_total.labels(cache=self.name, result="miss").inc()
+            return None
+        expires_at, claims = entry
+        if expires_at <= self._clock():
+            del self._entries[digest]
+            token_cache_requests_total.labels(cache=self.name, result="expired").inc()
+            return None
+        self._entries.move_to_end(digest)
+        token_cache_requests_total.labels(cache=self.name, result="hit").inc()
+        return claims
+
+    def put(self, token: str, claims: dict[str, Any]) -> None:
+        """Remember verified ``claims`` until the token's ``exp``.
+
+        Tokens without a numeric ``exp`` are not cached.
+        """
+        exp = claims.get("exp")
+        if not isinstance(exp, (int, float)) or exp <= self._clock():
+            return
+        self._check_version()
+        digest = self._digest(token)
+        self._entries[digest] = (float(exp), claims)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
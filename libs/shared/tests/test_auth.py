@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import base64
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwt
+from prometheus_client import REGISTRY
+from starlette.requests import Request
+
+from shared.auth import BearerAuthenticator
+from shared.jwks import AsyncJWKSClient
+
+AUDIENCE = "wallet-api"
+ISSUER = "identity"
+
+
+def _b64(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, byteorder="big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("utf-8")
+
+
+class Signer:
+    def __init__(self, kid: str = "k1") -> None:
+        self.kid = kid
+        self._key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.pem = self._key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        self.fetches = 0
+
+    def jwks(self, request: httpx.Request) -> httpx.Response:
+        self.fetches += 1
+        numbers = self._key.public_key().public_numbers()
+        key = {"kty": "RSA", "kid": self.kid, "alg": "RS256", "n": _b64(numbers.n), "e": _b64(numbers.e)}
+        return httpx.Response(200, json={"keys": [key]}, request=request)
+
+    def token(self, sub: str = "42", scope: str = "access", kid: str | None = None) -> str:
+        claims = {"sub": sub, "scope": scope, "aud": AUDIENCE, "iss": ISSUER, "exp": int(time.time()) + 300}
+        return jwt.encode(claims, self.pem, algorithm="RS256", headers={"kid": kid or self.kid})
+
+
+def _authenticator(signer: Signer, service: str, **kwargs) -> BearerAuthenticator:
+    jwks_client = AsyncJWKSClient("http://identity/jwks", transport=httpx.MockTransport(signer.jwks))
+    return BearerAuthenticator(
+        service=service,
+        jwks_url="http://identity/jwks",
+        audience=AUDIENCE,
+        issuer=ISSUER,
+        jwks_client=jwks_client,
+        **kwargs,
+    )
+
+
+def _request(authorization: str | None) -> Request:
+    headers = [] if authorization is None else [(b"authorization", authorization.encode("latin-1"))]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def _stage_count(service: str, stage: str) -> float:
+    return REGISTRY.get_sample_value("jwt_auth_stage_seconds_count", {"service": service, "stage": stage}) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_resolves_user_and_skips_verification_for_cached_tokens():
+    signer = Signer()
+    auth = _authenticator(signer, "test-cached")
+    token = signer.token()
+
+    assert await auth(_request(f"Bearer {token}")) == 42
+    assert await auth(_request(f"Bearer {token}")) == 42
+
+    assert _stage_count("test-cached", "cache_lookup") == 2
+    for stage in ("header_parse", "key_lookup", "signature_verify"):
+        assert _stage_count("test-cached", stage) == 1
+    assert signer.fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_accepted_scopes_are_configurable():
+    signer = Signer()
+    strict = _authenticator(signer, "test-scopes-strict")
+    relaxed = _authenticator(signer, "test-scopes-relaxed", accepted_scopes={"access", "wallet_access"})
+    token = signer.token(scope="wallet_access")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await strict(_request(f"Bearer {token}"))
+    assert exc_info.value.detail == "Invalid token scope"
+    assert await relaxed(_request(f"Bearer {token}")) == 42
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("authorization", "detail"),
+    [
+        (None, "Missing bearer token"),
+        ("Bearer not-a-jwt", "Invalid token"),
+        ("unknown-kid", "Unknown signing key"),
+        ("non-numeric-sub", "Unsupported subject format (expected numeric)"),
+    ],
+)
+async def test_rejects_invalid_credentials(authorization, detail):
+    signer = Signer()
+    auth = _authenticator(signer, "test-rejects")
+    if authorization == "unknown-kid":
+        authorization = f"Bearer {signer.token(kid='other')}"
+    elif authorization == "non-numeric-sub":
+        authorization = f"Bearer {signer.token(sub='alice')}"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await auth(_request(authorization))
+    assert exc_info.value.status_code == 401
+    assert exc_info.value.detail == detail
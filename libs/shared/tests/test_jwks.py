@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from shared.jwks import AsyncJWKSClient
+
+
+def _b64(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, byteorder="big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("utf-8")
+
+
+def _jwk(kid: str) -> dict[str, str]:
+    numbers = rsa.generate_private_key(public_exponent=65537, key_size=2048).public_key().public_numbers()
+    return {"kty": "RSA", "kid": kid, "use": "sig", "alg": "RS256", "n": _b64(numbers.n), "e": _b64(numbers.e)}
+
+
+class FakeJWKSServer:
+    def __init__(self, *kids: str) -> None:
+        self.keys = [_jwk(kid) for kid in kids]
+        self.calls = 0
+        self.fail = False
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.fail:
+            return httpx.Response(503, request=request)
+        return httpx.Response(200, json={"keys": self.keys}, request=request)
+
+    def client(self, clock: FakeClock, **kwargs) -> AsyncJWKSClient:
+        return AsyncJWKSClient(
+            "http://identity/jwks", transport=httpx.MockTransport(self.handler), clock=clock, **kwargs
+        )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_fetch(clock):
+    server = FakeJWKSServer("k1")
+    client = server.client(clock)
+
+    keys = await asyncio.gather(*(client.get_key("k1") for _ in range(25)))
+    assert server.calls == 1
+    assert all(key is keys[0] for key in keys)
+    assert keys[0].to_dict()["n"] == server.keys[0]["n"]
+
+
+@pytest.mark.asyncio
+async def test_unknown_kids_are_negatively_cached(clock):
+    server = FakeJWKSServer("k1")
+    client = server.client(clock, negative_ttl=60, min_refresh_interval=10)
+    await client.get_key("k1")
+
+    # A flood of unseen kids gets one forced refetch per unknown_kid_refresh_interval
+    for i in range(50):
+        with pytest.raises(KeyError):
+            await client.get_key(f"forged-{i}")
+    assert server.calls == 2
+
+    # Once the refresh interval passes a new kid triggers one refetch,
+    # but a kid already known to be missing stays cached until its TTL
+    clock.now += 11
+    server.keys.append(_jwk("k2"))
+    assert await client.get_key("k2") is not None
+    with pytest.raises(KeyError):
+        await client.get_key("forged-0")
+    assert server.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_rotated_key_is_fetched_inside_the_refresh_interval(clock):
+    server = FakeJWKSServer("k1")
+    client = server.client(clock, min_refresh_interval=10, unknown_kid_refresh_interval=1)
+    await client.get_key("k1")
+
+    # Rotated in right after the last fetch: one forced refetch finds it
+    clock.now += 0.5
+    server.keys.append(_jwk("k2"))
+    assert await client.get_key("k2") is not None
+    assert server.calls == 2
+
+    # The forced refetch is rate limited on its own
+    server.keys.append(_jwk("k3"))
+    with pytest.raises(KeyError):
+        await client.get_key("k3")
+    assert server.calls == 2
+    clock.now += 1
+    with pytest.raises(KeyError):
+        await client.get_key("k3")  # still negatively cached
+    assert server.calls == 2
+    server.keys.append(_jwk("k4"))
+    assert await client.get_key("k4") is not None
+    assert server.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_stale_keys_served_while_refreshing_in_background(clock):
+    server = FakeJWKSServer("k1")
+    client = server.client(clock, cache_ttl=300, refresh_ahead=60, max_stale=300)
+    first = await client.get_key("k1")
+
+    clock.now += 250  # inside the refresh-ahead window
+    server.fail = True
+    assert await client.get_key("k1") is first
+    await asyncio.sleep(0.05)
+    assert server.calls == 2  # background refresh attempted (and failed)
+
+    # Retries are spaced by min_refresh_interval
+    assert await client.get_key("k1") is first
+    await asyncio.sleep(0.05)
+    assert server.calls == 2
+
+    clock.now += 100  # past expiry but within max_stale: still served
+    server.fail = False
+    assert await client.get_key("k1") is first
+    await asyncio.sleep(0.05)
+    assert server.calls == 3
+    refreshed = await client.get_key("k1")
+    assert refreshed is not first
+
+
+@pytest.mark.asyncio
+async def test_fetch_errors_propagate_without_cached_keys(clock):
+    server = FakeJWKSServer("k1")
+    server.fail = True
+    client = server.client(clock)
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.get_key("k1")
+
+
+@pytest.mark.asyncio
+async def test_key_set_version_tracks_key_changes(clock):
+    server = FakeJWKSServer("k1")
+    client = server.client(clock, min_refresh_interval=0)
+    await client.get_key("k1")
+    assert client.key_set_version == 1
+
+    # Refetching an unchanged key set keeps the version
+    with pytest.raises(KeyError):
+        await client.get_key("missing")
+    assert server.calls == 2
+    assert client.key_set_version == 1
+
+    server.keys.append(_jwk("k2"))
+    await client.get_key("k2")
+    assert client.key_set_version == 2
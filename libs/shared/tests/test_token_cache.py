@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from shared.token_cache import VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cached_claims_expire_with_token():
+    clock = FakeClock()
+    cache = VerifiedTokenCache("test", clock=clock)
+    claims = {"sub": "42", "scope": "access", "exp": clock.now + 900}
+
+    assert cache.get("token-a") is None
+    cache.put("token-a", claims)
+    assert cache.get("token-a") == claims
+    assert cache.get("token-b") is None
+
+    clock.now += 901
+    assert cache.get("token-a") is None
+    assert len(cache) == 0
+
+
+def test_tokens_without_future_exp_are_not_cached():
+    clock = FakeClock()
+    cache = VerifiedTokenCache("test", clock=clock)
+    cache.put("no-exp", {"sub": "1"})
+    cache.put("expired", {"sub": "1", "exp": clock.now - 1})
+    assert len(cache) == 0
+
+
+def test_cache_is_bounded_and_keyed_by_digest():
+    clock = FakeClock()
+    cache = VerifiedTokenCache("test", max_entries=3, clock=clock)
+    for i in range(5):
+        cache.put(f"token-{i}", {"sub": str(i), "exp": clock.now + 60})
+    assert len(cache) == 3
+    assert cache.get("token-0") is None
+    assert cache.get("token-4")["sub"] == "4"
+    assert all(isinstance(key, bytes) and len(key) == 32 for key in cache._entries)
+
+
+def test_key_set_change_invalidates_entries():
+    clock = FakeClock()
+    version = {"value": 1}
+    cache = VerifiedTokenCache("test", key_version=lambda: version["value"], clock=clock)
+    cache.put("token-a", {"sub": "1", "exp": clock.now + 60})
+    assert cache.get("token-a") is not None
+
+    version["value"] = 2
+    assert cache.get("token-a") is None
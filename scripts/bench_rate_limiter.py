@@ -0,0 +1,60 @@
+"""Benchmark the gateway's in-process GCRA rate limiter.
+
+Drives ``GCRALimiter.allow`` with a configurable number of distinct client
+keys and reports throughput, retained keys and resident memory, e.g.:
+
+    python scripts/bench_rate_limiter.py --clients 1000000 --max-keys 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import resource
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from services.api_gateway.app.rate_limit import GCRALimiter  # noqa: E402
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(clients: int, requests_per_client: int, max_keys: int, limit: int, window: int) -> None:
+    limiter = GCRALimiter(limit, window_seconds=window, max_keys=max_keys)
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{i}" for i in range(clients)]
+    rss_before = _rss_mb()
+
+    total = clients * requests_per_client
+    allowed = 0
+    start = time.perf_counter()
+    for _ in range(requests_per_client):
+        for key in keys:
+            allowed += limiter.allow(key)
+    elapsed = time.perf_counter() - start
+
+    print(f"clients={clients:,} requests={total:,} max_keys={max_keys:,}")
+    print(f"throughput={total / elapsed:,.0f} checks/s ({elapsed * 1e9 / total:.0f} ns/check)")
+    print(f"allowed={allowed:,} tracked_keys={len(limiter):,}")
+    print(f"peak_rss_mb={_rss_mb():.1f} (key list alone: {rss_before:.1f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    parser.add_argument("--max-keys", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=120)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+    run(args.clients, args.requests_per_client, args.max_keys, args.limit, args.window)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
 from pathlib import Path
 import sys
 
@@ -12,10 +13,21 @@ from shared.errors import http_exception_handler, unhandled_exception_handler
 from .middleware import setup_middleware
 from .routes import register_routes
 from .startup import setup_instrumentation
+from .upstream import UpstreamRegistry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pooled upstream clients up front and release their connections on shutdown
+    app.state.upstreams.start()
+    yield
+    await app.state.upstreams.aclose()
+    await app.state.rate_limiter.aclose()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Fintech API Gateway", version="0.1.0")
+    app = FastAPI(title="Fintech API Gateway", version="0.1.0", lifespan=lifespan)
+    app.state.upstreams = UpstreamRegistry()
     app.add_exception_handler(HTTPException, http_exception_handler)
     app.add_exception_handler(Exception, unhandled_exception_handler)
     setup_middleware(app)
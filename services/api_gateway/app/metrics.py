@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import time
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 _PROXY_REQUESTS_TOTAL = Counter(
     "gateway_proxy_requests_total",
@@ -27,6 +27,76 @@ _PROXY_LATENCY_SECONDS = Histogram(
     ),
 )
 
+_PROXY_TTFB_SECONDS = Histogram(
+    "gateway_proxy_upstream_ttfb_seconds",
+    "Time from issuing an upstream call until its response headers arrive",
+    ["service", "method"],
+    buckets=(
+        0.01,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+    ),
+)
+
+_UPSTREAM_POOL_IN_USE = Gauge(
+    "gateway_upstream_pool_connections_in_use",
+    "Upstream connections currently checked out of the gateway's pooled clients",
+    ["service"],
+)
+
+_UPSTREAM_POOL_WAITERS = Gauge(
+    "gateway_upstream_pool_waiters",
+    "Upstream calls currently waiting for a free connection from the gateway's pooled clients",
+    ["service"],
+)
+
+_UPSTREAM_POOL_MAX = Gauge(
+    "gateway_upstream_pool_max_connections",
+    "Configured connection limit of each pooled upstream client",
+    ["service"],
+)
+
+_UPSTREAM_POOL_TIMEOUTS_TOTAL = Counter(
+    "gateway_upstream_pool_timeouts_total",
+    "Upstream calls that timed out waiting for a free pooled connection",
+    ["service"],
+)
+
+
+def record_pool_limit(service: str, max_connections: int) -> None:
+    """Publish the configured connection limit for an upstream pool."""
+    _UPSTREAM_POOL_MAX.labels(service=service).set(max_connections)
+
+
+def pool_checkout(service: str) -> None:
+    """Mark one upstream connection as in use."""
+    _UPSTREAM_POOL_IN_USE.labels(service=service).inc()
+
+
+def pool_wait_start(service: str) -> None:
+    """Mark one upstream call as waiting for a pooled connection."""
+    _UPSTREAM_POOL_WAITERS.labels(service=service).inc()
+
+
+def pool_wait_end(service: str) -> None:
+    """Mark one upstream call as done waiting, with or without a connection."""
+    _UPSTREAM_POOL_WAITERS.labels(service=service).dec()
+
+
+def pool_release(service: str) -> None:
+    """Mark one upstream connection as returned to the pool."""
+    _UPSTREAM_POOL_IN_USE.labels(service=service).dec()
+
+
+def record_pool_timeout(service: str) -> None:
+    """Count a call that could not acquire a pooled connection in time."""
+    _UPSTREAM_POOL_TIMEOUTS_TOTAL.labels(service=service).inc()
+
 
 def record_proxy_result(service: str, method: str, status_code: int, elapsed_seconds: float) -> None:
     """Record the result and latency of a proxied upstream call."""
@@ -46,6 +116,11 @@ class TimedCall:
         self._start = time.perf_counter()
         return self
 
+    def first_byte(self) -> None:
+        """Record time-to-first-byte for streamed calls (headers received)."""
+        elapsed = time.perf_counter() - self._start
+        _PROXY_TTFB_SECONDS.labels(service=self.service, method=self.method).observe(elapsed)
+
     def __exit__(self, exc_type, exc, tb) -> None:  # noqa: D401
         elapsed = time.perf_counter() - self._start
         status = 500 if exc_type else getattr(self, "status_code", 200)
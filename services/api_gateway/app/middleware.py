@@ -2,38 +2,19 @@ from __future__ import annotations
 
 import time
 import uuid
-from collections import defaultdict
 from typing import Callable
 
 from fastapi import FastAPI, Request, Response
 from loguru import logger
+from redis import asyncio as redis_asyncio
 
 from shared.errors import error_response
 from shared.request_context import REQUEST_ID_HEADER
 
+from .rate_limit import GCRALimiter, RedisGCRALimiter
 from .settings import gateway_settings
 
 
-class SlidingWindowLimiter:
-    """Simple in-memory rate limiter for local development."""
-
-    def __init__(self, limit: int, window_seconds: int) -> None:
-        self.limit = limit
-        self.window = window_seconds
-        self._buckets: dict[str, list[float]] = defaultdict(list)
-
-    def allow(self, identifier: str) -> bool:
-        now = time.time()
-        window_start = now - self.window
-        bucket = self._buckets[identifier]
-        while bucket and bucket[0] < window_start:
-            bucket.pop(0)
-        if len(bucket) >= self.limit:
-            return False
-        bucket.append(now)
-        return True
-
-
 def request_id_middleware() -> Callable:
     async def middleware(request: Request, call_next: Callable) -> Response:
         request_id = request.headers.get(REQUEST_ID_HEADER, str(uuid.uuid4()))
@@ -54,10 +35,10 @@ def request_id_middleware() -> Callable:
     return middleware
 
 
-def rate_limit_middleware(limiter: SlidingWindowLimiter) -> Callable:
+def rate_limit_middleware(limiter: GCRALimiter | RedisGCRALimiter) -> Callable:
     async def middleware(request: Request, call_next: Callable) -> Response:
         client_id = request.headers.get("x-api-key") or request.client.host or "anonymous"
-        if not limiter.allow(client_id):
+        if not await limiter.check(client_id):
             request_id = getattr(request.state, "request_id", None)
             return error_response(
                 status_code=429,
@@ -70,10 +51,30 @@ def rate_limit_middleware(limiter: SlidingWindowLimiter) -> Callable:
     return middleware
 
 
-def setup_middleware(app: FastAPI) -> None:
+def build_rate_limiter() -> GCRALimiter | RedisGCRALimiter:
+    """Build the limiter selected by ``GATEWAY_RATE_LIMIT_BACKEND``."""
     settings = gateway_settings()
-    limiter = SlidingWindowLimiter(
-        settings.requests_per_minute, window_seconds=settings.rate_limit_window_seconds
+    limiter = GCRALimiter(
+        settings.requests_per_minute,
+        window_seconds=settings.rate_limit_window_seconds,
+        max_keys=settings.rate_limit_max_keys,
     )
+    if settings.rate_limit_backend != "redis":
+        return limiter
+    return RedisGCRALimiter(
+        redis_asyncio.from_url(str(settings.redis_url)),
+        settings.requests_per_minute,
+        window_seconds=settings.rate_limit_window_seconds,
+        fallback=limiter,
+        lease_size=settings.rate_limit_lease_size,
+        lease_seconds=settings.rate_limit_lease_seconds,
+        retry_seconds=settings.rate_limit_redis_retry_seconds,
+        max_keys=settings.rate_limit_max_keys,
+    )
+
+
+def setup_middleware(app: FastAPI) -> None:
+    limiter = build_rate_limiter()
+    app.state.rate_limiter = limiter
     app.middleware("http")(request_id_middleware())
     app.middleware("http")(rate_limit_middleware(limiter))
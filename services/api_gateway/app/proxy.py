@@ -0,0 +1,104 @@
+"""Streaming proxy path for the API Gateway.
+
+The buffered proxies in ``routes/*`` read the whole client body and the whole
+upstream response into memory before replying. ``stream_proxy`` instead pipes
+the client body into the upstream request and relays the upstream body back
+chunk by chunk as a ``StreamingResponse``, so large payloads (statement pages,
+exports) are never held in full by the gateway.
+
+Metrics are emitted through ``TimedCall`` like the buffered path; the total
+latency is recorded once the stream is fully relayed and time-to-first-byte
+(upstream headers received) is recorded separately. The upstream response
+is closed and the call recorded when the ASGI response finishes, however it
+finishes (relayed in full, client disconnect or a failed send).
+"""
+
+from __future__ import annotations
+
+from typing import AsyncIterator, Callable
+
+import httpx
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from .metrics import TimedCall
+from .upstream import get_upstream_client
+
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+class _UpstreamStreamingResponse(StreamingResponse):
+    """``StreamingResponse`` that releases its upstream response when it is done.
+
+    Cleanup runs in ``__call__`` rather than in the body generator, which is
+    never resumed when the client disconnects mid-stream.
+    """
+
+    def __init__(
+        self, content: AsyncIterator[bytes], upstream: httpx.Response, timer: TimedCall, **kwargs
+    ) -> None:
+        super().__init__(content, **kwargs)
+        self._upstream = upstream
+        self._timer = timer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        exc_info: tuple = (None, None, None)
+        try:
+            await super().__call__(scope, receive, send)
+        except BaseException as exc:
+            exc_info = (type(exc), exc, exc.__traceback__)
+            raise
+        finally:
+            await self._upstream.aclose()
+            self._timer.__exit__(*exc_info)
+
+
+async def stream_proxy(
+    request: Request,
+    *,
+    service: str,
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    select_headers: Callable[[httpx.Headers], dict[str, str]],
+    params: dict[str, str] | None = None,
+) -> StreamingResponse:
+    """Forward ``request`` to ``url`` and stream the upstream response back.
+
+    ``select_headers`` is the caller's response-header filter so hop-by-hop
+    handling stays identical to the buffered proxy. ``content-encoding`` is
+    passed through as well because the body is relayed without decoding, so
+    the client's ``Accept-Encoding`` is forwarded (``identity`` when absent)
+    instead of httpx's default.
+    """
+    client = get_upstream_client(request, service)
+    content = request.stream() if method in _BODY_METHODS else None
+    headers = {**headers, "accept-encoding": request.headers.get("accept-encoding", "identity")}
+    upstream_request = client.build_request(method, url, content=content, headers=headers, params=params)
+
+    timer = TimedCall(service=service, method=method).__enter__()
+    try:
+        upstream = await client.send(upstream_request, stream=True)
+    except BaseException as exc:
+        timer.__exit__(type(exc), exc, exc.__traceback__)
+        raise
+    timer.status_code = upstream.status_code
+    timer.first_byte()
+
+    try:
+        response_headers = select_headers(upstream.headers)
+        if "content-encoding" in upstream.headers:
+            response_headers["content-encoding"] = upstream.headers["content-encoding"]
+        return _UpstreamStreamingResponse(
+            upstream.aiter_raw(),
+            upstream,
+            timer,
+            status_code=upstream.status_code,
+            media_type=upstream.headers.get("content-type"),
+            headers=response_headers,
+        )
+    except BaseException as exc:
+        await upstream.aclose()
+        timer.__exit__(type(exc), exc, exc.__traceback__)
+        raise
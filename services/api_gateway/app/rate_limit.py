@@ -0,0 +1,257 @@
+"""Rate limiting engine for the API Gateway.
+
+``GCRALimiter`` implements the Generic Cell Rate Algorithm: each client is
+tracked by a single float, its theoretical arrival time (TAT). A request is
+admitted when pushing the TAT forward by one emission interval stays within
+the burst window, so every check is O(1) and the memory cost per client is
+fixed regardless of its request rate.
+
+Idle clients are forgotten: a key whose TAT is already in the past carries no
+state (it is indistinguishable from a new client), so it can be dropped
+without changing any decision. Keys are kept in LRU order and a few of the
+oldest are swept on every call; ``max_keys`` caps the table outright.
+
+``RedisGCRALimiter`` enforces the same algorithm fleet-wide (all workers and
+replicas share one budget per client) using an atomic Lua script, with
+per-process token leases so most checks stay local.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+# Oldest keys inspected for expiry on every ``allow`` call; keeps sweeping
+# amortized O(1) while still draining idle clients under steady traffic.
+_SWEEP_PER_CALL = 2
+
+
+class GCRALimiter:
+    """In-process GCRA limiter with bounded, self-expiring per-key state."""
+
+    def __init__(
+        self,
+        limit: int,
+        window_seconds: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if limit <= 0 or window_seconds <= 0:
+            raise ValueError("limit and window_seconds must be positive")
+        self.limit = limit
+        self.window = float(window_seconds)
+        self.max_keys = max_keys
+        self.emission_interval = self.window / limit
+        self._clock = clock
+        self._tats: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+    def allow(self, identifier: str) -> bool:
+        """Admit or reject one request for ``identifier``."""
+        now = self._clock()
+        tats = self._tats
+        tat = tats.get(identifier)
+        if tat is None or tat < now:
+            tat = now
+        new_tat = tat + self.emission_interval
+        if new_tat - now > self.window:
+            tats.move_to_end(identifier)
+            self._sweep(now)
+            return False
+        tats[identifier] = new_tat
+        tats.move_to_end(identifier)
+        self._sweep(now)
+        return True
+
+    def _sweep(self, now: float) -> None:
+        tats = self._tats
+        while len(tats) > self.max_keys:
+            tats.popitem(last=False)
+        for _ in range(_SWEEP_PER_CALL):
+            if not tats:
+                return
+            key, tat = next(iter(tats.items()))
+            if tat > now:
+                return
+            del tats[key]
+
+    def sweep_idle(self) -> int:
+        """Drop every key whose bucket has fully refilled; return how many."""
+        now = self._clock()
+        idle = [key for key, tat in self._tats.items() if tat <= now]
+        for key in idle:
+            del self._tats[key]
+        return len(idle)
+
+    async def check(self, identifier: str) -> bool:
+        """Async entry point shared with ``RedisGCRALimiter``."""
+        return self.allow(identifier)
+
+    async def aclose(self) -> None:
+        """Nothing to release for the in-process limiter."""
+        return None
+
+
+# GCRA over a single Redis key that grants up to ARGV[3] tokens in one call.
+# The stored value is the theoretical arrival time in microseconds; time comes
+# from the Redis server so all gateway replicas share one clock.
+_GCRA_LEASE_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then
+    tat = now
+end
+local granted = math.floor((now + window - tat) / interval)
+if granted > requested then
+    granted = requested
+end
+if granted <= 0 then
+    return 0
+end
+tat = tat + granted * interval
+redis.call('SET', KEYS[1], tat, 'PX', math.ceil((tat - now) / 1000))
+return granted
+"""
+
+
+class RedisGCRALimiter:
+    """Fleet-wide GCRA limiter backed by Redis with local token leases.
+
+    Each process leases a small batch of tokens per client from Redis and
+    spends them locally, so most requests never leave the process. Lease
+    requests that miss in the same event-loop tick are coalesced and sent as
+    one pipeline of ``EVALSHA`` calls. When Redis is unreachable, or a lease
+    flush fails for any other reason, the limiter degrades to the in-process
+    ``fallback`` and retries Redis after ``retry_seconds``.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        limit: int,
+        window_seconds: float,
+        fallback: GCRALimiter,
+        lease_size: int = 10,
+        lease_seconds: float = 1.0,
+        retry_seconds: float = 5.0,
+        max_keys: int = 100_000,
+        key_prefix: str = "gateway:ratelimit:",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._redis = redis_client
+        self._script = redis_client.register_script(_GCRA_LEASE_SCRIPT)
+        self._interval_us = int(window_seconds * 1_000_000 / limit)
+        self._window_us = int(window_seconds * 1_000_000)
+        self.fallback = fallback
+        self.lease_size = max(1, min(lease_size, limit))
+        self.lease_seconds = lease_seconds
+        self.retry_seconds = retry_seconds
+        self.max_keys = max_keys
+        self.key_prefix = key_prefix
+        self._clock = clock
+        self._leases: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self._batch: dict[str, asyncio.Future[int]] = {}
+        self._flush_scheduled = False
+        # Running flushes; the event loop only keeps weak references to tasks
+        self._flush_tasks: set[asyncio.Task[None]] = set()
+        self._redis_down_until = 0.0
+
+    def _take_lease(self, identifier: str, now: float) -> bool:
+        lease = self._leases.get(identifier)
+        if lease is None:
+            return False
+        tokens, expires_at = lease
+        if tokens <= 0 or expires_at <= now:
+            del self._leases[identifier]
+            return False
+        self._leases[identifier] = (tokens - 1, expires_at)
+        self._leases.move_to_end(identifier)
+        return True
+
+    async def check(self, identifier: str) -> bool:
+        """Admit or reject one request for ``identifier``."""
+        while True:
+            now = self._clock()
+            if self._take_lease(identifier, now):
+                return True
+            if now < self._redis_down_until:
+                return self.fallback.allow(identifier)
+            future = self._batch.get(identifier)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._batch[identifier] = future
+                if not self._flush_scheduled:
+                    self._flush_scheduled = True
+                    asyncio.get_running_loop().call_soon(self._start_flush)
+            try:
+                granted = await asyncio.shield(future)
+            except Exception as exc:
+                if self._clock() >= self._redis_down_until:
+                    logger.warning("Redis rate limiter unavailable, using in-process fallback: {}", exc)
+                    self._redis_down_until = self._clock() + self.retry_seconds
+                return self.fallback.allow(identifier)
+            if granted <= 0:
+                return False
+            # The lease was installed by the flush; concurrent callers may have
+            # drained it already, in which case loop and lease another batch.
+
+    def _start_flush(self) -> None:
+        task = asyncio.ensure_future(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self) -> None:
+        batch, self._batch = self._batch, {}
+        self._flush_scheduled = False
+        if not batch:
+            return
+        error: BaseException | None = None
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for identifier in batch:
+                    await self._script(
+                        keys=[f"{self.key_prefix}{identifier}"],
+                        args=[self._interval_us, self._window_us, self.lease_size],
+                        client=pipe,
+                    )
+                results = await pipe.execute()
+            expires_at = self._clock() + self.lease_seconds
+            for (identifier, future), granted in zip(batch.items(), results):
+                granted = int(granted)
+                if granted > 0:
+                    self._leases[identifier] = (granted, expires_at)
+                    self._leases.move_to_end(identifier)
+                if not future.done():
+                    future.set_result(granted)
+            while len(self._leases) > self.max_keys:
+                self._leases.popitem(last=False)
+        except BaseException as exc:
+            error = exc
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            # Every waiter must be woken, whatever stopped the flush
+            for future in batch.values():
+                if not future.done():
+                    if isinstance(error, Exception):
+                        future.set_exception(error)
+                    else:
+                        future.set_exception(RedisError("Rate limit lease flush was interrupted"))
+
+    async def aclose(self) -> None:
+        """Stop pending lease flushes and close the underlying Redis connection pool."""
+        for task in list(self._flush_tasks):
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self._redis.aclose()
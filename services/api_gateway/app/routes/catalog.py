@@ -16,9 +16,10 @@ from __future__ import annotations
 from typing import Any, Dict
 
 import httpx
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Request, Response
 
 from ..settings import gateway_settings
+from ..upstream import get_upstream_client
 
 router = APIRouter()
 
@@ -49,33 +50,32 @@ def _strip_api_v1(path: str) -> str:
 
 
 @router.get("/api/v1/catalog", tags=["catalog"])
-async def catalog() -> Dict[str, Any]:
+async def catalog(request: Request) -> Dict[str, Any]:
     settings = gateway_settings()
     out: Dict[str, Any] = {"services": []}
-    async with httpx.AsyncClient() as client:
-        for slug, attr in SERVICE_MAP.items():
-            base = getattr(settings, attr)
-            root = _service_root(base)
-            try:
-                spec = await _fetch_openapi(client, root)
-                paths = list(spec.get("paths", {}).keys())
-                out["services"].append({
-                    "name": slug,
-                    "root": root,
-                    "original_path_count": len(paths),
-                    "paths": paths,
-                })
-            except Exception as e:  # noqa: BLE001
-                out["services"].append({
-                    "name": slug,
-                    "root": root,
-                    "error": str(e),
-                })
+    for slug, attr in SERVICE_MAP.items():
+        base = getattr(settings, attr)
+        root = _service_root(base)
+        try:
+            spec = await _fetch_openapi(get_upstream_client(request, slug), root)
+            paths = list(spec.get("paths", {}).keys())
+            out["services"].append({
+                "name": slug,
+                "root": root,
+                "original_path_count": len(paths),
+                "paths": paths,
+            })
+        except Exception as e:  # noqa: BLE001
+            out["services"].append({
+                "name": slug,
+                "root": root,
+                "error": str(e),
+            })
     return out
 
 
 @router.get("/api/v1/openapi-aggregate", tags=["catalog"])
-async def openapi_aggregate() -> Dict[str, Any]:
+async def openapi_aggregate(request: Request) -> Dict[str, Any]:
     settings = gateway_settings()
     aggregate: Dict[str, Any] = {
         "openapi": "3.1.0",
@@ -83,25 +83,24 @@ async def openapi_aggregate() -> Dict[str, Any]:
         "paths": {},
         "servers": [],
     }
-    async with httpx.AsyncClient() as client:
-        for slug, attr in SERVICE_MAP.items():
-            base = getattr(settings, attr)
-            root = _service_root(base)
-            try:
-                spec = await _fetch_openapi(client, root)
-                aggregate["servers"].append({"url": root, "description": f"Upstream {slug}"})
-                for p, val in spec.get("paths", {}).items():
-                    new_path = f"/{slug}{_strip_api_v1(p)}"
-                    # Shallow copy; deep merge of methods if collision
-                    if new_path in aggregate["paths"]:
-                        # Merge operations without overwriting existing methods
-                        existing = aggregate["paths"][new_path]
-                        for method, op in val.items():
-                            if method not in existing:
-                                existing[method] = op
-                    else:
-                        aggregate["paths"][new_path] = val
-            except Exception:
-                # Skip unreachable service in aggregate spec.
-                continue
+    for slug, attr in SERVICE_MAP.items():
+        base = getattr(settings, attr)
+        root = _service_root(base)
+        try:
+            spec = await _fetch_openapi(get_upstream_client(request, slug), root)
+            aggregate["servers"].append({"url": root, "description": f"Upstream {slug}"})
+            for p, val in spec.get("paths", {}).items():
+                new_path = f"/{slug}{_strip_api_v1(p)}"
+                # Shallow copy; deep merge of methods if collision
+                if new_path in aggregate["paths"]:
+                    # Merge operations without overwriting existing methods
+                    existing = aggregate["paths"][new_path]
+                    for method, op in val.items():
+                        if method not in existing:
+                            existing[method] = op
+                else:
+                    aggregate["paths"][new_path] = val
+        except Exception:
+            # Skip unreachable service in aggregate spec.
+            continue
     return aggregate
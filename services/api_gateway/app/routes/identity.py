@@ -25,7 +25,9 @@ import httpx
 from fastapi import APIRouter, Request, Response
 
 from ..metrics import TimedCall
+from ..proxy import stream_proxy
 from ..settings import gateway_settings
+from ..upstream import get_upstream_client
 
 router = APIRouter(prefix="/api/v1/auth")
 
@@ -65,12 +67,20 @@ async def _proxy_post(path: str, request: Request) -> Response:
     """Forward a POST request body and headers to the Identity service."""
     settings = gateway_settings()
     url = f"{settings.identity_base_url}{path}"
-    body = await request.body()
     headers = _forward_headers(request)
-    timeout = httpx.Timeout(10.0, read=20.0)
+    if settings.proxy_streaming_enabled:
+        return await stream_proxy(
+            request,
+            service="identity",
+            method="POST",
+            url=url,
+            headers=headers,
+            select_headers=_select_response_headers,
+        )
+    body = await request.body()
+    client = get_upstream_client(request, "identity")
     with TimedCall(service="identity", method="POST") as span:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            upstream = await client.post(url, content=body, headers=headers)
+        upstream = await client.post(url, content=body, headers=headers)
         span.status_code = upstream.status_code
     # Build response
     content_type = upstream.headers.get("content-type")
@@ -83,11 +93,20 @@ async def _proxy_get(path: str, request: Request) -> Response:
     settings = gateway_settings()
     url = f"{settings.identity_base_url}{path}"
     headers = _forward_headers(request)
-    timeout = httpx.Timeout(10.0, read=20.0)
     params = dict(request.query_params)
+    if settings.proxy_streaming_enabled:
+        return await stream_proxy(
+            request,
+            service="identity",
+            method="GET",
+            url=url,
+            headers=headers,
+            select_headers=_select_response_headers,
+            params=params,
+        )
+    client = get_upstream_client(request, "identity")
     with TimedCall(service="identity", method="GET") as span:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            upstream = await client.get(url, headers=headers, params=params)
+        upstream = await client.get(url, headers=headers, params=params)
         span.status_code = upstream.status_code
     content_type = upstream.headers.get("content-type")
     response_headers = _select_response_headers(upstream.headers)
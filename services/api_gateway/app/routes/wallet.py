@@ -13,7 +13,9 @@ import httpx
 from fastapi import APIRouter, Request, Response
 
 from ..metrics import TimedCall
+from ..proxy import stream_proxy
 from ..settings import gateway_settings
+from ..upstream import get_upstream_client
 
 router = APIRouter(prefix="/api/v1/wallets")
 
@@ -66,12 +68,20 @@ async def _proxy_post(path: str, request: Request) -> Response:
     """Forward a POST request to the Wallet service."""
     settings = gateway_settings()
     url = f"{settings.wallet_base_url}{path}"
-    body = await request.body()
     headers = _forward_headers(request)
-    timeout = httpx.Timeout(10.0, read=20.0)
+    if settings.proxy_streaming_enabled:
+        return await stream_proxy(
+            request,
+            service="wallet",
+            method="POST",
+            url=url,
+            headers=headers,
+            select_headers=_select_response_headers,
+        )
+    body = await request.body()
+    client = get_upstream_client(request, "wallet")
     with TimedCall(service="wallet", method="POST") as span:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            upstream = await client.post(url, content=body, headers=headers)
+        upstream = await client.post(url, content=body, headers=headers)
         span.status_code = upstream.status_code
     content_type = upstream.headers.get("content-type")
     response_headers = _select_response_headers(upstream.headers)
@@ -83,11 +93,20 @@ async def _proxy_get(path: str, request: Request) -> Response:
     settings = gateway_settings()
     url = f"{settings.wallet_base_url}{path}"
     headers = _forward_headers(request)
-    timeout = httpx.Timeout(10.0, read=20.0)
     params = dict(request.query_params)
+    if settings.proxy_streaming_enabled:
+        return await stream_proxy(
+            request,
+            service="wallet",
+            method="GET",
+            url=url,
+            headers=headers,
+            select_headers=_select_response_headers,
+            params=params,
+        )
+    client = get_upstream_client(request, "wallet")
     with TimedCall(service="wallet", method="GET") as span:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            upstream = await client.get(url, headers=headers, params=params)
+        upstream = await client.get(url, headers=headers, params=params)
         span.status_code = upstream.status_code
     content_type = upstream.headers.get("content-type")
     response_headers = _select_response_headers(upstream.headers)
@@ -100,6 +119,12 @@ async def create_wallet(request: Request) -> Response:
     return await _proxy_post("/wallets", request)
 
 
+@router.post("/batch")
+async def batch_money_changes(request: Request) -> Response:
+    """Apply a batch of credits/debits across wallets (proxy)."""
+    return await _proxy_post("/wallets/batch", request)
+
+
 @router.post("/{wallet_id}/credit")
 async def credit_wallet(wallet_id: str, request: Request) -> Response:
     """Credit funds to a wallet (proxy)."""
@@ -116,3 +141,38 @@ async def debit_wallet(wallet_id: str, request: Request) -> Response:
 async def wallet_balance(wallet_id: str, request: Request) -> Response:
     """Return the current balance for a wallet (proxy)."""
     return await _proxy_get(f"/wallets/{wallet_id}/balance", request)
+
+
+@router.get("/{wallet_id}/statements")
+async def wallet_statements(wallet_id: str, request: Request) -> Response:
+    """Return a page of ledger entries for a wallet (proxy)."""
+    return await _proxy_get(f"/wallets/{wallet_id}/statements", request)
+
+
+def _select_export_headers(headers: httpx.Headers) -> dict[str, str]:
+    out = _select_response_headers(headers)
+    if "content-disposition" in headers:
+        out["content-disposition"] = headers["content-disposition"]
+    return out
+
+
+@router.get("/{wallet_id}/statements/export")
+async def export_wallet_statements(wallet_id: str, request: Request) -> Response:
+    """Stream a full statement export for a wallet (proxy).
+
+    Always relayed through ``stream_proxy`` regardless of
+    ``proxy_streaming_enabled`` since exports are unbounded. ``stream_proxy``
+    forwards the client's ``Accept-Encoding``, so a gzip body from the Wallet
+    service passes through without being decoded.
+    """
+    settings = gateway_settings()
+    headers = _forward_headers(request)
+    return await stream_proxy(
+        request,
+        service="wallet",
+        method="GET",
+        url=f"{settings.wallet_base_url}/wallets/{wallet_id}/statements/export",
+        headers=headers,
+        select_headers=_select_export_headers,
+        params=dict(request.query_params),
+    )
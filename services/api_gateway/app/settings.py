@@ -30,6 +30,16 @@ class GatewaySettings(BaseSettings):
     secret_key: str = "changeme"
     requests_per_minute: int = 120
     rate_limit_window_seconds: int = 60
+    # Upper bound on clients tracked by the in-process limiter (LRU eviction beyond it)
+    rate_limit_max_keys: int = 100_000
+    # "memory" (per process) or "redis" (shared across workers/replicas)
+    rate_limit_backend: str = "memory"
+    # Tokens leased from Redis per client per process, and how long a lease lives
+    rate_limit_lease_size: int = 10
+    rate_limit_lease_seconds: float = 1.0
+    # Back-off before retrying Redis after it failed (in-process limiter meanwhile)
+    rate_limit_redis_retry_seconds: float = 5.0
+    redis_url: AnyUrl = "redis://redis:6379/4"
     # Upstream identity service base URL (inside the Docker network by default)
     identity_base_url: str = "http://identity-service:8000/api/v1"
     # Upstream wallet service base URL
@@ -38,6 +48,19 @@ class GatewaySettings(BaseSettings):
     payments_base_url: str = "http://payments-service:8000/api/v1"
     # Upstream risk service base URL
     risk_base_url: str = "http://risk-service:8000/api/v1"
+    # Upstream connection pools (one long-lived pooled client per upstream service)
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_keepalive_expiry_seconds: float = 30.0
+    upstream_connect_timeout_seconds: float = 10.0
+    upstream_pool_timeout_seconds: float = 5.0
+    # Relay request/response bodies chunk by chunk instead of buffering them
+    proxy_streaming_enabled: bool = False
+    # Per-upstream read timeouts
+    identity_timeout_seconds: float = 20.0
+    wallet_timeout_seconds: float = 20.0
+    payments_timeout_seconds: float = 20.0
+    risk_timeout_seconds: float = 20.0
     # Observability
     otel_endpoint: AnyUrl = "http://jaeger:4317"
 
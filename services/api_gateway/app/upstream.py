@@ -0,0 +1,162 @@
+"""Pooled upstream HTTP clients for the API Gateway.
+
+The gateway keeps one long-lived ``httpx.AsyncClient`` per upstream service so
+proxied calls reuse keep-alive connections instead of paying a TCP connect on
+every hop. Clients are opened in the application lifespan and closed on
+shutdown; ``UpstreamRegistry.client`` also creates them lazily so routes work
+when the lifespan has not run (e.g. ASGI test transports).
+
+Pool sizes, keep-alive expiry and timeouts come from ``GatewaySettings``.
+Connection checkout is instrumented so pool saturation can be read from
+``gateway_upstream_pool_connections_in_use`` / ``gateway_upstream_pool_max_connections``.
+A call counts as in use only once the pool hands it a connection; calls queued
+for one are reported by ``gateway_upstream_pool_waiters``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, AsyncIterator
+
+import httpx
+from fastapi import Request
+
+from .metrics import (
+    pool_checkout,
+    pool_release,
+    pool_wait_end,
+    pool_wait_start,
+    record_pool_limit,
+    record_pool_timeout,
+)
+from .settings import GatewaySettings, gateway_settings
+
+UPSTREAM_SERVICES: tuple[str, ...] = ("identity", "wallet", "payments", "risk")
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response stream wrapper that reports the connection back once closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, service: str) -> None:
+        self._stream = stream
+        self._service = service
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                pool_release(self._service)
+
+
+class _PoolCheckout:
+    """One call's progress from waiting on the pool to holding a connection."""
+
+    def __init__(self, service: str) -> None:
+        self._service = service
+        self.acquired = False
+        pool_wait_start(service)
+
+    def acquire(self) -> None:
+        if not self.acquired:
+            self.acquired = True
+            pool_wait_end(self._service)
+            pool_checkout(self._service)
+
+    def abandon(self) -> None:
+        if self.acquired:
+            pool_release(self._service)
+        else:
+            pool_wait_end(self._service)
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wrap a pooled transport to track in-use connections, waiters and pool timeouts."""
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport) -> None:
+        self._service = service
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        checkout = _PoolCheckout(self._service)
+        caller_trace = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            # The pool emits no trace events while a call waits; the first one
+            # comes from the connection it was handed (connect or send headers)
+            checkout.acquire()
+            if caller_trace is not None:
+                await caller_trace(event, info)
+
+        request.extensions["trace"] = trace
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.PoolTimeout:
+            checkout.abandon()
+            record_pool_timeout(self._service)
+            raise
+        except BaseException:
+            checkout.abandon()
+            raise
+        # Transports that do not trace still hold a connection once they respond
+        checkout.acquire()
+        response.stream = _ReleasingStream(response.stream, self._service)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _build_client(service: str, settings: GatewaySettings) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.upstream_max_connections,
+        max_keepalive_connections=settings.upstream_max_keepalive_connections,
+        keepalive_expiry=settings.upstream_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        settings.upstream_connect_timeout_seconds,
+        read=getattr(settings, f"{service}_timeout_seconds"),
+        pool=settings.upstream_pool_timeout_seconds,
+    )
+    transport = _InstrumentedTransport(service, httpx.AsyncHTTPTransport(limits=limits))
+    record_pool_limit(service, settings.upstream_max_connections)
+    return httpx.AsyncClient(timeout=timeout, transport=transport)
+
+
+class UpstreamRegistry:
+    """Own one pooled ``httpx.AsyncClient`` per upstream service."""
+
+    def __init__(self, settings: GatewaySettings | None = None) -> None:
+        self._settings = settings
+        self._clients: dict[str, httpx.AsyncClient] = {}
+
+    def start(self) -> None:
+        """Eagerly open a client for every known upstream."""
+        for service in UPSTREAM_SERVICES:
+            self.client(service)
+
+    def client(self, service: str) -> httpx.AsyncClient:
+        """Return the pooled client for ``service``, creating it on first use."""
+        client = self._clients.get(service)
+        if client is None or client.is_closed:
+            if service not in UPSTREAM_SERVICES:
+                raise KeyError(f"Unknown upstream service: {service}")
+            client = _build_client(service, self._settings or gateway_settings())
+            self._clients[service] = client
+        return client
+
+    async def aclose(self) -> None:
+        """Close every pooled client and drop idle connections."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+def get_upstream_client(request: Request, service: str) -> httpx.AsyncClient:
+    """Return the app-wide pooled client for ``service``."""
+    return request.app.state.upstreams.client(service)
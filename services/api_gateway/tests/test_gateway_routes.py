@@ -9,11 +9,14 @@ import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
 
 from services.api_gateway.app.main import create_app
+from services.api_gateway.app.settings import GatewaySettings
+from services.api_gateway.app.upstream import UpstreamRegistry
 
 
 class StubAsyncClient:
     def __init__(self, handler: Callable[..., httpx.Response]):
         self._handler = handler
+        self.is_closed = False
 
     async def __aenter__(self) -> StubAsyncClient:
         return self
@@ -21,6 +24,9 @@ class StubAsyncClient:
     async def __aexit__(self, exc_type, exc, tb) -> None:  # noqa: D401
         return None
 
+    async def aclose(self) -> None:
+        self.is_closed = True
+
     async def post(self, url: str, **kwargs) -> httpx.Response:
         return await self._handler("POST", url, **kwargs)
 
@@ -47,11 +53,10 @@ async def gateway_test_client(monkeypatch):
             return httpx.Response(status, json=json_body, request=request)
         return httpx.Response(status, content=content or b"", request=request)
 
-    for target in [
-        "services.api_gateway.app.routes.identity.httpx.AsyncClient",
-        "services.api_gateway.app.routes.wallet.httpx.AsyncClient",
-    ]:
-        monkeypatch.setattr(target, lambda *args, **kwargs: StubAsyncClient(handler))
+    monkeypatch.setattr(
+        "services.api_gateway.app.upstream.httpx.AsyncClient",
+        lambda *args, **kwargs: StubAsyncClient(handler),
+    )
 
     app = create_app()
     transport = ASGITransport(app=app)
@@ -101,3 +106,265 @@ async def test_wallet_proxy_forwards_bearer_token(gateway_test_client):
     forwarded_headers = record["kwargs"]["headers"]
     normalized = {k.lower(): v for k, v in forwarded_headers.items()}
     assert normalized.get("authorization") == "Bearer access-token"
+
+
+@pytest.mark.asyncio
+async def test_upstream_registry_reuses_pooled_clients():
+    settings = GatewaySettings(upstream_max_connections=7, wallet_timeout_seconds=3.0)
+    registry = UpstreamRegistry(settings)
+    registry.start()
+
+    wallet_client = registry.client("wallet")
+    assert registry.client("wallet") is wallet_client
+    assert registry.client("identity") is not wallet_client
+    assert wallet_client.timeout.read == 3.0
+
+    await registry.aclose()
+    assert wallet_client.is_closed
+    # A fresh pool is opened on demand after shutdown
+    assert registry.client("wallet") is not wallet_client
+    await registry.aclose()
+
+    with pytest.raises(KeyError):
+        registry.client("unknown")
+
+
+@pytest.mark.asyncio
+async def test_upstream_pool_counts_waiters_apart_from_connections_in_use():
+    import asyncio
+
+    from prometheus_client import REGISTRY
+
+    from services.api_gateway.app.upstream import _InstrumentedTransport
+
+    class OneConnectionPool(httpx.AsyncBaseTransport):
+        """Hands out a single connection and traces like httpcore once it does."""
+
+        def __init__(self) -> None:
+            self.connection = asyncio.Lock()
+            self.respond = asyncio.Event()
+
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            async with self.connection:
+                await request.extensions["trace"]("http11.send_request_headers.started", {})
+                await self.respond.wait()
+            return httpx.Response(200, stream=httpx.ByteStream(b"ok"))
+
+    class ExhaustedPool(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            raise httpx.PoolTimeout("no free connection")
+
+    def sample(name: str) -> float:
+        return REGISTRY.get_sample_value(name, {"service": "payments"}) or 0.0
+
+    in_use, waiters = sample("gateway_upstream_pool_connections_in_use"), sample("gateway_upstream_pool_waiters")
+    pool = OneConnectionPool()
+    transport = _InstrumentedTransport("payments", pool)
+    calls = [
+        asyncio.create_task(transport.handle_async_request(httpx.Request("GET", "http://payments/x")))
+        for _ in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    assert sample("gateway_upstream_pool_connections_in_use") == in_use + 1
+    assert sample("gateway_upstream_pool_waiters") == waiters + 2
+
+    pool.respond.set()
+    responses = await asyncio.gather(*calls)
+    assert sample("gateway_upstream_pool_waiters") == waiters
+    for response in responses:
+        await response.aclose()
+    assert sample("gateway_upstream_pool_connections_in_use") == in_use
+
+    timeouts = sample("gateway_upstream_pool_timeouts_total")
+    with pytest.raises(httpx.PoolTimeout):
+        await _InstrumentedTransport("payments", ExhaustedPool()).handle_async_request(
+            httpx.Request("GET", "http://payments/x")
+        )
+    assert sample("gateway_upstream_pool_timeouts_total") == timeouts + 1
+    assert sample("gateway_upstream_pool_connections_in_use") == in_use
+    assert sample("gateway_upstream_pool_waiters") == waiters
+
+
+@pytest.mark.asyncio
+async def test_streaming_proxy_relays_body_and_response(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from services.api_gateway.app import settings as gateway_settings_module
+
+    monkeypatch.setattr("services.api_gateway.app.main.setup_instrumentation", lambda app: None)
+    monkeypatch.setenv("GATEWAY_PROXY_STREAMING_ENABLED", "true")
+    gateway_settings_module.gateway_settings.cache_clear()
+
+    seen: dict[str, bytes] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = await request.aread()
+        chunks = [b'{"entries": [', b'{"id": 1}', b"]}"]
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json", "connection": "keep-alive"},
+            stream=httpx.ByteStream(b"".join(chunks)),
+        )
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "services.api_gateway.app.upstream.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler)),
+    )
+
+    def ttfb_count() -> float:
+        return REGISTRY.get_sample_value(
+            "gateway_proxy_upstream_ttfb_seconds_count", {"service": "wallet", "method": "POST"}
+        ) or 0.0
+
+    before = ttfb_count()
+    app = create_app()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            response = await client.post(
+                "/api/v1/wallets/7/credit",
+                content=b'{"amount": "5.00"}',
+                headers={"Authorization": "Bearer t", "Content-Type": "application/json"},
+            )
+    finally:
+        await app.state.upstreams.aclose()
+        gateway_settings_module.gateway_settings.cache_clear()
+
+    assert response.status_code == 200
+    assert response.json() == {"entries": [{"id": 1}]}
+    assert "connection" not in response.headers
+    assert seen["body"] == b'{"amount": "5.00"}'
+    assert ttfb_count() == before + 1
+
+
+@pytest.mark.asyncio
+async def test_statement_export_is_streamed_with_encoding_passthrough(monkeypatch):
+    import gzip
+
+    from services.api_gateway.app import settings as gateway_settings_module
+
+    monkeypatch.setattr("services.api_gateway.app.main.setup_instrumentation", lambda app: None)
+    monkeypatch.setenv("GATEWAY_PROXY_STREAMING_ENABLED", "false")
+    gateway_settings_module.gateway_settings.cache_clear()
+
+    seen: dict[str, httpx.Request] = {}
+    body = gzip.compress(b'{"id":1}\n{"id":2}\n')
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen["request"] = request
+        return httpx.Response(
+            200,
+            headers={
+                "content-type": "application/x-ndjson",
+                "content-encoding": "gzip",
+                "content-disposition": 'attachment; filename="wallet-7-statement.ndjson"',
+            },
+            stream=httpx.ByteStream(body),
+        )
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "services.api_gateway.app.upstream.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler)),
+    )
+
+    app = create_app()
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://testserver") as client:
+            async with client.stream(
+                "GET",
+                "/api/v1/wallets/7/statements/export",
+                params={"format": "ndjson", "start": "2025-01-01"},
+                headers={"Authorization": "Bearer t", "Accept-Encoding": "gzip"},
+            ) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    finally:
+        await app.state.upstreams.aclose()
+        gateway_settings_module.gateway_settings.cache_clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-disposition"].startswith("attachment")
+    assert raw == body
+    upstream_request = seen["request"]
+    assert upstream_request.url.path.endswith("/wallets/7/statements/export")
+    assert upstream_request.url.params["start"] == "2025-01-01"
+    assert upstream_request.headers["accept-encoding"] == "gzip"
+
+
+@pytest.mark.asyncio
+async def test_streaming_proxy_releases_upstream_when_client_disconnects(monkeypatch):
+    import asyncio
+
+    from prometheus_client import REGISTRY
+
+    from services.api_gateway.app import settings as gateway_settings_module
+
+    monkeypatch.setattr("services.api_gateway.app.main.setup_instrumentation", lambda app: None)
+    monkeypatch.setenv("GATEWAY_PROXY_STREAMING_ENABLED", "true")
+    gateway_settings_module.gateway_settings.cache_clear()
+
+    closed = asyncio.Event()
+    seen: dict[str, httpx.Request] = {}
+
+    class EndlessStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            while True:
+                yield b"{}\n"
+                await asyncio.sleep(0.01)
+
+        async def aclose(self) -> None:
+            closed.set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen["request"] = request
+        return httpx.Response(200, headers={"content-type": "application/x-ndjson"}, stream=EndlessStream())
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        "services.api_gateway.app.upstream.httpx.AsyncClient",
+        lambda *args, **kwargs: real_client(transport=httpx.MockTransport(handler)),
+    )
+
+    def request_count() -> float:
+        return REGISTRY.get_sample_value(
+            "gateway_proxy_requests_total", {"service": "wallet", "method": "GET", "status": "200"}
+        ) or 0.0
+
+    before = request_count()
+    app = create_app()
+    sent: list[dict] = []
+
+    async def receive() -> dict:
+        # The client goes away once the first chunk has been sent
+        while not any(message.get("body") for message in sent):
+            await asyncio.sleep(0.001)
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/v1/wallets/7/balance",
+        "raw_path": b"/api/v1/wallets/7/balance",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", b"Bearer t")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+        "app": app,
+    }
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=5)
+    finally:
+        await app.state.upstreams.aclose()
+        gateway_settings_module.gateway_settings.cache_clear()
+
+    assert closed.is_set()
+    assert request_count() == before + 1
+    assert seen["request"].headers["accept-encoding"] == "identity"
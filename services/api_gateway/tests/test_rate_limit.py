@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from services.api_gateway.app.rate_limit import GCRALimiter, RedisGCRALimiter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_gcra_allows_burst_then_refills():
+    clock = FakeClock()
+    limiter = GCRALimiter(limit=3, window_seconds=3, clock=clock)
+
+    assert [limiter.allow("client") for _ in range(4)] == [True, True, True, False]
+
+    # One emission interval later exactly one more request fits
+    clock.now += 1.0
+    assert limiter.allow("client") is True
+    assert limiter.allow("client") is False
+
+    # Other clients are unaffected
+    assert limiter.allow("other") is True
+
+
+def test_gcra_forgets_idle_clients():
+    clock = FakeClock()
+    limiter = GCRALimiter(limit=2, window_seconds=10, clock=clock)
+    for i in range(50):
+        limiter.allow(f"ip-{i}")
+    assert len(limiter) == 50
+
+    clock.now += 10.0
+    assert limiter.sweep_idle() == 50
+    assert len(limiter) == 0
+
+    # Per-call sweeping also drains idle keys under steady traffic
+    for i in range(10):
+        limiter.allow(f"ip-{i}")
+    clock.now += 10.0
+    for _ in range(5):
+        limiter.allow("busy")
+        clock.now += 5.0
+    assert "ip-0" not in limiter._tats
+    assert len(limiter) <= 2
+
+
+def test_gcra_caps_tracked_keys():
+    clock = FakeClock()
+    limiter = GCRALimiter(limit=1, window_seconds=60, max_keys=100, clock=clock)
+    for i in range(1_000):
+        assert limiter.allow(f"ip-{i}") is True
+    assert len(limiter) == 100
+    # Most recently seen clients are the ones kept
+    assert limiter.allow("ip-999") is False
+
+
+def _fake_redis(server=None):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return fakeredis.FakeAsyncRedis(server=server)
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_shares_budget_across_replicas():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    replicas = [
+        RedisGCRALimiter(_fake_redis(server), 10, 60, fallback=GCRALimiter(10, 60), lease_size=3)
+        for _ in range(2)
+    ]
+    results = []
+    for _ in range(15):
+        for replica in replicas:
+            results.append(await replica.check("api-key-1"))
+    assert sum(results) == 10
+    assert results[-1] is False
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_serves_from_lease_and_batches_misses():
+    redis_client = _fake_redis()
+    limiter = RedisGCRALimiter(redis_client, 100, 60, fallback=GCRALimiter(100, 60), lease_size=5)
+    pipelines = 0
+    original_pipeline = redis_client.pipeline
+
+    def counting_pipeline(*args, **kwargs):
+        nonlocal pipelines
+        pipelines += 1
+        return original_pipeline(*args, **kwargs)
+
+    redis_client.pipeline = counting_pipeline
+
+    # Twenty distinct clients missing in the same tick share one pipeline
+    assert all(await asyncio.gather(*(limiter.check(f"ip-{i}") for i in range(20))))
+    assert pipelines == 1
+    # The remaining leased tokens are spent without touching Redis
+    for _ in range(4):
+        assert await limiter.check("ip-0") is True
+    assert pipelines == 1
+    assert await limiter.check("ip-0") is True
+    assert pipelines == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_falls_back_when_redis_is_down():
+    from redis import asyncio as redis_asyncio
+
+    unreachable = redis_asyncio.Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.2)
+    limiter = RedisGCRALimiter(unreachable, 2, 60, fallback=GCRALimiter(2, 60))
+    assert [await limiter.check("client") for _ in range(3)] == [True, True, False]
+    await limiter.aclose()
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_falls_back_when_flush_fails_without_redis_error():
+    limiter = RedisGCRALimiter(_fake_redis(), 2, 60, fallback=GCRALimiter(2, 60))
+
+    async def broken_script(*_args, **_kwargs):
+        raise ConnectionResetError("connection reset by peer")
+
+    limiter._script = broken_script
+    results = await asyncio.wait_for(asyncio.gather(*(limiter.check("client") for _ in range(3))), timeout=1)
+    assert results == [True, True, False]
+    assert not limiter._flush_tasks
+    await limiter.aclose()
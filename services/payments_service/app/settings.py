@@ -22,6 +22,8 @@ class PaymentsSettings(BaseSettings):
     jwt_issuer: str = "http://identity-service:8000"
     risk_base_url: str = "http://risk-service:8000/api/v1/risk"
     jwks_url: str = "http://identity-service:8000/api/v1/auth/jwks"
+    # Bounded cache of already-verified access tokens (entries live until token exp)
+    token_cache_max_entries: int = 10_000
     risk_timeout_seconds: float = 5.0
     wallet_timeout_seconds: float = 5.0
     wallet_retry_attempts: int = 3
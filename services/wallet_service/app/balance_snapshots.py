@@ -0,0 +1,221 @@
+"""Materialized ledger totals for incremental reconciliation.
+
+``wallet_balance_snapshots`` holds, per wallet, the signed ledger sum and
+entry count up to ``last_entry_id``. ``ledger_totals`` adds only the entries
+after that id, so reconciling a long-lived wallet costs as much as its recent
+activity rather than its whole history; ``full=True`` ignores the snapshot
+for audits. Ledger partitions detached by ``app.partitions`` are represented
+in full mode by the wallet's ``wallet_ledger_archives`` totals, which cover
+every entry created before ``archived_before``.
+
+Snapshots are advanced by a background job::
+
+    python -m services.wallet_service.app.balance_snapshots            # loop
+    python -m services.wallet_service.app.balance_snapshots --once --full
+
+Each pass walks wallets in id batches, locks their snapshot rows and folds the
+newer entries in with one grouped query per batch. Entries of an unsharded
+wallet are only written while its row is locked, so their ids commit in
+order and an entry can never appear below a snapshot's ``last_entry_id``
+after the snapshot was taken. A sharded wallet has two kinds of writers:
+debits hold its row and credits hold one of its shards, so their entry ids
+can commit out of order. The batch therefore takes ``FOR SHARE`` on its
+sharded wallet rows and then locks their shards (the order the money paths
+use), waiting out every in-flight writer before reading the ledger.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+
+from loguru import logger
+from sqlalchemy import Select, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.sql.elements import ColumnElement
+
+from .metrics import wallet_balance_snapshots_updated_total, wallet_reconciliation_entries_scanned
+from .models import BalanceSnapshot, EntryType, LedgerArchive, LedgerEntry, Wallet, WalletBalanceShard
+from .settings import wallet_settings
+
+
+def signed_ledger_sum() -> ColumnElement[Decimal]:
+    """``SUM`` of ledger amounts with debits negated (0 when there are no rows)."""
+    return func.coalesce(
+        func.sum(
+            case(
+                (LedgerEntry.type == EntryType.credit.value, LedgerEntry.amount),
+                else_=-LedgerEntry.amount,
+            )
+        ),
+        0,
+    )
+
+
+def exclude_archived(stmt: Select) -> Select:
+    """Restrict a ledger query to entries not already folded into ``wallet_ledger_archives``."""
+    return stmt.outerjoin(LedgerArchive, LedgerArchive.wallet_id == LedgerEntry.wallet_id).where(
+        or_(LedgerArchive.archived_before.is_(None), LedgerEntry.created_at >= LedgerArchive.archived_before)
+    )
+
+
+async def ledger_totals(
+    session: AsyncSession, wallet_id: int, *, full: bool = False
+) -> tuple[Decimal, int, int | None]:
+    """Return ``(ledger_balance, entry_count, snapshot_entry_id)`` for a wallet."""
+    stmt = select(signed_ledger_sum(), func.count(LedgerEntry.id)).where(LedgerEntry.wallet_id == wallet_id)
+    if full:
+        base = await session.get(LedgerArchive, wallet_id)
+        if base is not None:
+            stmt = stmt.where(LedgerEntry.created_at >= base.archived_before)
+    else:
+        base = (
+            await session.execute(select(BalanceSnapshot).where(BalanceSnapshot.wallet_id == wallet_id))
+        ).scalar_one_or_none()
+        if base is not None:
+            stmt = stmt.where(LedgerEntry.id > base.last_entry_id)
+    ledger_balance, entry_count = (await session.execute(stmt)).one()
+    wallet_reconciliation_entries_scanned.observe(entry_count)
+
+    ledger_balance = Decimal(ledger_balance)
+    if base is None:
+        return ledger_balance, entry_count, None
+    snapshot_entry_id = None if full else base.last_entry_id
+    return ledger_balance + base.ledger_balance, entry_count + base.entry_count, snapshot_entry_id
+
+
+class BalanceSnapshotter:
+    """Advances balance snapshots for every wallet in id-ordered batches."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], *, batch_size: int = 1_000) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+
+    async def _refresh_batch(self, session: AsyncSession, wallet_ids: list[int], full: bool) -> int:
+        result = await session.execute(
+            select(BalanceSnapshot).where(BalanceSnapshot.wallet_id.in_(wallet_ids)).with_for_update()
+        )
+        snapshots = {snapshot.wallet_id: snapshot for snapshot in result.scalars()}
+        sharded = list(
+            await session.scalars(
+                select(Wallet.id)
+                .where(Wallet.id.in_(wallet_ids), Wallet.balance_shards > 0)
+                .order_by(Wallet.id)
+                .with_for_update(read=True)
+            )
+        )
+        if sharded:
+            await session.execute(
+                select(WalletBalanceShard.wallet_id)
+                .where(WalletBalanceShard.wallet_id.in_(sharded))
+                .order_by(WalletBalanceShard.wallet_id, WalletBalanceShard.shard)
+                .with_for_update()
+            )
+
+        stmt = select(
+            LedgerEntry.wallet_id,
+            signed_ledger_sum(),
+            func.count(LedgerEntry.id),
+            func.max(LedgerEntry.id),
+        ).where(LedgerEntry.wallet_id.in_(wallet_ids))
+        archives: dict[int, LedgerArchive] = {}
+        if full:
+            # Full rebuilds start from the totals of detached partitions
+            stmt = exclude_archived(stmt)
+            archives = {
+                archive.wallet_id: archive
+                for archive in await session.scalars(
+                    select(LedgerArchive).where(LedgerArchive.wallet_id.in_(wallet_ids))
+                )
+            }
+        else:
+            stmt = stmt.outerjoin(BalanceSnapshot, BalanceSnapshot.wallet_id == LedgerEntry.wallet_id).where(
+                LedgerEntry.id > func.coalesce(BalanceSnapshot.last_entry_id, 0)
+            )
+        totals = {
+            wallet_id: (Decimal(amount), entry_count, last_entry_id)
+            for wallet_id, amount, entry_count, last_entry_id in await session.execute(
+                stmt.group_by(LedgerEntry.wallet_id)
+            )
+        }
+        for wallet_id, archive in archives.items():
+            amount, entry_count, last_entry_id = totals.get(wallet_id, (Decimal("0"), 0, 0))
+            totals[wallet_id] = (
+                amount + archive.ledger_balance,
+                entry_count + archive.entry_count,
+                max(last_entry_id, archive.last_entry_id),
+            )
+
+        for wallet_id, (amount, entry_count, last_entry_id) in totals.items():
+            snapshot = snapshots.get(wallet_id)
+            if snapshot is None:
+                snapshot = BalanceSnapshot(wallet_id=wallet_id, ledger_balance=Decimal("0"), entry_count=0)
+                session.add(snapshot)
+            elif full:
+                snapshot.ledger_balance = Decimal("0")
+                snapshot.entry_count = 0
+            snapshot.ledger_balance = snapshot.ledger_balance + amount
+            snapshot.entry_count = snapshot.entry_count + entry_count
+            snapshot.last_entry_id = last_entry_id
+            snapshot.updated_at = func.now()
+        return len(totals)
+
+    async def run(self, *, full: bool = False) -> int:
+        """Run one pass over all wallets and return the number of snapshots written."""
+        updated = 0
+        after_id = 0
+        while True:
+            async with self.session_factory() as session, session.begin():
+                wallet_ids = list(
+                    await session.scalars(
+                        select(Wallet.id).where(Wallet.id > after_id).order_by(Wallet.id).limit(self.batch_size)
+                    )
+                )
+                if not wallet_ids:
+                    break
+                count = await self._refresh_batch(session, wallet_ids, full)
+            after_id = wallet_ids[-1]
+            updated += count
+            wallet_balance_snapshots_updated_total.inc(count)
+        return updated
+
+
+async def run_snapshots(interval_seconds: float, batch_size: int, *, once: bool, full: bool) -> None:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    snapshotter = BalanceSnapshotter(session_factory, batch_size=batch_size)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                updated = await snapshotter.run(full=full)
+                logger.info(
+                    "Balance snapshot pass updated {} wallets in {:.2f}s", updated, time.perf_counter() - start
+                )
+            except Exception as exc:  # noqa: BLE001
+                if once:
+                    raise
+                logger.warning("wallet.snapshots.pass_failed: {}", exc)
+            if once:
+                break
+            await asyncio.sleep(interval_seconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Maintain wallet balance snapshots")
+    parser.add_argument("--interval", type=float, default=settings.snapshot_interval_seconds)
+    parser.add_argument("--batch-size", type=int, default=settings.snapshot_batch_size)
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    parser.add_argument("--full", action="store_true", help="Rebuild snapshots from the full ledger")
+    args = parser.parse_args()
+    asyncio.run(run_snapshots(args.interval, args.batch_size, once=args.once, full=args.full))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Outbox relay support: unprocessed-event index and insert notifications
+
+Revision ID: wallet_20251115_0005
+Revises: wallet_20251107_0004
+Create Date: 2025-11-15 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+from services.wallet_service.app.models.outbox_event import OUTBOX_NOTIFY_CHANNEL
+
+
+revision = "wallet_20251115_0005"
+down_revision = "wallet_20251107_0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Relay claims scan unprocessed rows in id order; keep that index tiny
+    op.create_index(
+        "ix_wallet_outbox_unprocessed",
+        "wallet_outbox_events",
+        ["id"],
+        postgresql_where=sa.text("processed_at IS NULL"),
+        sqlite_where=sa.text("processed_at IS NULL"),
+    )
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION wallet_outbox_notify() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{OUTBOX_NOTIFY_CHANNEL}', '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """
+        )
+        op.execute(
+            """
+            CREATE TRIGGER wallet_outbox_notify
+            AFTER INSERT ON wallet_outbox_events
+            FOR EACH STATEMENT EXECUTE FUNCTION wallet_outbox_notify()
+            """
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS wallet_outbox_notify ON wallet_outbox_events")
+        op.execute("DROP FUNCTION IF EXISTS wallet_outbox_notify()")
+    op.drop_index("ix_wallet_outbox_unprocessed", table_name="wallet_outbox_events")
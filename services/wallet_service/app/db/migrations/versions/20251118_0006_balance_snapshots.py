@@ -0,0 +1,33 @@
+"""Add wallet balance snapshots
+
+Revision ID: wallet_20251118_0006
+Revises: wallet_20251115_0005
+Create Date: 2025-11-18 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "wallet_20251118_0006"
+down_revision = "wallet_20251115_0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "wallet_balance_snapshots",
+        sa.Column("wallet_id", sa.Integer(), sa.ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("last_entry_id", sa.Integer(), nullable=False),
+        sa.Column("ledger_balance", sa.Numeric(18, 2), nullable=False),
+        sa.Column("entry_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+    )
+    op.create_index("ix_ledger_wallet_id_id", "ledger_entries", ["wallet_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ledger_wallet_id_id", table_name="ledger_entries")
+    op.drop_table("wallet_balance_snapshots")
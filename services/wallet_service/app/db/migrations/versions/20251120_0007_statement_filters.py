@@ -0,0 +1,50 @@
+"""Index ledger entries for filtered statement queries
+
+Revision ID: wallet_20251120_0007
+Revises: wallet_20251118_0006
+Create Date: 2025-11-20 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "wallet_20251120_0007"
+down_revision = "wallet_20251118_0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ledger_wallet_type_id", "ledger_entries", ["wallet_id", "type", "id"])
+    if op.get_bind().dialect.name == "postgresql":
+        # jsonb makes ->> lookups indexable; the rewrite takes an exclusive lock
+        op.alter_column(
+            "ledger_entries",
+            "metadata",
+            type_=postgresql.JSONB(),
+            existing_type=sa.JSON(),
+            existing_nullable=True,
+            postgresql_using="metadata::jsonb",
+        )
+        op.create_index(
+            "ix_ledger_wallet_details_type_id",
+            "ledger_entries",
+            ["wallet_id", sa.text("(metadata ->> 'type')"), "id"],
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_ledger_wallet_details_type_id", table_name="ledger_entries")
+        op.alter_column(
+            "ledger_entries",
+            "metadata",
+            type_=sa.JSON(),
+            existing_type=postgresql.JSONB(),
+            existing_nullable=True,
+            postgresql_using="metadata::json",
+        )
+    op.drop_index("ix_ledger_wallet_type_id", table_name="ledger_entries")
@@ -0,0 +1,236 @@
+"""Monthly range partitions for ledger_entries and wallet_transfers
+
+Revision ID: wallet_20251124_0008
+Revises: wallet_20251120_0007
+Create Date: 2025-11-24 00:00:00
+
+PostgreSQL only. Each table is converted without copying rows: the existing
+table is renamed to ``<table>_legacy``, a partitioned parent is created with
+the original name, and the legacy table is attached as the partition for
+everything before the first day of next month. Monthly partitions from there
+on are created here and kept ahead by ``app.partitions``.
+
+Partitioned unique constraints must include the partition key, so global
+idempotency uniqueness moves to narrow registry tables that a ``BEFORE
+INSERT`` trigger fills; the registry primary keys keep the original
+constraint names. Foreign keys that referenced ``ledger_entries.id`` are
+dropped because a partitioned primary key is ``(id, created_at)``.
+"""
+from __future__ import annotations
+
+from datetime import UTC, date, datetime
+
+from alembic import op
+
+
+revision = "wallet_20251124_0008"
+down_revision = "wallet_20251120_0007"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+_LEDGER_INDEXES = (
+    "CREATE INDEX ix_ledger_wallet ON ledger_entries (wallet_id)",
+    "CREATE INDEX ix_ledger_wallet_created ON ledger_entries (wallet_id, created_at)",
+    "CREATE INDEX ix_ledger_wallet_id_id ON ledger_entries (wallet_id, id)",
+    "CREATE INDEX ix_ledger_wallet_type_id ON ledger_entries (wallet_id, type, id)",
+    "CREATE INDEX ix_ledger_wallet_details_type_id ON ledger_entries (wallet_id, (metadata ->> 'type'), id)",
+    # Replay lookups probe each partition's (non-unique) key index
+    "CREATE INDEX ix_ledger_wallet_idem ON ledger_entries (wallet_id, idempotency_key)",
+)
+_TRANSFER_INDEXES = (
+    "CREATE INDEX ix_wallet_transfer_source_created ON wallet_transfers (source_wallet_id, created_at)",
+    "CREATE INDEX ix_wallet_transfer_user ON wallet_transfers (user_id)",
+    "CREATE INDEX ix_wallet_transfer_idem ON wallet_transfers (idempotency_key)",
+)
+
+
+def _utc_today() -> date:
+    # Bounds are compared against UTC created_at values, not the server's local date
+    return datetime.now(UTC).date()
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _rename_legacy_relations(table: str, suffix: str, strip: bool = False) -> None:
+    """Rename every index/constraint on ``table`` by adding (or removing) ``suffix``."""
+    new_name = f"left(indexname, length(indexname) - {len(suffix)})" if strip else f"indexname || '{suffix}'"
+    condition = f"AND indexname LIKE '%{suffix}'" if strip else ""
+    op.execute(
+        f"""
+        DO $$
+        DECLARE r record;
+        BEGIN
+            FOR r IN SELECT indexname, {new_name} AS new_name FROM pg_indexes
+                     WHERE schemaname = current_schema() AND tablename = '{table}' {condition}
+            LOOP
+                EXECUTE format('ALTER INDEX %I RENAME TO %I', r.indexname, r.new_name);
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def _drop_foreign_keys_to(table: str) -> None:
+    op.execute(
+        f"""
+        DO $$
+        DECLARE r record;
+        BEGIN
+            FOR r IN SELECT conrelid::regclass AS source, conname FROM pg_constraint
+                     WHERE contype = 'f' AND confrelid = '{table}'::regclass
+            LOOP
+                EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.source, r.conname);
+            END LOOP;
+        END $$
+        """
+    )
+
+
+def _partition(table: str, cutover: date, foreign_keys: tuple[str, ...], indexes: tuple[str, ...]) -> None:
+    legacy = f"{table}_legacy"
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+    _rename_legacy_relations(legacy, "_legacy")
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    for fk in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD {fk}")
+    # A partition's primary key must match the parent's (id, created_at)
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {table}_pkey_legacy")
+    op.execute(f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY (id, created_at)")
+    # Validate the bound separately so ATTACH does not rescan under an exclusive lock
+    op.execute(
+        f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_bound CHECK (created_at < '{cutover}') NOT VALID"
+    )
+    op.execute(f"ALTER TABLE {legacy} VALIDATE CONSTRAINT {legacy}_bound")
+    op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{cutover}')")
+    for statement in indexes:
+        op.execute(statement)
+    for offset in range(MONTHS_AHEAD + 1):
+        start, end = _add_months(cutover, offset), _add_months(cutover, offset + 1)
+        op.execute(
+            f"CREATE TABLE {table}_p{start:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{start}') TO ('{end}')"
+        )
+
+
+def _idempotency_registry(table: str, registry: str, constraint: str, columns: tuple[str, ...]) -> None:
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{column}" for column in columns)
+    op.execute(
+        f"INSERT INTO {registry} ({column_list}) "
+        f"SELECT {column_list} FROM {table}_legacy WHERE idempotency_key IS NOT NULL"
+    )
+    op.execute(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {constraint}_legacy")
+    op.execute(
+        f"""
+        CREATE FUNCTION {table}_claim_idempotency_key() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.idempotency_key IS NOT NULL THEN
+                INSERT INTO {registry} ({column_list}) VALUES ({new_values});
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        f"CREATE TRIGGER {table}_idempotency BEFORE INSERT ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_claim_idempotency_key()"
+    )
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    cutover = _add_months(_utc_today().replace(day=1), 1)
+
+    op.execute(
+        """
+        CREATE TABLE ledger_idempotency_keys (
+            wallet_id integer NOT NULL REFERENCES wallets (id) ON DELETE CASCADE,
+            idempotency_key varchar(64) NOT NULL,
+            CONSTRAINT uq_ledger_wallet_idem_registry PRIMARY KEY (wallet_id, idempotency_key)
+        )
+        """
+    )
+    op.execute(
+        """
+        CREATE TABLE wallet_transfer_idempotency_keys (
+            idempotency_key varchar(64) NOT NULL,
+            CONSTRAINT uq_wallet_transfer_idem_registry PRIMARY KEY (idempotency_key)
+        )
+        """
+    )
+
+    _drop_foreign_keys_to("ledger_entries")
+    _partition(
+        "ledger_entries",
+        cutover,
+        (
+            "CONSTRAINT ledger_entries_wallet_id_fkey FOREIGN KEY (wallet_id) "
+            "REFERENCES wallets (id) ON DELETE CASCADE",
+        ),
+        _LEDGER_INDEXES,
+    )
+    _idempotency_registry(
+        "ledger_entries", "ledger_idempotency_keys", "uq_ledger_wallet_idem", ("wallet_id", "idempotency_key")
+    )
+
+    _partition(
+        "wallet_transfers",
+        cutover,
+        (
+            "CONSTRAINT wallet_transfers_source_wallet_id_fkey FOREIGN KEY (source_wallet_id) "
+            "REFERENCES wallets (id) ON DELETE CASCADE",
+            "CONSTRAINT wallet_transfers_target_wallet_id_fkey FOREIGN KEY (target_wallet_id) "
+            "REFERENCES wallets (id) ON DELETE CASCADE",
+        ),
+        _TRANSFER_INDEXES,
+    )
+    _idempotency_registry(
+        "wallet_transfers",
+        "wallet_transfer_idempotency_keys",
+        "uq_wallet_transfer_idem",
+        ("idempotency_key",),
+    )
+
+    # The registries now own the original constraint names
+    op.execute("ALTER INDEX uq_ledger_wallet_idem_registry RENAME TO uq_ledger_wallet_idem")
+    op.execute("ALTER INDEX uq_wallet_transfer_idem_registry RENAME TO uq_wallet_transfer_idem")
+
+
+def _unpartition(table: str, unique: str) -> None:
+    legacy = f"{table}_legacy"
+    op.execute(f"DROP TRIGGER IF EXISTS {table}_idempotency ON {table}")
+    op.execute(f"DROP FUNCTION IF EXISTS {table}_claim_idempotency_key()")
+    op.execute(f"ALTER TABLE {table} DETACH PARTITION {legacy}")
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_bound")
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_pkey")
+    op.execute(f"INSERT INTO {legacy} SELECT * FROM {table}")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {legacy}.id")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {legacy} RENAME TO {table}")
+    _rename_legacy_relations(table, "_legacy", strip=True)
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {unique}")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP TABLE ledger_idempotency_keys")
+    op.execute("DROP TABLE wallet_transfer_idempotency_keys")
+    _unpartition("wallet_transfers", "uq_wallet_transfer_idem UNIQUE (idempotency_key)")
+    _unpartition("ledger_entries", "uq_ledger_wallet_idem UNIQUE (wallet_id, idempotency_key)")
+    for source, column in (
+        ("wallet_holds", "ledger_entry_id"),
+        ("wallet_transfers", "ledger_debit_entry_id"),
+        ("wallet_transfers", "ledger_credit_entry_id"),
+    ):
+        op.execute(f"ALTER TABLE {source} ADD FOREIGN KEY ({column}) REFERENCES ledger_entries (id)")
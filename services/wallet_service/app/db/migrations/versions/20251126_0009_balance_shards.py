@@ -0,0 +1,41 @@
+"""Add sharded sub-balances for hot wallets
+
+Revision ID: wallet_20251126_0009
+Revises: wallet_20251124_0008
+Create Date: 2025-11-26 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "wallet_20251126_0009"
+down_revision = "wallet_20251124_0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("wallets", sa.Column("balance_shards", sa.Integer(), server_default=sa.text("0"), nullable=False))
+    op.create_table(
+        "wallet_balance_shards",
+        sa.Column("wallet_id", sa.Integer(), sa.ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("shard", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("balance", sa.Numeric(18, 2), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    # Fold shard balances back into the wallet row before dropping them
+    op.execute(
+        """
+        UPDATE wallets SET balance = balance + (
+            SELECT COALESCE(SUM(s.balance), 0) FROM wallet_balance_shards s WHERE s.wallet_id = wallets.id
+        )
+        WHERE balance_shards > 0
+        """
+    )
+    op.drop_table("wallet_balance_shards")
+    op.drop_column("wallets", "balance_shards")
@@ -0,0 +1,34 @@
+"""Hold expiry deadline and the active-hold expiry index
+
+Revision ID: wallet_20251128_0010
+Revises: wallet_20251126_0009
+Create Date: 2025-11-28 00:00:00
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "wallet_20251128_0010"
+down_revision = "wallet_20251126_0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: existing holds keep never expiring
+    op.add_column("wallet_holds", sa.Column("expires_at", sa.DateTime(), nullable=True))
+    # The sweeper claims active holds past their deadline; settled holds stay out of the index
+    op.create_index(
+        "ix_wallet_holds_active_expires",
+        "wallet_holds",
+        ["expires_at"],
+        postgresql_where=sa.text("status = 'active'"),
+        sqlite_where=sa.text("status = 'active'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_wallet_holds_active_expires", table_name="wallet_holds")
+    op.drop_column("wallet_holds", "expires_at")
@@ -0,0 +1,54 @@
+"""Archives for detached ledger and transfer partitions
+
+Revision ID: wallet_20251130_0011
+Revises: wallet_20251128_0010
+Create Date: 2025-11-30 00:00:00
+
+``wallet_ledger_archives`` keeps per-wallet ledger totals of detached
+partitions so full reconciliation does not lose history, and
+``wallet_transfers_archive`` keeps detached transfers replayable.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "wallet_20251130_0011"
+down_revision = "wallet_20251128_0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "wallet_ledger_archives",
+        sa.Column("wallet_id", sa.Integer(), sa.ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("archived_before", sa.DateTime(), nullable=False),
+        sa.Column("last_entry_id", sa.Integer(), nullable=False),
+        sa.Column("ledger_balance", sa.Numeric(18, 2), nullable=False),
+        sa.Column("entry_count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "wallet_transfers_archive",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("source_wallet_id", sa.Integer(), nullable=False),
+        sa.Column("target_wallet_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Numeric(18, 2), nullable=False),
+        sa.Column("currency", sa.String(3), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("idempotency_key", sa.String(64), nullable=False),
+        sa.Column("failure_reason", sa.String(128), nullable=True),
+        sa.Column("external_reference", sa.String(64), nullable=True),
+        sa.Column("ledger_debit_entry_id", sa.Integer(), nullable=True),
+        sa.Column("ledger_credit_entry_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("idempotency_key", name="uq_wallet_transfer_archive_idem"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("wallet_transfers_archive")
+    op.drop_table("wallet_ledger_archives")
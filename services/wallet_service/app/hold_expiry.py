@@ -0,0 +1,174 @@
+"""Release active holds that are past their ``expires_at``.
+
+A hold whose payment is abandoned before capture would otherwise keep its
+funds reserved forever. ``HoldExpirySweeper`` releases expired holds in
+batches with the same ledger effect as ``POST .../holds/{id}/release``: a
+credit of the hold amount keyed ``hold-release-<id>`` and the hold marked
+``released``. Each expiry also records a ``wallet.hold.expired`` outbox event.
+
+Holds are claimed oldest deadline first with ``FOR UPDATE SKIP LOCKED``
+through the partial index on active holds, so any number of sweepers can run
+side by side without releasing a hold twice or waiting on each other. Locks
+are taken hold rows first, then wallet rows in id order, like the release
+endpoint.
+
+Run the sweeper with::
+
+    python -m services.wallet_service.app.hold_expiry --interval 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from .metrics import wallet_credit_total, wallet_holds_expired_total
+from .models import EntryType, Hold, HoldStatus, LedgerEntry, OutboxEvent, Wallet
+from .settings import wallet_settings
+
+
+def _utcnow() -> datetime:
+    # Hold timestamps are naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def release_key(hold: Hold) -> str:
+    """Ledger idempotency key of a hold's release when the caller gave none."""
+    return f"hold-release-{hold.id}"
+
+
+def _expired_payload(hold: Hold, wallet: Wallet) -> dict:
+    return {
+        "hold_id": hold.id,
+        "wallet_id": hold.wallet_id,
+        "amount": str(hold.amount),
+        "currency": wallet.currency,
+        "reference": hold.reference,
+        "expires_at": hold.expires_at.isoformat() if hold.expires_at else None,
+    }
+
+
+class HoldExpirySweeper:
+    """Releases expired active holds in ``SKIP LOCKED`` batches."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        batch_size: int = 500,
+        clock: Callable[[], datetime] = _utcnow,
+    ) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self._clock = clock
+
+    async def run_once(self) -> list[tuple[Hold, str]]:
+        """Release one batch of expired holds; returns each with its wallet currency."""
+        async with self.session_factory() as session, session.begin():
+            holds = list(
+                await session.scalars(
+                    select(Hold)
+                    .where(Hold.status == HoldStatus.active.value, Hold.expires_at <= self._clock())
+                    .order_by(Hold.expires_at, Hold.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                    .execution_options(populate_existing=True)
+                )
+            )
+            if not holds:
+                return []
+            wallets = {
+                wallet.id: wallet
+                for wallet in await session.scalars(
+                    select(Wallet)
+                    .where(Wallet.id.in_({hold.wallet_id for hold in holds}))
+                    .order_by(Wallet.id)
+                    .with_for_update(key_share=True)
+                    .execution_options(populate_existing=True)
+                )
+            }
+            # A client may already have used a release key as a credit key; never credit twice
+            applied = set(
+                await session.execute(
+                    select(LedgerEntry.wallet_id, LedgerEntry.idempotency_key).where(
+                        LedgerEntry.wallet_id.in_(wallets),
+                        LedgerEntry.idempotency_key.in_([release_key(hold) for hold in holds]),
+                    )
+                )
+            )
+            for hold in holds:
+                wallet = wallets[hold.wallet_id]
+                if (wallet.id, release_key(hold)) not in applied:
+                    # Sharded wallets take the credit on the row; that is always correct
+                    wallet.balance = wallet.balance + hold.amount
+                    session.add(
+                        LedgerEntry(
+                            wallet_id=wallet.id,
+                            type=EntryType.credit.value,
+                            amount=hold.amount,
+                            idempotency_key=release_key(hold),
+                            details={"type": "hold_release", "hold_id": hold.id, "reason": "expired"},
+                        )
+                    )
+                hold.status = HoldStatus.released.value
+                session.add(
+                    OutboxEvent(event_type="wallet.hold.expired", payload=_expired_payload(hold, wallet))
+                )
+        return [(hold, wallets[hold.wallet_id].currency) for hold in holds]
+
+    async def run(self) -> int:
+        """Release every hold expired as of now and return how many were released."""
+        released = 0
+        while True:
+            batch = await self.run_once()
+            for _, currency in batch:
+                wallet_credit_total.labels(currency=currency).inc()
+                wallet_holds_expired_total.labels(currency=currency).inc()
+            released += len(batch)
+            if len(batch) < self.batch_size:
+                return released
+
+
+async def run_sweeper(interval_seconds: float, batch_size: int, *, once: bool) -> None:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    sweeper = HoldExpirySweeper(session_factory, batch_size=batch_size)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                released = await sweeper.run()
+                logger.info(
+                    "Hold expiry pass released {} holds in {:.2f}s", released, time.perf_counter() - start
+                )
+            except Exception as exc:  # noqa: BLE001
+                if once:
+                    raise
+                logger.warning("wallet.holds.expiry_pass_failed: {}", exc)
+            if once:
+                break
+            await asyncio.sleep(interval_seconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Release wallet holds past their expiry")
+    parser.add_argument("--interval", type=float, default=settings.hold_expiry_interval_seconds)
+    parser.add_argument("--batch-size", type=int, default=settings.hold_expiry_batch_size)
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+    asyncio.run(run_sweeper(args.interval, args.batch_size, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
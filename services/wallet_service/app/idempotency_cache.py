@@ -0,0 +1,318 @@
+"""Per-process front cache for idempotency keys.
+
+Nearly every money request carries a key that has never been seen, yet the
+locking paths (sharded credits, holds, batches, risk prescreens) used to look
+each key up before doing any work. ``IdempotencyCache`` answers the common
+case in memory:
+
+* A key filter (Bloom filters over ``scope:wallet_id:key``) says whether a
+  key may have been used. "Not seen" lets the caller skip the lookup. It
+  does not mean the key is new: filters only know keys recorded through
+  them (a local filter only this process's, since its last start), so a
+  skipped lookup is backed by the database. A replay the filter missed
+  fails its insert on the unique constraints with ``IntegrityError`` and
+  the caller retries with the lookup, and a debit that would be rejected
+  (risk, funds) looks its key up before answering with the rejection. Two
+  generations of ``window_seconds`` are kept so old keys age out without the
+  filter filling up.
+* With ``WALLET_IDEMPOTENCY_FILTER_BACKEND=redis`` the filter bits live in
+  Redis (``SETBIT``/``GETBIT`` on per-window keys), shared by every replica.
+  When Redis is unreachable the filter answers "maybe", which only costs the
+  lookup it was meant to save.
+* ``ReplayCache`` keeps the original response of recent credits/debits, so a
+  confirmed replay is answered without touching the database.
+
+The local filter is warmed at startup from the most recent ledger and hold
+keys by ``warm_idempotency_cache``. The cache is created lazily by
+``get_idempotency_cache`` and closed in the application lifespan via
+``close_idempotency_cache``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from redis import asyncio as redis_asyncio
+from redis.exceptions import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from .metrics import wallet_idempotency_filter_total, wallet_idempotency_response_cache_total
+from .models import Hold, LedgerEntry
+from .settings import wallet_settings
+
+logger = logging.getLogger(__name__)
+
+
+def _token(scope: str, wallet_id: int, key: str) -> str:
+    return f"{scope}:{wallet_id}:{key}"
+
+
+def bloom_layout(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Bit count and hash count of a Bloom filter for ``capacity`` items at ``error_rate``."""
+    capacity = max(1, capacity)
+    error_rate = min(max(error_rate, 1e-9), 0.5)
+    size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+    return size, max(1, round(size / capacity * math.log(2)))
+
+
+def bloom_positions(item: str, size: int, hashes: int) -> list[int]:
+    # Kirsch-Mitzenmacher double hashing over one 128-bit digest
+    digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+    first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big") | 1
+    return [(first + i * second) % size for i in range(hashes)]
+
+
+class BloomFilter:
+    """Fixed-size in-memory Bloom filter."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        self.size, self.hashes = bloom_layout(capacity, error_rate)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        for pos in bloom_positions(item, self.size, self.hashes):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        positions = bloom_positions(item, self.size, self.hashes)
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+
+class LocalKeyFilter:
+    """In-process filter with two rotating time-window generations."""
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        window_seconds: float = 86_400.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.window_seconds = max(1.0, window_seconds)
+        self._clock = clock
+        self._generations: dict[int, BloomFilter] = {}
+
+    def _generation(self) -> int:
+        generation = int(self._clock() // self.window_seconds)
+        for stale in [gen for gen in self._generations if gen < generation - 1]:
+            del self._generations[stale]
+        return generation
+
+    async def add(self, token: str) -> None:
+        generation = self._generation()
+        bloom = self._generations.get(generation)
+        if bloom is None:
+            bloom = self._generations[generation] = BloomFilter(self.capacity, self.error_rate)
+        bloom.add(token)
+
+    async def might_contain(self, token: str) -> bool:
+        self._generation()
+        return any(token in bloom for bloom in self._generations.values())
+
+    async def aclose(self) -> None:
+        self._generations.clear()
+
+
+class RedisKeyFilter:
+    """Bloom filter bits in Redis, shared by every replica, one bitmap per window."""
+
+    def __init__(
+        self,
+        redis_client: redis_asyncio.Redis,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        window_seconds: float = 86_400.0,
+        prefix: str = "wallet:idempotency",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.redis = redis_client
+        self.size, self.hashes = bloom_layout(capacity, error_rate)
+        self.window_seconds = max(1.0, window_seconds)
+        self.prefix = prefix
+        self._clock = clock
+
+    def _key(self, generation: int) -> str:
+        # The layout is part of the key so resized filters never share bits
+        return f"{self.prefix}:{self.size}:{self.hashes}:{generation}"
+
+    async def add(self, token: str) -> None:
+        generation = int(self._clock() // self.window_seconds)
+        key = self._key(generation)
+        pipe = self.redis.pipeline(transaction=False)
+        for pos in bloom_positions(token, self.size, self.hashes):
+            pipe.setbit(key, pos, 1)
+        pipe.expire(key, math.ceil(self.window_seconds * 2))
+        try:
+            await pipe.execute()
+        except RedisError as exc:
+            logger.warning("wallet.idempotency.filter_unavailable", extra={"error": str(exc)})
+
+    async def might_contain(self, token: str) -> bool:
+        generation = int(self._clock() // self.window_seconds)
+        positions = bloom_positions(token, self.size, self.hashes)
+        pipe = self.redis.pipeline(transaction=False)
+        for gen in (generation, generation - 1):
+            for pos in positions:
+                pipe.getbit(self._key(gen), pos)
+        try:
+            bits = await pipe.execute()
+        except RedisError as exc:
+            logger.warning("wallet.idempotency.filter_unavailable", extra={"error": str(exc)})
+            return True
+        return all(bits[: self.hashes]) or all(bits[self.hashes :])
+
+    async def aclose(self) -> None:
+        await self.redis.aclose()
+
+
+class ReplayCache:
+    """Short-TTL LRU of the original responses to idempotent requests."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 600.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Any | None:
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._entries[token]
+            wallet_idempotency_response_cache_total.labels(result="miss").inc()
+            return None
+        self._entries.move_to_end(token)
+        wallet_idempotency_response_cache_total.labels(result="hit").inc()
+        return entry[1]
+
+    def put(self, token: str, response: Any) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[token] = (self._clock() + self.ttl_seconds, response)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class IdempotencyCache:
+    """Key filter plus replay responses, addressed by ``(scope, wallet_id, key)``.
+
+    Scopes name the unique constraint a key belongs to: ``"ledger"`` for
+    ``ledger_entries`` and ``"hold"`` for ``wallet_holds``.
+    """
+
+    def __init__(
+        self,
+        key_filter: LocalKeyFilter | RedisKeyFilter | None = None,
+        responses: ReplayCache | None = None,
+    ) -> None:
+        self.key_filter = key_filter
+        self.responses = responses if responses is not None else ReplayCache()
+
+    async def may_exist(self, scope: str, wallet_id: int, key: str | None) -> bool:
+        """False when the filter has not seen ``key``; True when a lookup is needed."""
+        if not key:
+            return False
+        if self.key_filter is None:
+            return True
+        found = await self.key_filter.might_contain(_token(scope, wallet_id, key))
+        result = "maybe" if found else "new"
+        wallet_idempotency_filter_total.labels(scope=scope, result=result).inc()
+        return found
+
+    async def record(self, scope: str, wallet_id: int, key: str | None) -> None:
+        """Remember a key once it is committed (or found to be in use)."""
+        if key and self.key_filter is not None:
+            await self.key_filter.add(_token(scope, wallet_id, key))
+
+    def response(self, scope: str, wallet_id: int, key: str | None) -> Any | None:
+        return self.responses.get(_token(scope, wallet_id, key)) if key else None
+
+    def remember_response(self, scope: str, wallet_id: int, key: str | None, response: Any) -> None:
+        if key:
+            self.responses.put(_token(scope, wallet_id, key), response)
+
+    async def aclose(self) -> None:
+        if self.key_filter is not None:
+            await self.key_filter.aclose()
+
+
+async def warm_idempotency_cache(
+    cache: IdempotencyCache, session_factory: async_sessionmaker[AsyncSession], limit: int
+) -> int:
+    """Seed a local key filter with the ``limit`` most recent ledger and hold keys.
+
+    Redis-backed filters are already populated by every replica and are left
+    alone. Returns the number of keys added.
+    """
+    if limit <= 0 or not isinstance(cache.key_filter, LocalKeyFilter):
+        return 0
+    warmed = 0
+    async with session_factory() as session:
+        for scope, model in (("ledger", LedgerEntry), ("hold", Hold)):
+            rows = await session.execute(
+                select(model.wallet_id, model.idempotency_key)
+                .where(model.idempotency_key.is_not(None))
+                .order_by(model.id.desc())
+                .limit(limit)
+            )
+            for wallet_id, key in rows:
+                await cache.record(scope, wallet_id, key)
+                warmed += 1
+    return warmed
+
+
+_idempotency_cache: IdempotencyCache | None = None
+
+
+def get_idempotency_cache() -> IdempotencyCache:
+    """Return the process-wide idempotency cache, creating it from settings on first use."""
+    global _idempotency_cache
+    if _idempotency_cache is None:
+        settings = wallet_settings()
+        backend = settings.idempotency_filter_backend
+        key_filter: LocalKeyFilter | RedisKeyFilter | None = None
+        if backend == "local":
+            key_filter = LocalKeyFilter(
+                capacity=settings.idempotency_filter_capacity,
+                error_rate=settings.idempotency_filter_error_rate,
+                window_seconds=settings.idempotency_filter_window_seconds,
+            )
+        elif backend == "redis":
+            key_filter = RedisKeyFilter(
+                redis_asyncio.from_url(str(settings.redis_url)),
+                capacity=settings.idempotency_filter_capacity,
+                error_rate=settings.idempotency_filter_error_rate,
+                window_seconds=settings.idempotency_filter_window_seconds,
+            )
+        _idempotency_cache = IdempotencyCache(
+            key_filter,
+            ReplayCache(
+                ttl_seconds=settings.idempotency_response_cache_ttl_seconds,
+                max_entries=settings.idempotency_response_cache_max_entries,
+            ),
+        )
+    return _idempotency_cache
+
+
+async def close_idempotency_cache() -> None:
+    global _idempotency_cache
+    if _idempotency_cache is not None:
+        await _idempotency_cache.aclose()
+        _idempotency_cache = None
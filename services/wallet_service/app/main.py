@@ -1,4 +1,5 @@
 from fastapi import FastAPI, HTTPException
+from loguru import logger
 from contextlib import asynccontextmanager
 from pathlib import Path
 import sys
@@ -13,6 +14,14 @@ from shared.errors import http_exception_handler, unhandled_exception_handler
 
 from .settings import wallet_settings
 from .alembic_helper import run_alembic_migrations
+from .db.session import async_session_factory
+from .idempotency_cache import (
+    close_idempotency_cache,
+    get_idempotency_cache,
+    warm_idempotency_cache,
+)
+from .partitions import run_partition_maintenance
+from .risk_client import close_risk_client
 from .routes import register_routes
 from .startup import setup_instrumentation
 
@@ -25,7 +34,20 @@ async def lifespan(app: FastAPI):
     except Exception:
         # Keep the service up even if migrations fail locally
         pass
+    try:
+        # Only create upcoming partitions here; detaching is left to `make wallet-partitions`
+        await run_partition_maintenance(retain_months=0)
+    except Exception as exc:
+        logger.warning(f"Partition maintenance failed (wallet): {exc}")
+    try:
+        await warm_idempotency_cache(
+            get_idempotency_cache(), async_session_factory, wallet_settings().idempotency_filter_warm_keys
+        )
+    except Exception as exc:
+        logger.warning(f"Idempotency cache warm-up failed (wallet): {exc}")
     yield
+    await close_risk_client()
+    await close_idempotency_cache()
 
 
 def create_app() -> FastAPI:
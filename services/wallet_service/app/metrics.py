@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 wallet_credit_total = Counter("wallet_credit_total", "Number of successful wallet credit operations", ["currency"])
 wallet_debit_total = Counter("wallet_debit_total", "Number of successful wallet debit operations", ["currency"])
@@ -25,3 +25,79 @@ wallet_transfer_latency_seconds = Histogram(
     "Latency of wallet transfer processing",
     buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
 )
+wallet_lock_hold_seconds = Histogram(
+    "wallet_lock_hold_seconds",
+    "Time wallet row locks are held, from acquisition to commit or rollback",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+wallet_risk_revalidations_total = Counter(
+    "wallet_risk_revalidations_total",
+    "Debits whose pre-lock risk decision was re-evaluated because the wallet changed",
+)
+wallet_risk_request_seconds = Histogram(
+    "wallet_risk_request_seconds",
+    "Latency of risk service evaluation calls",
+    ["outcome"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2.5),
+)
+wallet_risk_breaker_state = Gauge(
+    "wallet_risk_breaker_state",
+    "Risk client circuit breaker state (0=closed, 1=half-open, 2=open)",
+)
+wallet_risk_decision_cache_total = Counter(
+    "wallet_risk_decision_cache_total", "Risk decision cache lookups", ["result"]
+)
+wallet_risk_unavailable_total = Counter(
+    "wallet_risk_unavailable_total",
+    "Risk evaluations that produced no decision, by reason and applied policy",
+    ["reason", "policy"],
+)
+wallet_outbox_published_total = Counter(
+    "wallet_outbox_published_total", "Outbox events published to Redis Streams", ["event_type"]
+)
+wallet_outbox_batch_seconds = Histogram(
+    "wallet_outbox_batch_seconds",
+    "Time to claim, publish and mark one outbox batch",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+wallet_outbox_lag_seconds = Gauge(
+    "wallet_outbox_lag_seconds", "Age of the oldest unprocessed outbox event"
+)
+wallet_outbox_relay_failures_total = Counter(
+    "wallet_outbox_relay_failures_total", "Outbox relay batches that failed and were retried"
+)
+wallet_outbox_archived_rows_total = Counter(
+    "wallet_outbox_archived_rows_total", "Processed outbox events moved to archive files"
+)
+wallet_outbox_archived_bytes_total = Counter(
+    "wallet_outbox_archived_bytes_total", "Compressed bytes written to outbox archive files"
+)
+wallet_balance_snapshots_updated_total = Counter(
+    "wallet_balance_snapshots_updated_total", "Wallet balance snapshots advanced by the snapshot job"
+)
+wallet_reconciliation_entries_scanned = Histogram(
+    "wallet_reconciliation_entries_scanned",
+    "Ledger entries aggregated per wallet reconciliation (entries after the snapshot)",
+    buckets=(0, 10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+wallet_statement_export_rows_total = Counter(
+    "wallet_statement_export_rows_total", "Ledger entries streamed by statement exports", ["format"]
+)
+wallet_balance_shards_swept_total = Counter(
+    "wallet_balance_shards_swept_total", "Balance shards folded into their wallet row by the rebalancer"
+)
+wallet_balance_shard_debit_drains_total = Counter(
+    "wallet_balance_shard_debit_drains_total", "Debits that had to fold balance shards in under the wallet lock"
+)
+wallet_idempotency_filter_total = Counter(
+    "wallet_idempotency_filter_total",
+    "Idempotency key filter answers (new skips the replay lookup)",
+    ["scope", "result"],
+)
+wallet_idempotency_response_cache_total = Counter(
+    "wallet_idempotency_response_cache_total", "Replay response cache lookups", ["result"]
+)
+wallet_holds_expired_total = Counter(
+    "wallet_holds_expired_total", "Active holds released by the expiry sweeper", ["currency"]
+)
@@ -1,16 +1,26 @@
-from .wallet import Wallet
+from .wallet import Wallet, with_entries, with_holds
 from .ledger_entry import LedgerEntry, EntryType
 from .hold import Hold, HoldStatus
-from .transfer import Transfer, TransferStatus
-from .outbox_event import OutboxEvent
+from .transfer import ArchivedTransfer, Transfer, TransferStatus
+from .outbox_event import OUTBOX_NOTIFY_CHANNEL, OutboxEvent
+from .balance_snapshot import BalanceSnapshot
+from .balance_shard import WalletBalanceShard
+from .ledger_archive import LedgerArchive
 
 __all__ = [
     "Wallet",
+    "with_entries",
+    "with_holds",
     "LedgerEntry",
     "EntryType",
     "Hold",
     "HoldStatus",
     "Transfer",
     "TransferStatus",
+    "ArchivedTransfer",
     "OutboxEvent",
+    "OUTBOX_NOTIFY_CHANNEL",
+    "BalanceSnapshot",
+    "WalletBalanceShard",
+    "LedgerArchive",
 ]
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import ForeignKey, Numeric, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from services.wallet_service.app.db.base import Base
+
+
+class WalletBalanceShard(Base):
+    """One credit-receiving sub-balance of a sharded wallet.
+
+    A sharded wallet's balance is ``wallets.balance`` plus the sum of its
+    shards. Credits land on a single shard row, so concurrent credits to a
+    hot wallet do not queue on the wallet row lock.
+    """
+
+    __tablename__ = "wallet_balance_shards"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True)
+    shard: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=Decimal("0.00"), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=text("CURRENT_TIMESTAMP"), nullable=False
+    )
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import ForeignKey, Numeric, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from services.wallet_service.app.db.base import Base
+
+
+class BalanceSnapshot(Base):
+    """Ledger totals for a wallet up to and including ``last_entry_id``.
+
+    Maintained by the balance snapshot job; reconciliation adds only the
+    entries after ``last_entry_id`` on top of it.
+    """
+
+    __tablename__ = "wallet_balance_snapshots"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True)
+    last_entry_id: Mapped[int] = mapped_column(nullable=False)
+    ledger_balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    entry_count: Mapped[int] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=text("CURRENT_TIMESTAMP"), nullable=False
+    )
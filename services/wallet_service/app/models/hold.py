@@ -4,7 +4,7 @@ from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 
-from sqlalchemy import ForeignKey, JSON, Numeric, String, UniqueConstraint, text
+from sqlalchemy import ForeignKey, Index, JSON, Numeric, String, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from services.wallet_service.app.db.base import Base
@@ -20,6 +20,13 @@ class Hold(Base):
     __tablename__ = "wallet_holds"
     __table_args__ = (
         UniqueConstraint("wallet_id", "idempotency_key", name="uq_wallet_hold_idem"),
+        # The expiry sweeper only ever scans active holds, oldest deadline first
+        Index(
+            "ix_wallet_holds_active_expires",
+            "expires_at",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -29,7 +36,10 @@ class Hold(Base):
     idempotency_key: Mapped[str] = mapped_column(String(64), nullable=False)
     reference: Mapped[str | None] = mapped_column(String(64), nullable=True, default=None)
     details: Mapped[dict | None] = mapped_column(JSON, nullable=True, default=None)
-    ledger_entry_id: Mapped[int | None] = mapped_column(ForeignKey("ledger_entries.id"), nullable=True)
+    # No FK: ledger_entries is partitioned on PostgreSQL and keyed by (id, created_at)
+    ledger_entry_id: Mapped[int | None] = mapped_column(nullable=True)
+    # Naive UTC; active holds past it are released by the expiry sweeper. None never expires.
+    expires_at: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
     created_at: Mapped[datetime] = mapped_column(server_default=text("CURRENT_TIMESTAMP"), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         server_default=text("CURRENT_TIMESTAMP"),
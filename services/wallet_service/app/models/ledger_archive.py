@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import ForeignKey, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from services.wallet_service.app.db.base import Base
+
+
+class LedgerArchive(Base):
+    """Ledger totals of a wallet's entries in detached partitions.
+
+    Every entry of the wallet created before ``archived_before`` is folded in
+    here by ``app.partitions`` before its partition is detached, so full
+    reconciliation sums this row plus the entries from ``archived_before`` on.
+    """
+
+    __tablename__ = "wallet_ledger_archives"
+
+    wallet_id: Mapped[int] = mapped_column(ForeignKey("wallets.id", ondelete="CASCADE"), primary_key=True)
+    archived_before: Mapped[datetime] = mapped_column(nullable=False)
+    last_entry_id: Mapped[int] = mapped_column(nullable=False)
+    ledger_balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    entry_count: Mapped[int] = mapped_column(nullable=False)
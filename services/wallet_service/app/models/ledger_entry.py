@@ -5,6 +5,7 @@ from decimal import Decimal
 from enum import Enum
 
 from sqlalchemy import String, text, Numeric, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from services.wallet_service.app.db.base import Base
@@ -17,8 +18,20 @@ class EntryType(str, Enum):
 
 class LedgerEntry(Base):
     __tablename__ = "ledger_entries"
+    # On PostgreSQL the table is partitioned by month and uq_ledger_wallet_idem
+    # lives on the ledger_idempotency_keys registry (see migration 0008)
     __table_args__ = (
         Index("ix_ledger_wallet_created", "wallet_id", "created_at"),
+        # Range scans of a wallet's entries after a balance snapshot
+        Index("ix_ledger_wallet_id_id", "wallet_id", "id"),
+        # Statement filters: keyset order (id) within wallet + filter column
+        Index("ix_ledger_wallet_type_id", "wallet_id", "type", "id"),
+        Index(
+            "ix_ledger_wallet_details_type_id",
+            "wallet_id",
+            text("(metadata ->> 'type')"),
+            "id",
+        ).ddl_if(dialect="postgresql"),
         UniqueConstraint("wallet_id", "idempotency_key", name="uq_ledger_wallet_idem"),
     )
 
@@ -28,7 +41,9 @@ class LedgerEntry(Base):
     amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
     idempotency_key: Mapped[str | None] = mapped_column(String(64), nullable=True, default=None)
     # Use attribute name 'details' to avoid reserved declarative name 'metadata'; underlying column kept as 'metadata'.
-    details: Mapped[dict | None] = mapped_column("metadata", JSON, nullable=True, default=None)
+    details: Mapped[dict | None] = mapped_column(
+        "metadata", JSON().with_variant(JSONB(), "postgresql"), nullable=True, default=None
+    )
     created_at: Mapped[datetime] = mapped_column(
         server_default=text("CURRENT_TIMESTAMP"), nullable=False
     )
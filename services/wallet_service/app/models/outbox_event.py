@@ -8,10 +8,20 @@ from sqlalchemy.orm import Mapped, mapped_column
 from services.wallet_service.app.db.base import Base
 
 
+# Channel NOTIFYed by the insert trigger (migration 0005) and LISTENed on by the relay
+OUTBOX_NOTIFY_CHANNEL = "wallet_outbox"
+
+
 class OutboxEvent(Base):
     __tablename__ = "wallet_outbox_events"
     __table_args__ = (
         Index("ix_wallet_outbox_processed", "processed_at"),
+        Index(
+            "ix_wallet_outbox_unprocessed",
+            "id",
+            postgresql_where=text("processed_at IS NULL"),
+            sqlite_where=text("processed_at IS NULL"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
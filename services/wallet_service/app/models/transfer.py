@@ -19,6 +19,8 @@ class TransferStatus(str, Enum):
 
 class Transfer(Base):
     __tablename__ = "wallet_transfers"
+    # On PostgreSQL the table is partitioned by month and uq_wallet_transfer_idem
+    # lives on the wallet_transfer_idempotency_keys registry (see migration 0008)
     __table_args__ = (
         UniqueConstraint("idempotency_key", name="uq_wallet_transfer_idem"),
         Index("ix_wallet_transfer_source_created", "source_wallet_id", "created_at"),
@@ -34,10 +36,38 @@ class Transfer(Base):
     idempotency_key: Mapped[str] = mapped_column(String(64), nullable=False)
     failure_reason: Mapped[str | None] = mapped_column(String(128), nullable=True)
     external_reference: Mapped[str | None] = mapped_column(String(64), nullable=True)
-    ledger_debit_entry_id: Mapped[int | None] = mapped_column(ForeignKey("ledger_entries.id"), nullable=True)
-    ledger_credit_entry_id: Mapped[int | None] = mapped_column(ForeignKey("ledger_entries.id"), nullable=True)
+    # No FKs: ledger_entries is partitioned on PostgreSQL and keyed by (id, created_at)
+    ledger_debit_entry_id: Mapped[int | None] = mapped_column(nullable=True)
+    ledger_credit_entry_id: Mapped[int | None] = mapped_column(nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(server_default=text("CURRENT_TIMESTAMP"), nullable=False)
     updated_at: Mapped[datetime] = mapped_column(
         server_default=text("CURRENT_TIMESTAMP"), onupdate=text("CURRENT_TIMESTAMP"), nullable=False
     )
+
+
+class ArchivedTransfer(Base):
+    """Copy of a transfer whose partition was detached.
+
+    ``app.partitions`` copies a cold ``wallet_transfers`` partition here
+    before detaching it, so a replayed idempotency key still answers with the
+    original transfer instead of only tripping the key registry.
+    """
+
+    __tablename__ = "wallet_transfers_archive"
+    __table_args__ = (UniqueConstraint("idempotency_key", name="uq_wallet_transfer_archive_idem"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    user_id: Mapped[int] = mapped_column(nullable=False)
+    source_wallet_id: Mapped[int] = mapped_column(nullable=False)
+    target_wallet_id: Mapped[int] = mapped_column(nullable=False)
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    idempotency_key: Mapped[str] = mapped_column(String(64), nullable=False)
+    failure_reason: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    external_reference: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    ledger_debit_entry_id: Mapped[int | None] = mapped_column(nullable=True)
+    ledger_credit_entry_id: Mapped[int | None] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(nullable=False)
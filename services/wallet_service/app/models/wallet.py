@@ -4,7 +4,8 @@ from datetime import datetime
 from decimal import Decimal
 
 from sqlalchemy import String, text, Numeric
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
 from services.wallet_service.app.db.base import Base
 
@@ -18,6 +19,8 @@ class Wallet(Base):
     status: Mapped[str] = mapped_column(String(20), default="active", nullable=False)
     # Stored, authoritative balance (use DECIMAL for money)
     balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), default=Decimal("0.00"), nullable=False)
+    # Number of ``wallet_balance_shards`` rows credits are spread over (0 = unsharded)
+    balance_shards: Mapped[int] = mapped_column(default=0, server_default=text("0"), nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(
         server_default=text("CURRENT_TIMESTAMP"), nullable=False
@@ -27,15 +30,31 @@ class Wallet(Base):
     )
 
     # relationships
+    # Child collections grow without bound, so they are never loaded
+    # implicitly: money paths only touch the wallet row, and callers that
+    # really need the collections opt in with ``with_entries()`` /
+    # ``with_holds()``. Deletes rely on the FK ``ON DELETE CASCADE``.
     entries = relationship(
         "LedgerEntry",
         back_populates="wallet",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
     holds = relationship(
         "Hold",
         back_populates="wallet",
         cascade="all, delete-orphan",
-        lazy="selectin",
+        lazy="raise_on_sql",
+        passive_deletes=True,
     )
+
+
+def with_entries() -> LoaderOption:
+    """Loader option that eagerly loads ``Wallet.entries`` for a query."""
+    return selectinload(Wallet.entries)
+
+
+def with_holds() -> LoaderOption:
+    """Loader option that eagerly loads ``Wallet.holds`` for a query."""
+    return selectinload(Wallet.holds)
@@ -0,0 +1,189 @@
+"""Archive and delete processed wallet outbox events.
+
+Once the relay has published an event the row is only kept for audit, so
+this job moves processed events older than the retention window out of
+``wallet_outbox_events`` into gzip-compressed NDJSON files::
+
+    python -m services.wallet_service.app.outbox_compaction --retention-days 14
+
+Work proceeds in bounded batches in id order. Each batch is written to its own
+archive file (``wallet_outbox_<first>_<last>.ndjson.gz``, written to a
+temporary name and renamed once fsynced) before any row is deleted, and the
+delete itself is split into short transactions of ``delete_chunk_size`` rows
+so the table is never locked for long. A crash can leave an archived batch
+undeleted; the next run re-archives it under the same file name.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from loguru import logger
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from .metrics import wallet_outbox_archived_bytes_total, wallet_outbox_archived_rows_total
+from .models import OutboxEvent
+from .settings import wallet_settings
+
+
+@dataclass
+class CompactionReport:
+    rows_archived: int = 0
+    rows_deleted: int = 0
+    bytes_archived: int = 0
+    files: list[Path] = field(default_factory=list)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _record(event: OutboxEvent) -> dict[str, Any]:
+    return {
+        "id": event.id,
+        "event_type": event.event_type,
+        "payload": event.payload,
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+        "processed_at": event.processed_at.isoformat() if event.processed_at else None,
+    }
+
+
+def _write_archive(path: Path, records: list[dict[str, Any]]) -> int:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+        for record in records:
+            fh.write(json.dumps(record, separators=(",", ":"), default=str))
+            fh.write("\n")
+    with open(tmp_path, "rb") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    return path.stat().st_size
+
+
+class OutboxCompactor:
+    """Moves processed outbox events past retention into archive files."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        archive_dir: Path,
+        *,
+        retention: timedelta = timedelta(days=14),
+        batch_size: int = 10_000,
+        delete_chunk_size: int = 1_000,
+        clock: Callable[[], datetime] = _utcnow,
+    ) -> None:
+        self.session_factory = session_factory
+        self.archive_dir = Path(archive_dir)
+        self.retention = retention
+        self.batch_size = max(1, batch_size)
+        self.delete_chunk_size = max(1, delete_chunk_size)
+        self._clock = clock
+
+    async def _next_batch(self, cutoff: datetime, after_id: int) -> list[OutboxEvent]:
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(OutboxEvent)
+                .where(
+                    OutboxEvent.processed_at.is_not(None),
+                    OutboxEvent.processed_at < cutoff,
+                    OutboxEvent.id > after_id,
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+            )
+            return list(result.scalars().all())
+
+    async def _delete(self, ids: list[int]) -> int:
+        deleted = 0
+        for start in range(0, len(ids), self.delete_chunk_size):
+            chunk = ids[start : start + self.delete_chunk_size]
+            async with self.session_factory() as session:
+                async with session.begin():
+                    result = await session.execute(
+                        delete(OutboxEvent)
+                        .where(OutboxEvent.id.in_(chunk), OutboxEvent.processed_at.is_not(None))
+                        .execution_options(synchronize_session=False)
+                    )
+            deleted += result.rowcount or 0
+        return deleted
+
+    async def run(self, max_batches: int | None = None) -> CompactionReport:
+        """Archive and delete eligible events, at most ``max_batches`` batches."""
+        report = CompactionReport()
+        cutoff = self._clock() - self.retention
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        after_id = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            events = await self._next_batch(cutoff, after_id)
+            if not events:
+                break
+            batches += 1
+            first_id, after_id = events[0].id, events[-1].id
+            path = self.archive_dir / f"wallet_outbox_{first_id:012d}_{after_id:012d}.ndjson.gz"
+            size = await asyncio.to_thread(_write_archive, path, [_record(event) for event in events])
+            deleted = await self._delete([event.id for event in events])
+
+            report.rows_archived += len(events)
+            report.rows_deleted += deleted
+            report.bytes_archived += size
+            report.files.append(path)
+            wallet_outbox_archived_rows_total.inc(len(events))
+            wallet_outbox_archived_bytes_total.inc(size)
+            logger.info(
+                "Archived outbox events {}..{} ({} rows, {} bytes) to {}", first_id, after_id, len(events), size, path
+            )
+        return report
+
+
+async def run_compaction(
+    archive_dir: Path, retention_days: float, batch_size: int, delete_chunk_size: int
+) -> CompactionReport:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    compactor = OutboxCompactor(
+        session_factory,
+        archive_dir,
+        retention=timedelta(days=retention_days),
+        batch_size=batch_size,
+        delete_chunk_size=delete_chunk_size,
+    )
+    try:
+        return await compactor.run()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Archive and delete processed wallet outbox events")
+    parser.add_argument("--archive-dir", type=Path, default=Path(settings.outbox_archive_dir))
+    parser.add_argument("--retention-days", type=float, default=settings.outbox_retention_days)
+    parser.add_argument("--batch-size", type=int, default=settings.outbox_archive_batch_size)
+    parser.add_argument("--delete-chunk-size", type=int, default=settings.outbox_delete_chunk_size)
+    args = parser.parse_args()
+    report = asyncio.run(
+        run_compaction(args.archive_dir, args.retention_days, args.batch_size, args.delete_chunk_size)
+    )
+    logger.info(
+        "Outbox compaction archived {} rows ({} bytes in {} files) and deleted {}",
+        report.rows_archived,
+        report.bytes_archived,
+        len(report.files),
+        report.rows_deleted,
+    )
+
+
+if __name__ == "__main__":
+    main()
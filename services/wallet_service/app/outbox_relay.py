@@ -0,0 +1,253 @@
+"""Relay wallet outbox events to Redis Streams.
+
+Runs as its own process next to the wallet service::
+
+    python -m services.wallet_service.app.outbox_relay --workers 4
+
+Each worker loops over ``OutboxRelay.run_once``: claim the oldest unprocessed
+rows with ``FOR UPDATE SKIP LOCKED`` (so parallel workers and replicas never
+claim the same event), publish them with one pipelined round-trip of ``XADD``
+calls, then mark the whole batch processed in a single ``UPDATE`` and commit.
+Delivery is at-least-once: a crash between publish and commit re-sends the
+batch, so consumers dedupe on the ``id`` field.
+
+A full batch is followed immediately by the next claim; otherwise the worker
+sleeps until the poll interval elapses or, on PostgreSQL, until the
+``OUTBOX_NOTIFY_CHANNEL`` NOTIFY fired by the insert trigger wakes it up. The
+LISTEN connection is checked every poll interval and re-established with
+backoff when it drops; until then the workers fall back to polling.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import signal
+import time
+from contextlib import suppress
+from datetime import datetime, timezone
+
+from loguru import logger
+from prometheus_client import start_http_server
+from redis import asyncio as redis_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from .metrics import (
+    wallet_outbox_batch_seconds,
+    wallet_outbox_lag_seconds,
+    wallet_outbox_published_total,
+    wallet_outbox_relay_failures_total,
+)
+from .models import OUTBOX_NOTIFY_CHANNEL, OutboxEvent
+from .settings import wallet_settings
+
+
+class OutboxRelay:
+    """Claims, publishes and marks processed batches of outbox events."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        redis_client: redis_asyncio.Redis,
+        *,
+        stream: str = "wallet-events",
+        stream_maxlen: int | None = 1_000_000,
+        batch_size: int = 500,
+        poll_interval_seconds: float = 1.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.redis = redis_client
+        self.stream = stream
+        self.stream_maxlen = stream_maxlen
+        self.batch_size = max(1, batch_size)
+        self.poll_interval_seconds = poll_interval_seconds
+
+    def _fields(self, event: OutboxEvent) -> dict[str, str]:
+        return {
+            "id": str(event.id),
+            "event_type": event.event_type,
+            "payload": json.dumps(event.payload, separators=(",", ":"), default=str),
+            "created_at": event.created_at.isoformat() if event.created_at else "",
+        }
+
+    async def run_once(self) -> int:
+        """Relay one batch and return the number of events published."""
+        start = time.perf_counter()
+        async with self.session_factory() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(OutboxEvent)
+                    .where(OutboxEvent.processed_at.is_(None))
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                events = result.scalars().all()
+                if not events:
+                    return 0
+
+                pipe = self.redis.pipeline(transaction=False)
+                for event in events:
+                    pipe.xadd(self.stream, self._fields(event), maxlen=self.stream_maxlen, approximate=True)
+                await pipe.execute()
+
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([event.id for event in events]))
+                    .values(processed_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+
+        for event in events:
+            wallet_outbox_published_total.labels(event_type=event.event_type).inc()
+        wallet_outbox_batch_seconds.observe(time.perf_counter() - start)
+        return len(events)
+
+    async def refresh_lag(self) -> float:
+        """Publish and return the age in seconds of the oldest unprocessed event."""
+        async with self.session_factory() as session:
+            oldest = await session.scalar(
+                select(func.min(OutboxEvent.created_at)).where(OutboxEvent.processed_at.is_(None))
+            )
+        lag = 0.0
+        if oldest is not None:
+            # created_at is a naive server-side UTC timestamp
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            lag = max(0.0, (now - oldest.replace(tzinfo=None)).total_seconds())
+        wallet_outbox_lag_seconds.set(lag)
+        return lag
+
+    async def run(self, wake: asyncio.Event, stop: asyncio.Event) -> None:
+        """Relay until ``stop`` is set, sleeping on ``wake`` between partial batches."""
+        while not stop.is_set():
+            try:
+                published = await self.run_once()
+            except Exception as exc:  # noqa: BLE001
+                wallet_outbox_relay_failures_total.inc()
+                logger.warning("wallet.outbox.relay_failed: {}", exc)
+                published = 0
+            if published >= self.batch_size:
+                continue
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=self.poll_interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def _listen(
+    engine: AsyncEngine,
+    wakes: list[asyncio.Event],
+    stop: asyncio.Event,
+    *,
+    check_interval_seconds: float = 1.0,
+    backoff_seconds: float = 1.0,
+    max_backoff_seconds: float = 30.0,
+) -> None:
+    """Wake every worker on NOTIFY until ``stop`` is set (PostgreSQL only).
+
+    A LISTEN connection that fails its periodic check is discarded and opened
+    again, backing off exponentially while the database stays unreachable.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    def _notify(*_args) -> None:
+        for wake in wakes:
+            wake.set()
+
+    delay = backoff_seconds
+    while not stop.is_set():
+        try:
+            async with engine.connect() as conn:
+                driver = (await conn.get_raw_connection()).driver_connection
+                try:
+                    await driver.add_listener(OUTBOX_NOTIFY_CHANNEL, _notify)
+                    delay = backoff_seconds
+                    # Events inserted while nobody was listening were never announced
+                    _notify()
+                    while not stop.is_set():
+                        try:
+                            await asyncio.wait_for(stop.wait(), timeout=check_interval_seconds)
+                        except TimeoutError:
+                            await driver.execute("SELECT 1")
+                    await driver.remove_listener(OUTBOX_NOTIFY_CHANNEL, _notify)
+                except Exception:
+                    await conn.invalidate()
+                    raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("wallet.outbox.listen_failed: {} (retrying in {:.1f}s)", exc, delay)
+            with suppress(TimeoutError):
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            delay = min(delay * 2, max_backoff_seconds)
+
+
+async def _monitor_lag(relay: OutboxRelay, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await relay.refresh_lag()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("wallet.outbox.lag_refresh_failed: {}", exc)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=relay.poll_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_relay(workers: int, batch_size: int, poll_interval_seconds: float) -> None:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True, pool_size=workers + 2)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    redis_client = redis_asyncio.from_url(str(settings.redis_url))
+    relay = OutboxRelay(
+        session_factory,
+        redis_client,
+        stream=settings.outbox_stream,
+        stream_maxlen=settings.outbox_stream_maxlen,
+        batch_size=batch_size,
+        poll_interval_seconds=poll_interval_seconds,
+    )
+
+    stop = asyncio.Event()
+    wakes = [asyncio.Event() for _ in range(workers)]
+
+    def _shutdown() -> None:
+        stop.set()
+        for wake in wakes:
+            wake.set()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, _shutdown)
+
+    logger.info(
+        "Outbox relay started: workers={} batch_size={} stream={}", workers, batch_size, settings.outbox_stream
+    )
+    try:
+        await asyncio.gather(
+            _listen(engine, wakes, stop, check_interval_seconds=poll_interval_seconds),
+            _monitor_lag(relay, stop),
+            *(relay.run(wake, stop) for wake in wakes),
+        )
+    finally:
+        await redis_client.aclose()
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Relay wallet outbox events to Redis Streams")
+    parser.add_argument("--workers", type=int, default=settings.outbox_relay_workers)
+    parser.add_argument("--batch-size", type=int, default=settings.outbox_batch_size)
+    parser.add_argument("--poll-interval", type=float, default=settings.outbox_poll_interval_seconds)
+    parser.add_argument("--metrics-port", type=int, default=settings.outbox_metrics_port)
+    args = parser.parse_args()
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+    asyncio.run(run_relay(max(1, args.workers), args.batch_size, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
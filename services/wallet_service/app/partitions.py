@@ -0,0 +1,317 @@
+"""Runtime maintenance of the monthly ledger and transfer partitions.
+
+Migration ``wallet_20251124_0008`` turns ``ledger_entries`` and
+``wallet_transfers`` into ``RANGE (created_at)`` partitioned tables on
+PostgreSQL. This module keeps them healthy:
+
+* ``ensure_future_partitions`` creates ``<table>_pYYYY_MM`` partitions for the
+  current month and ``months_ahead`` months after it. There is no default
+  partition (it would block ``DETACH ... CONCURRENTLY``), so inserts fail once
+  the last partition is outgrown: the service runs it at startup and the
+  ``wallet-partitions`` job repeats it every ``partition_interval_seconds``.
+* ``detach_cold_partitions`` detaches partitions that ended more than
+  ``retain_months`` months ago with ``DETACH PARTITION ... CONCURRENTLY``, so
+  they can be archived or dropped without blocking writers. It only runs in
+  the partitions job (a single process), never at service startup, so
+  replicas do not scan cold partitions or race each other's detaches while
+  booting.
+
+A ledger partition is only detached once every entry in it is covered by a
+balance snapshot, and its per-wallet totals are first folded into
+``wallet_ledger_archives`` in the same pass. Full reconciliation and full
+snapshot rebuilds add those totals to the entries created from
+``archived_before`` on, so history is never lost. Partitions are detached
+oldest first and the pass stops at the first one that has to stay attached,
+which keeps every wallet's archive contiguous; a crash between folding and
+detaching is harmless because the attached copy is filtered out by
+``archived_before``.
+
+Idempotency stays correct across partitions (and after detaching) through the
+``ledger_idempotency_keys`` / ``wallet_transfer_idempotency_keys`` registries
+maintained by insert triggers. A transfer partition is only detached once it
+has no pending transfers, and its rows are copied to
+``wallet_transfers_archive`` first, so a replayed key whose transfer was
+detached still answers with the stored transfer. A credit, debit or hold key
+whose ledger entry was detached has nothing left to replay and is answered
+with 409 "Idempotency key already used".
+
+Run the job with::
+
+    python -m services.wallet_service.app.partitions --interval 21600 --retain-months 24
+
+or a single pass with ``--once`` (``make wallet-partitions``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import re
+import time
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+
+from .models import ArchivedTransfer
+from .settings import wallet_settings
+
+PARTITIONED_TABLES = ("ledger_entries", "wallet_transfers")
+
+_TRANSFER_COLUMNS = ", ".join(column.name for column in ArchivedTransfer.__table__.columns)
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def add_months(value: date, months: int) -> date:
+    """First day of the month ``months`` after ``value``'s month."""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def _utc_today() -> date:
+    # Partition bounds are compared against UTC ``created_at`` values
+    return datetime.now(UTC).date()
+
+
+def planned_partitions(table: str, today: date, months_ahead: int) -> list[tuple[str, date, date]]:
+    """``(name, start, end)`` of the current month's partition and ``months_ahead`` after it."""
+    this_month = today.replace(day=1)
+    return [
+        (partition_name(table, start), start, add_months(start, 1))
+        for start in (add_months(this_month, offset) for offset in range(months_ahead + 1))
+    ]
+
+
+def create_partition_sql(table: str, name: str, start: date, end: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    )
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+    )
+    return result.first() is not None
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> list[tuple[str, date | None]]:
+    """Return ``(name, upper bound)`` for each attached partition of ``table``."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(:table)
+            ORDER BY child.relname
+            """
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for name, bound in result.all():
+        match = _UPPER_BOUND.search(bound or "")
+        partitions.append((name, date.fromisoformat(match.group(1)[:10]) if match else None))
+    return partitions
+
+
+class PartitionManager:
+    """Creates upcoming monthly partitions and detaches cold ones."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        *,
+        months_ahead: int = 3,
+        retain_months: int = 0,
+        today: Callable[[], date] = _utc_today,
+    ) -> None:
+        self.engine = engine
+        self.months_ahead = max(1, months_ahead)
+        self.retain_months = retain_months
+        self._today = today
+
+    async def ensure_future_partitions(self, table: str) -> list[str]:
+        created = []
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not await is_partitioned(conn, table):
+                return created
+            existing = {name for name, _ in await list_partitions(conn, table)}
+            for name, start, end in planned_partitions(table, self._today(), self.months_ahead):
+                if name in existing:
+                    continue
+                try:
+                    await conn.execute(text(create_partition_sql(table, name, start, end)))
+                except Exception as exc:  # noqa: BLE001
+                    # A bound overlapping the legacy partition or a concurrent replica
+                    logger.warning("Could not create partition {}: {}", name, exc)
+                    continue
+                created.append(name)
+                logger.info("Created partition {}", name)
+        return created
+
+    async def _covered_by_snapshots(self, conn: AsyncConnection, partition: str) -> bool:
+        result = await conn.execute(
+            text(
+                f"""
+                SELECT 1 FROM {partition} e
+                LEFT JOIN wallet_balance_snapshots s ON s.wallet_id = e.wallet_id
+                WHERE s.last_entry_id IS NULL OR e.id > s.last_entry_id
+                LIMIT 1
+                """
+            )
+        )
+        return result.first() is None
+
+    async def _has_pending_transfers(self, conn: AsyncConnection, partition: str) -> bool:
+        result = await conn.execute(text(f"SELECT 1 FROM {partition} WHERE status = 'pending' LIMIT 1"))
+        return result.first() is not None
+
+    async def _archive_ledger_partition(self, partition: str, upper: date) -> None:
+        # Wallets already archived up to this bound were folded by an interrupted pass
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text(
+                    f"""
+                    INSERT INTO wallet_ledger_archives
+                        (wallet_id, archived_before, last_entry_id, ledger_balance, entry_count)
+                    SELECT wallet_id, :upper, MAX(id),
+                           SUM(CASE WHEN type = 'credit' THEN amount ELSE -amount END), COUNT(*)
+                    FROM {partition}
+                    GROUP BY wallet_id
+                    ON CONFLICT (wallet_id) DO UPDATE SET
+                        archived_before = EXCLUDED.archived_before,
+                        last_entry_id = GREATEST(wallet_ledger_archives.last_entry_id, EXCLUDED.last_entry_id),
+                        ledger_balance = wallet_ledger_archives.ledger_balance + EXCLUDED.ledger_balance,
+                        entry_count = wallet_ledger_archives.entry_count + EXCLUDED.entry_count
+                    WHERE wallet_ledger_archives.archived_before < EXCLUDED.archived_before
+                    """
+                ),
+                {"upper": datetime.combine(upper, datetime.min.time())},
+            )
+
+    async def _archive_transfer_partition(self, partition: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                text(
+                    f"""
+                    INSERT INTO wallet_transfers_archive ({_TRANSFER_COLUMNS})
+                    SELECT {_TRANSFER_COLUMNS} FROM {partition}
+                    ON CONFLICT (idempotency_key) DO NOTHING
+                    """
+                )
+            )
+
+    async def detach_cold_partitions(self, table: str) -> list[str]:
+        if self.retain_months <= 0:
+            return []
+        detached = []
+        cutoff = add_months(self._today().replace(day=1), -self.retain_months)
+        # DETACH ... CONCURRENTLY cannot run inside a transaction block
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not await is_partitioned(conn, table):
+                return detached
+            partitions = await list_partitions(conn, table)
+            for name, upper in sorted(partitions, key=lambda partition: partition[1] or date.max):
+                if upper is None or upper > cutoff:
+                    break
+                if table == "ledger_entries":
+                    if not await self._covered_by_snapshots(conn, name):
+                        # Later partitions wait too, or archives would skip this one's entries
+                        logger.warning(
+                            "Keeping partition {} and newer attached: entries not yet covered by snapshots", name
+                        )
+                        break
+                    await self._archive_ledger_partition(name, upper)
+                elif table == "wallet_transfers":
+                    if await self._has_pending_transfers(conn, name):
+                        logger.warning("Keeping partition {} attached: it has pending transfers", name)
+                        continue
+                    await self._archive_transfer_partition(name)
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY"))
+                detached.append(name)
+                logger.info("Detached partition {} (ended {})", name, upper)
+        return detached
+
+    async def run(self) -> dict[str, dict[str, list[str]]]:
+        report = {}
+        for table in PARTITIONED_TABLES:
+            report[table] = {
+                "created": await self.ensure_future_partitions(table),
+                "detached": await self.detach_cold_partitions(table),
+            }
+        return report
+
+
+async def run_partition_maintenance(
+    months_ahead: int | None = None, retain_months: int | None = None
+) -> dict[str, dict[str, list[str]]]:
+    """One maintenance pass on a short-lived engine, defaulting to settings."""
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    try:
+        return await PartitionManager(
+            engine,
+            months_ahead=settings.partition_months_ahead if months_ahead is None else months_ahead,
+            retain_months=settings.partition_retain_months if retain_months is None else retain_months,
+        ).run()
+    finally:
+        await engine.dispose()
+
+
+async def run_partition_job(
+    interval_seconds: float, months_ahead: int, retain_months: int, *, once: bool
+) -> None:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    manager = PartitionManager(engine, months_ahead=months_ahead, retain_months=retain_months)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                report = await manager.run()
+                for table, actions in report.items():
+                    logger.info(
+                        "Partition maintenance on {} created {} and detached {} in {:.2f}s",
+                        table,
+                        actions["created"],
+                        actions["detached"],
+                        time.perf_counter() - start,
+                    )
+            except Exception as exc:  # noqa: BLE001
+                if once:
+                    raise
+                logger.warning("wallet.partitions.maintenance_failed: {}", exc)
+            if once:
+                break
+            await asyncio.sleep(interval_seconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Create upcoming and detach cold wallet partitions")
+    parser.add_argument("--interval", type=float, default=settings.partition_interval_seconds)
+    parser.add_argument("--months-ahead", type=int, default=settings.partition_months_ahead)
+    parser.add_argument("--retain-months", type=int, default=settings.partition_retain_months)
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+    asyncio.run(run_partition_job(args.interval, args.months_ahead, args.retain_months, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Fleet-wide ledger drift scanner.
+
+Checks every wallet's stored balance against its ledger without going
+through the per-owner reconciliation endpoint::
+
+    python -m services.wallet_service.app.reconciliation_scan \\
+        --report drift.ndjson --checkpoint scan.checkpoint.json --workers 4
+
+The wallet id space is split into fixed key ranges (shards). Workers take
+shards in parallel and reconcile each one with a single statement: wallets
+joined to their hot-wallet sub-balances, their balance snapshot and a
+grouped sum of the ledger entries after it (``--full`` ignores snapshots and
+sums the attached ledger on top of the totals of detached partitions).
+Because wallet balances and ledger sums come from the same statement they
+are read from one consistent snapshot, so in-flight transfers do not show up
+as false drift.
+
+Drifted wallets are appended to the NDJSON report as each shard finishes,
+and finished shards are recorded in the checkpoint file so an interrupted
+scan resumes where it left off (a crash between the two can repeat one
+shard's report lines). ``--max-wallets-per-second`` paces the scan so it does
+not starve OLTP traffic.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from .balance_snapshots import exclude_archived, signed_ledger_sum
+from .models import BalanceSnapshot, LedgerArchive, LedgerEntry, Wallet, WalletBalanceShard
+from .settings import wallet_settings
+
+
+@dataclass
+class ScanSummary:
+    shards_scanned: int = 0
+    shards_skipped: int = 0
+    wallets_scanned: int = 0
+    wallets_drifted: int = 0
+
+
+class _Checkpoint:
+    """Set of completed shard start ids, persisted atomically as JSON."""
+
+    def __init__(self, path: Path | None, shard_size: int) -> None:
+        self.path = path
+        self.shard_size = shard_size
+        self.completed: set[int] = set()
+        if path is not None and path.exists():
+            data = json.loads(path.read_text())
+            if data.get("shard_size") != shard_size:
+                raise ValueError(
+                    f"Checkpoint {path} was written with shard size {data.get('shard_size')}, not {shard_size}"
+                )
+            self.completed = set(data.get("completed", []))
+
+    def mark(self, shard_start: int) -> None:
+        self.completed.add(shard_start)
+        if self.path is None:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"shard_size": self.shard_size, "completed": sorted(self.completed)}))
+        os.replace(tmp_path, self.path)
+
+
+class _RateLimiter:
+    """Paces work to ``rate`` units per second; callers pay after the fact."""
+
+    def __init__(
+        self,
+        rate: float | None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.rate:
+            return
+        delay = self._next - self._clock()
+        if delay > 0:
+            await self._sleep(delay)
+
+    def consume(self, units: int) -> None:
+        if self.rate:
+            self._next = max(self._next, self._clock()) + units / self.rate
+
+
+class ReconciliationScanner:
+    """Scans all wallets for ledger drift in parallel key-range shards."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        report_path: Path,
+        *,
+        checkpoint_path: Path | None = None,
+        shard_size: int = 10_000,
+        workers: int = 4,
+        max_wallets_per_second: float | None = None,
+        full: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.session_factory = session_factory
+        self.report_path = Path(report_path)
+        self.shard_size = max(1, shard_size)
+        self.workers = max(1, workers)
+        self.full = full
+        self.checkpoint = _Checkpoint(checkpoint_path, self.shard_size)
+        self._limiter = _RateLimiter(max_wallets_per_second, clock, sleep)
+
+    async def scan_shard(self, first_id: int, last_id: int) -> tuple[int, list[dict[str, Any]]]:
+        """Return the number of wallets in ``[first_id, last_id]`` and the drifted ones."""
+        entries = select(
+            LedgerEntry.wallet_id.label("wallet_id"),
+            signed_ledger_sum().label("amount"),
+            func.count(LedgerEntry.id).label("entry_count"),
+        ).where(LedgerEntry.wallet_id.between(first_id, last_id))
+        if self.full:
+            entries = exclude_archived(entries)
+        else:
+            entries = entries.outerjoin(BalanceSnapshot, BalanceSnapshot.wallet_id == LedgerEntry.wallet_id).where(
+                LedgerEntry.id > func.coalesce(BalanceSnapshot.last_entry_id, 0)
+            )
+        entries = entries.group_by(LedgerEntry.wallet_id).subquery()
+        sub_balances = (
+            select(
+                WalletBalanceShard.wallet_id.label("wallet_id"),
+                func.sum(WalletBalanceShard.balance).label("balance"),
+            )
+            .where(WalletBalanceShard.wallet_id.between(first_id, last_id))
+            .group_by(WalletBalanceShard.wallet_id)
+            .subquery()
+        )
+
+        # Snapshots in incremental mode, detached-partition archives in full mode
+        base = LedgerArchive if self.full else BalanceSnapshot
+        stmt = (
+            select(
+                Wallet.id,
+                Wallet.owner_user_id,
+                Wallet.currency,
+                Wallet.balance,
+                sub_balances.c.balance,
+                base.ledger_balance,
+                base.entry_count,
+                entries.c.amount,
+                entries.c.entry_count,
+            )
+            .outerjoin(entries, entries.c.wallet_id == Wallet.id)
+            .outerjoin(sub_balances, sub_balances.c.wallet_id == Wallet.id)
+            .outerjoin(base, base.wallet_id == Wallet.id)
+            .where(Wallet.id.between(first_id, last_id))
+        )
+
+        async with self.session_factory() as session:
+            rows = (await session.execute(stmt)).all()
+
+        drifted = []
+        for row in rows:
+            (wallet_id, owner_user_id, currency, balance, shard_balance) = row[:5]
+            (snap_balance, snap_count, amount, entry_count) = row[5:]
+            # Sharded wallets hold part of their balance in sub-balance rows
+            balance = balance + Decimal(shard_balance or 0)
+            ledger_balance = Decimal(snap_balance or 0) + Decimal(amount or 0)
+            delta = ledger_balance - balance
+            if delta != 0:
+                drifted.append(
+                    {
+                        "wallet_id": wallet_id,
+                        "owner_user_id": owner_user_id,
+                        "currency": currency,
+                        "stored_balance": str(balance),
+                        "ledger_balance": str(ledger_balance),
+                        "delta": str(delta),
+                        "entry_count": (snap_count or 0) + (entry_count or 0),
+                    }
+                )
+        return len(rows), drifted
+
+    async def run(self) -> ScanSummary:
+        summary = ScanSummary()
+        async with self.session_factory() as session:
+            min_id, max_id = (await session.execute(select(func.min(Wallet.id), func.max(Wallet.id)))).one()
+        if min_id is None:
+            return summary
+
+        # Shards are aligned to multiples of shard_size so checkpoints stay
+        # valid as wallets are added
+        queue: asyncio.Queue[int] = asyncio.Queue()
+        for start in range(min_id - min_id % self.shard_size, max_id + 1, self.shard_size):
+            if start in self.checkpoint.completed:
+                summary.shards_skipped += 1
+            else:
+                queue.put_nowait(start)
+
+        with self.report_path.open("a", encoding="utf-8") as report:
+
+            async def worker() -> None:
+                while not queue.empty():
+                    start = queue.get_nowait()
+                    await self._limiter.wait()
+                    scanned, drifted = await self.scan_shard(start, start + self.shard_size - 1)
+                    self._limiter.consume(scanned)
+                    for record in drifted:
+                        report.write(json.dumps(record) + "\n")
+                    report.flush()
+                    self.checkpoint.mark(start)
+                    summary.shards_scanned += 1
+                    summary.wallets_scanned += scanned
+                    summary.wallets_drifted += len(drifted)
+                    if drifted:
+                        logger.warning("Shard {} has {} drifted wallets", start, len(drifted))
+
+            await asyncio.gather(*(worker() for _ in range(self.workers)))
+        return summary
+
+
+async def run_scan(args: argparse.Namespace) -> ScanSummary:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True, pool_size=args.workers)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    scanner = ReconciliationScanner(
+        session_factory,
+        args.report,
+        checkpoint_path=args.checkpoint,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        max_wallets_per_second=args.max_wallets_per_second,
+        full=args.full,
+    )
+    try:
+        return await scanner.run()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scan all wallets for ledger drift")
+    parser.add_argument("--report", type=Path, default=Path("wallet_drift_report.ndjson"))
+    parser.add_argument("--checkpoint", type=Path, default=None, help="Resume file; omit for a one-off scan")
+    parser.add_argument("--shard-size", type=int, default=10_000, help="Wallet ids per shard")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-wallets-per-second", type=float, default=None)
+    parser.add_argument("--full", action="store_true", help="Ignore balance snapshots and sum the whole ledger")
+    args = parser.parse_args()
+    summary = asyncio.run(run_scan(args))
+    logger.info(
+        "Reconciliation scan checked {} wallets in {} shards ({} skipped); {} drifted, report at {}",
+        summary.wallets_scanned,
+        summary.shards_scanned,
+        summary.shards_skipped,
+        summary.wallets_drifted,
+        args.report,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Pooled, circuit-broken client for the risk service.
+
+One long-lived ``httpx.AsyncClient`` is shared by every debit so risk calls
+reuse keep-alive connections, with a tight per-call latency budget. Around it:
+
+* ``CircuitBreaker`` stops calling a failing risk service after
+  ``failure_threshold`` consecutive errors, then lets a single probe through
+  once ``reset_seconds`` have passed (half-open) before closing again.
+* ``RiskDecisionCache`` remembers decisions for a few seconds, keyed by
+  wallet, user, currency, amount bucket and request metadata, so retried or
+  repeated debits do not each pay a round-trip.
+* When the service is unavailable (breaker open, timeout, transport error or
+  5xx) the configured policy decides: fail-open approves and is counted,
+  fail-closed raises ``RiskServiceUnavailable``.
+
+The client is created lazily by ``get_risk_client`` and closed in the
+application lifespan via ``close_risk_client``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from decimal import ROUND_FLOOR, Decimal
+from typing import Any, Callable
+
+import httpx
+
+from .metrics import (
+    wallet_risk_breaker_state,
+    wallet_risk_decision_cache_total,
+    wallet_risk_request_seconds,
+    wallet_risk_unavailable_total,
+)
+from .settings import wallet_settings
+
+logger = logging.getLogger(__name__)
+
+_BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class RiskServiceUnavailable(Exception):
+    """The risk service could not produce a decision and the policy is fail-closed."""
+
+
+class RiskEvaluationRejected(Exception):
+    """The risk service rejected the evaluation request itself (4xx)."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 10.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.state = "closed"
+        self._publish()
+
+    def _publish(self) -> None:
+        wallet_risk_breaker_state.set(_BREAKER_STATE_VALUES[self.state])
+
+    def _transition(self, state: str) -> None:
+        if state != self.state:
+            logger.info("wallet.risk.breaker_state", extra={"from": self.state, "to": state})
+            self.state = state
+            self._publish()
+
+    def allow(self) -> bool:
+        """Return whether a call may go out now."""
+        now = self._clock()
+        if self.state == "open":
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            self._transition("half_open")
+            self._opened_at = now
+            self._probes = 0
+        if self.state == "half_open":
+            if self._probes >= self.half_open_max_calls:
+                # A probe that never reported back (e.g. cancelled) must not
+                # wedge the breaker; allow a fresh one after another interval
+                if now - self._opened_at < self.reset_seconds:
+                    return False
+                self._opened_at = now
+                self._probes = 0
+            self._probes += 1
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._transition("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = self._clock()
+            self._transition("open")
+
+
+class RiskDecisionCache:
+    """Short-TTL LRU of risk decisions."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 5.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[bytes, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._entries[key]
+            wallet_risk_decision_cache_total.labels(result="miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        wallet_risk_decision_cache_total.labels(result="hit").inc()
+        return entry[1]
+
+    def put(self, key: bytes, decision: str) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (self._clock() + self.ttl_seconds, decision)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RiskClient:
+    """Evaluate wallet transactions against the risk service."""
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout_seconds: float = 0.3,
+        max_connections: int = 50,
+        breaker: CircuitBreaker | None = None,
+        cache: RiskDecisionCache | None = None,
+        amount_bucket: Decimal = Decimal("10"),
+        fail_open: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.evaluations_url = f"{base_url.rstrip('/')}/evaluations"
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.cache = cache if cache is not None else RiskDecisionCache()
+        self.amount_bucket = amount_bucket
+        self.fail_open = fail_open
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout_seconds),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+
+    def _cache_key(self, payload: dict[str, Any]) -> bytes:
+        amount = Decimal(str(payload["amount"]))
+        bucket = (amount / self.amount_bucket).to_integral_value(rounding=ROUND_FLOOR) if self.amount_bucket else amount
+        material = json.dumps(
+            [
+                payload.get("event_type"),
+                payload.get("subject_id"),
+                payload.get("user_id"),
+                payload.get("currency"),
+                str(bucket),
+                payload.get("metadata"),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(material.encode("utf-8")).digest()
+
+    def _unavailable(self, reason: str) -> str:
+        policy = "fail_open" if self.fail_open else "fail_closed"
+        wallet_risk_unavailable_total.labels(reason=reason, policy=policy).inc()
+        logger.warning("wallet.risk.unavailable", extra={"reason": reason, "policy": policy})
+        if self.fail_open:
+            return "approve"
+        raise RiskServiceUnavailable(reason)
+
+    async def evaluate(self, payload: dict[str, Any]) -> str:
+        """Return the risk decision (``approve``/``review``/``decline``) for ``payload``."""
+        key = self._cache_key(payload)
+        if (decision := self.cache.get(key)) is not None:
+            return decision
+        if not self.breaker.allow():
+            return self._unavailable("breaker_open")
+
+        start = time.perf_counter()
+        try:
+            response = await self._client.post(self.evaluations_url, json=payload)
+        except httpx.TimeoutException:
+            wallet_risk_request_seconds.labels(outcome="timeout").observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            return self._unavailable("timeout")
+        except httpx.HTTPError:
+            wallet_risk_request_seconds.labels(outcome="transport_error").observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            return self._unavailable("transport_error")
+
+        if response.status_code >= 500:
+            wallet_risk_request_seconds.labels(outcome="server_error").observe(time.perf_counter() - start)
+            self.breaker.record_failure()
+            return self._unavailable("server_error")
+        # A 4xx means the service is up and answered; it does not trip the breaker
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            wallet_risk_request_seconds.labels(outcome="client_error").observe(time.perf_counter() - start)
+            raise RiskEvaluationRejected(response.status_code)
+        wallet_risk_request_seconds.labels(outcome="ok").observe(time.perf_counter() - start)
+        decision = response.json().get("decision") or "approve"
+        self.cache.put(key, decision)
+        return decision
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_risk_client: RiskClient | None = None
+
+
+def get_risk_client() -> RiskClient:
+    """Return the process-wide risk client, creating it from settings on first use."""
+    global _risk_client
+    if _risk_client is None:
+        settings = wallet_settings()
+        _risk_client = RiskClient(
+            settings.risk_base_url,
+            timeout_seconds=settings.risk_timeout_seconds,
+            max_connections=settings.risk_max_connections,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.risk_breaker_failure_threshold,
+                reset_seconds=settings.risk_breaker_reset_seconds,
+            ),
+            cache=RiskDecisionCache(
+                ttl_seconds=settings.risk_decision_cache_ttl_seconds,
+                max_entries=settings.risk_decision_cache_max_entries,
+            ),
+            amount_bucket=settings.risk_amount_bucket,
+            fail_open=settings.risk_fail_open,
+        )
+    return _risk_client
+
+
+async def close_risk_client() -> None:
+    global _risk_client
+    if _risk_client is not None:
+        await _risk_client.aclose()
+        _risk_client = None
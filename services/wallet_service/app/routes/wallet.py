@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import io
+import json
+import zlib
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from time import perf_counter
-from typing import Annotated, Sequence
+from typing import Annotated, AsyncIterator, Iterator, Literal, Sequence
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
-from sqlalchemy import select, func, case
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, String, insert, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.wallet_service.app.models import (
@@ -15,38 +25,72 @@ from services.wallet_service.app.models import (
     EntryType,
     Hold,
     HoldStatus,
+    ArchivedTransfer,
     Transfer,
     TransferStatus,
     OutboxEvent,
+    WalletBalanceShard,
 )
 from services.wallet_service.app.schemas import (
     WalletCreate,
     WalletResponse,
+    WalletShardsRequest,
     MoneyChangeRequest,
+    BatchMoneyChangeItem,
+    BatchMoneyChangeRequest,
+    BatchMoneyChangeResult,
+    BatchMoneyChangeResponse,
     BalanceResponse,
     TransferRequest,
     TransferResponse,
     TransferRecord,
+    BulkTransferItem,
+    BulkTransferRequest,
+    BulkTransferResult,
+    BulkTransferResponse,
     HoldCreateRequest,
     HoldResponse,
     HoldActionRequest,
+    BulkHoldActionItem,
+    BulkHoldActionRequest,
+    BulkHoldActionResult,
+    BulkHoldActionResponse,
     LedgerEntryItem,
     StatementResponse,
     ReconciliationResponse,
 )
+from services.wallet_service.app.balance_snapshots import ledger_totals
 from services.wallet_service.app.dependencies import get_current_user_id, get_session
+from services.wallet_service.app.hold_expiry import release_key
+from services.wallet_service.app.idempotency_cache import get_idempotency_cache
 from services.wallet_service.app.metrics import (
     wallet_credit_total,
     wallet_debit_total,
     wallet_idempotency_replay_total,
     wallet_insufficient_funds_total,
+    wallet_lock_hold_seconds,
+    wallet_risk_revalidations_total,
+    wallet_statement_export_rows_total,
     wallet_transfer_created_total,
     wallet_transfer_completed_total,
     wallet_transfer_failed_total,
     wallet_transfer_idempotent_total,
     wallet_transfer_latency_seconds,
 )
+from services.wallet_service.app.risk_client import (
+    RiskEvaluationRejected,
+    RiskServiceUnavailable,
+    get_risk_client,
+)
 from services.wallet_service.app.settings import wallet_settings
+from services.wallet_service.app.sharding import (
+    configure_shards,
+    fund_debit,
+    known_shards,
+    lock_credit_shard,
+    remember_shards,
+    shard_totals,
+)
 
 
 router = APIRouter()
@@ -54,22 +98,49 @@ router = APIRouter()
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
+# Outcome of a pre-lock risk check: the wallet state the approval was based
+# on, the rejection to surface, or None when nothing was evaluated.
+RiskPrescreen = tuple[int, str, str] | HTTPException | None
+
+
+@asynccontextmanager
+async def _write_transaction(session: AsyncSession, operation: str) -> AsyncIterator[None]:
+    """``session.begin()`` that records how long wallet row locks were held."""
+    try:
+        async with session.begin():
+            yield
+    finally:
+        locked_at = session.info.pop("wallet_locked_at", None)
+        if locked_at is not None:
+            wallet_lock_hold_seconds.labels(operation=operation).observe(perf_counter() - locked_at)
+
+
+def _mark_locked(session: AsyncSession) -> None:
+    session.info.setdefault("wallet_locked_at", perf_counter())
+
 
 def _record_outbox_event(session: AsyncSession, event_type: str, payload: dict) -> None:
     event = OutboxEvent(event_type=event_type, payload=payload)
     session.add(event)
 
 
-def _wallet_response(wallet: Wallet) -> WalletResponse:
+def _wallet_response(wallet: Wallet, balance: Decimal | None = None) -> WalletResponse:
     return WalletResponse(
         id=wallet.id,
         owner_user_id=wallet.owner_user_id,
         currency=wallet.currency,
         status=wallet.status,
-        balance=wallet.balance,
+        balance=wallet.balance if balance is None else balance,
+        balance_shards=wallet.balance_shards,
     )
 
 
+async def _wallet_responses(session: AsyncSession, *wallets: Wallet) -> list[WalletResponse]:
+    """Responses whose balance includes sharded wallets' sub-balances."""
+    totals = await shard_totals(session, wallets)
+    return [_wallet_response(wallet, wallet.balance + totals.get(wallet.id, 0)) for wallet in wallets]
+
+
 def _hold_response(hold: Hold) -> HoldResponse:
     return HoldResponse(
         id=hold.id,
@@ -77,6 +148,7 @@ def _hold_response(hold: Hold) -> HoldResponse:
         amount=hold.amount,
         status=hold.status,
         reference=hold.reference,
+        expires_at=hold.expires_at,
         created_at=hold.created_at,
         updated_at=hold.updated_at,
     )
@@ -95,9 +167,11 @@ async def _get_hold(
         .where(Hold.id == hold_id, Hold.wallet_id == wallet_id, Wallet.owner_user_id == current_user_id)
     )
     if for_update:
-        stmt = stmt.with_for_update()
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
     result = await session.execute(stmt)
     hold = result.scalar_one_or_none()
+    if for_update:
+        _mark_locked(session)
     if hold is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hold not found")
     return hold
@@ -133,21 +207,132 @@ async def _enforce_wallet_risk(
             **(risk_metadata or {}),
         },
     }
-    risk_url = f"{settings.risk_base_url}/evaluations"
-    timeout = httpx.Timeout(5.0, read=10.0)
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        response = await client.post(risk_url, json=payload)
-    if response.status_code >= 500:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Risk service unavailable")
-    if response.status_code >= 400:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Wallet risk evaluation failed")
-    decision = response.json().get("decision")
+    try:
+        decision = await get_risk_client().evaluate(payload)
+    except RiskServiceUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Risk service unavailable") from exc
+    except RiskEvaluationRejected as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Wallet risk evaluation failed") from exc
     if decision == "decline":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Wallet transaction declined by risk engine")
     if decision == "review":
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Wallet transaction pending risk review")
 
 
+def _risk_fingerprint(wallet: Wallet) -> tuple[int, str, str]:
+    """Wallet state a risk decision depends on; if it changes the decision is re-run."""
+    return (wallet.owner_user_id, wallet.currency, wallet.status)
+
+
+async def _prescreen_debits(
+    session: AsyncSession,
+    debits: Sequence[tuple[int, Decimal, str | None]],
+    current_user_id: int,
+    risk_metadata: dict | None,
+    transfer_keys: Sequence[str] | None = None,
+) -> list[RiskPrescreen]:
+    """Phase 1 of the debit pipeline: run risk checks before any row lock.
+
+    ``debits`` holds ``(wallet_id, amount, idempotency_key)`` tuples; transfer
+    debits pass ``transfer_keys`` instead of ledger keys. Wallets and
+    already-applied keys are read in a short transaction that ends before
+    the risk service is called, so neither a row lock nor a pooled connection
+    is held while waiting on it. Replays are skipped and the remaining
+    evaluations run concurrently. Keys the idempotency filter has not seen
+    are only looked up when the risk service rejects their debit, so a replay
+    is never answered with a rejection.
+    """
+    settings = wallet_settings()
+    outcomes: list[RiskPrescreen] = [None] * len(debits)
+    if not settings.risk_checks_enabled or not debits:
+        return outcomes
+
+    wallet_ids = {wallet_id for wallet_id, _, _ in debits}
+    cache = get_idempotency_cache()
+    keys = {key for wallet_id, _, key in debits if await cache.may_exist("ledger", wallet_id, key)}
+    async with session.begin():
+        result = await session.scalars(
+            select(Wallet).where(Wallet.id.in_(wallet_ids), Wallet.owner_user_id == current_user_id)
+        )
+        wallets = {wallet.id: wallet for wallet in result}
+        applied: set[tuple[int, str]] = set()
+        if keys:
+            rows = await session.execute(
+                select(LedgerEntry.wallet_id, LedgerEntry.idempotency_key).where(
+                    LedgerEntry.wallet_id.in_(wallet_ids), LedgerEntry.idempotency_key.in_(keys)
+                )
+            )
+            applied = {(wallet_id, key) for wallet_id, key in rows}
+        existing_transfers: set[str] = set()
+        if transfer_keys:
+            existing_transfers = set(
+                await session.scalars(select(Transfer.idempotency_key).where(Transfer.idempotency_key.in_(transfer_keys)))
+            )
+
+    semaphore = asyncio.Semaphore(max(1, settings.risk_prescreen_concurrency))
+
+    async def evaluate(pos: int, wallet: Wallet, amount: Decimal) -> None:
+        async with semaphore:
+            try:
+                await _enforce_wallet_risk(wallet, amount, current_user_id, risk_metadata)
+            except HTTPException as exc:
+                outcomes[pos] = exc
+            else:
+                outcomes[pos] = _risk_fingerprint(wallet)
+
+    await asyncio.gather(
+        *(
+            evaluate(pos, wallets[wallet_id], amount)
+            for pos, (wallet_id, amount, key) in enumerate(debits)
+            if wallet_id in wallets
+            and (wallet_id, key) not in applied
+            and not (transfer_keys and transfer_keys[pos] in existing_transfers)
+        )
+    )
+
+    unchecked = {
+        (wallet_id, key)
+        for outcome, (wallet_id, _, key) in zip(outcomes, debits)
+        if isinstance(outcome, HTTPException) and key and key not in keys
+    }
+    if unchecked:
+        async with session.begin():
+            rows = await session.execute(
+                select(LedgerEntry.wallet_id, LedgerEntry.idempotency_key).where(
+                    LedgerEntry.wallet_id.in_({wallet_id for wallet_id, _ in unchecked}),
+                    LedgerEntry.idempotency_key.in_({key for _, key in unchecked}),
+                )
+            )
+            replays = {(wallet_id, key) for wallet_id, key in rows}
+        for pos, (wallet_id, _, key) in enumerate(debits):
+            if (wallet_id, key) in replays:
+                # Leave the replay to the locked path, whose lookup the filter now allows
+                outcomes[pos] = None
+                await cache.record("ledger", wallet_id, key)
+    return outcomes
+
+
+async def _ensure_debit_risk(
+    wallet: Wallet,
+    amount: Decimal,
+    current_user_id: int,
+    risk_metadata: dict | None,
+    prescreened: RiskPrescreen,
+) -> None:
+    """Phase 2 guard, called with the wallet locked.
+
+    Honours the pre-lock decision and only calls the risk service again when
+    there was none or the wallet changed since it was made.
+    """
+    if isinstance(prescreened, HTTPException):
+        raise prescreened
+    if prescreened is not None:
+        if prescreened == _risk_fingerprint(wallet):
+            return
+        wallet_risk_revalidations_total.inc()
+    await _enforce_wallet_risk(wallet, amount, current_user_id, risk_metadata)
+
+
 @router.post("/", response_model=WalletResponse, status_code=status.HTTP_201_CREATED)
 async def create_wallet(
     payload: WalletCreate,
@@ -170,6 +355,20 @@ async def create_wallet(
     return _wallet_response(wallet)
 
 
+def _key_already_used() -> HTTPException:
+    # The key registry still holds the key but its row is gone, e.g. detached
+    # with a cold partition: nothing to replay, and the key cannot be reused
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Idempotency key already used")
+
+
+async def _applied_entry(session: AsyncSession, wallet_id: int, idempotency_key: str) -> LedgerEntry | None:
+    return await session.scalar(
+        select(LedgerEntry)
+        .where(LedgerEntry.wallet_id == wallet_id, LedgerEntry.idempotency_key == idempotency_key)
+        .limit(1)
+    )
+
+
 async def _apply_money_change(
     session: AsyncSession,
     wallet_id: int,
@@ -179,39 +378,191 @@ async def _apply_money_change(
     details: dict | None,
     current_user_id: int,
     risk_metadata: dict | None = None,
+    prescreened: RiskPrescreen = None,
+    trust_key_filter: bool = False,
 ) -> tuple[Wallet, LedgerEntry]:
-    # Lock the wallet row to prevent races
-    result = await session.execute(
-        select(Wallet).where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id).with_for_update()
-    )
-    wallet = result.scalar_one_or_none()
-    if wallet is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
+    """Lock the wallet (or one of its shards) and apply a credit/debit, replaying known keys.
+
+    With ``trust_key_filter`` the replay lookup is skipped for keys the
+    idempotency filter has not seen; the caller must then treat
+    ``IntegrityError`` from the flush as a possible replay and retry without it.
+    The filter only knows keys applied through it, so a debit rejected by the
+    risk check or for funds looks its key up after all before failing.
+    """
+    # Credits to a sharded hot wallet lock one of its shards instead of the row
+    sharded = None
+    if kind == EntryType.credit:
+        sharded = await lock_credit_shard(session, wallet_id, current_user_id, idempotency_key)
+    shard = None
+    if sharded is not None:
+        wallet, shard = sharded
+    else:
+        # Lock the wallet row to prevent races; refresh in case an earlier
+        # unlocked read left a stale copy in the identity map. NO KEY UPDATE
+        # leaves concurrent shard credits' foreign key checks unblocked.
+        result = await session.execute(
+            select(Wallet)
+            .where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+            .with_for_update(key_share=True)
+            .execution_options(populate_existing=True)
+        )
+        wallet = result.scalar_one_or_none()
+        if wallet is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
+        remember_shards(wallet)
+    _mark_locked(session)
 
     # Idempotency: if key provided, check existing entry
-    if idempotency_key:
-        existing = await session.execute(
-            select(LedgerEntry).where(
-                LedgerEntry.wallet_id == wallet_id,
-                LedgerEntry.idempotency_key == idempotency_key,
-            ).limit(1)
-        )
-        if (entry := existing.scalar_one_or_none()) is not None:
-            # If an entry exists, consider operation idempotent and return current wallet state
-            wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
-            return wallet, entry  # entry retrieved below but to satisfy type we set placeholder
+    looked_up = bool(idempotency_key) and (
+        not trust_key_filter or await get_idempotency_cache().may_exist("ledger", wallet_id, idempotency_key)
+    )
+    if looked_up and (entry := await _applied_entry(session, wallet_id, idempotency_key)) is not None:
+        wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
+        return wallet, entry
+
+    try:
+        if kind == EntryType.debit:
+            await _ensure_debit_risk(wallet, amount, current_user_id, risk_metadata, prescreened)
+            await fund_debit(session, wallet, amount)
+        entry = _stage_money_change(session, wallet, kind, amount, idempotency_key, details, shard)
+    except HTTPException:
+        if looked_up or not idempotency_key:
+            raise
+        # Applied on another replica or before a restart: a replay, not a rejection
+        if (entry := await _applied_entry(session, wallet_id, idempotency_key)) is None:
+            raise
+        wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
+        return wallet, entry
+    await session.flush()
+    return wallet, entry
 
-    if kind == EntryType.debit:
-        await _enforce_wallet_risk(wallet, amount, current_user_id, risk_metadata)
 
+def _stage_money_change(
+    session: AsyncSession,
+    wallet: Wallet,
+    kind: EntryType,
+    amount: Decimal,
+    idempotency_key: str | None,
+    details: dict | None,
+    shard: WalletBalanceShard | None = None,
+) -> LedgerEntry:
+    """Mutate an already-locked wallet and stage its ledger entry without flushing.
+
+    Callers holding several row locks stage every change first so the ledger
+    inserts go out in a single batched flush. Credits go to ``shard`` instead
+    of the wallet row when the caller locked one.
+    """
     if kind == EntryType.debit:
         if wallet.balance < amount:
             wallet_insufficient_funds_total.labels(currency=wallet.currency).inc()
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient funds")
         wallet.balance = wallet.balance - amount
+        wallet_debit_total.labels(currency=wallet.currency).inc()
+    elif shard is not None:
+        shard.balance = shard.balance + amount
+        wallet_credit_total.labels(currency=wallet.currency).inc()
     else:
         wallet.balance = wallet.balance + amount
+        wallet_credit_total.labels(currency=wallet.currency).inc()
 
+    entry = LedgerEntry(
+        wallet_id=wallet.id,
+        type=kind.value,
+        amount=amount,
+        idempotency_key=idempotency_key,
+        details=details or None,
+    )
+    session.add(entry)
+    return entry
+
+
+async def _owned_wallet(session: AsyncSession, wallet_id: int, current_user_id: int) -> Wallet:
+    """Unlocked, refreshed read of a wallet the caller owns."""
+    wallet = await session.scalar(
+        select(Wallet)
+        .where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+        .execution_options(populate_existing=True)
+    )
+    if wallet is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
+    remember_shards(wallet)
+    return wallet
+
+
+async def _apply_money_change_in_place(
+    session: AsyncSession,
+    wallet_id: int,
+    kind: EntryType,
+    amount: Decimal,
+    idempotency_key: str | None,
+    details: dict | None,
+    current_user_id: int,
+    risk_metadata: dict | None = None,
+    prescreened: RiskPrescreen = None,
+) -> tuple[Wallet, LedgerEntry] | None:
+    """Optimistic single-wallet credit/debit: ``UPDATE ... RETURNING``, then the ledger insert.
+
+    Nothing is locked up front; the UPDATE takes the row lock itself and
+    debits only match while the balance covers the amount and the wallet is
+    still in the state the risk decision was made for. The risk service is
+    never called under the row lock: a missing decision is made on an
+    unlocked read before the UPDATE, and a stale one is made again after the
+    UPDATE misses, before it is retried. A replayed idempotency key is caught
+    by the ledger's unique constraint, which raises ``IntegrityError`` from
+    the insert: the caller must roll back and answer with
+    ``_replay_money_change``. Returns None for sharded wallets, which need
+    ``_apply_money_change``.
+    """
+    if known_shards(wallet_id):
+        return None
+    if isinstance(prescreened, HTTPException):
+        raise prescreened
+    if kind == EntryType.debit and prescreened is None and wallet_settings().risk_checks_enabled:
+        # Not prescreened (e.g. the prescreen saw a replay): settle replay and risk before locking
+        wallet = await _owned_wallet(session, wallet_id, current_user_id)
+        if idempotency_key and (entry := await _applied_entry(session, wallet_id, idempotency_key)) is not None:
+            wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
+            return wallet, entry
+        if wallet.balance_shards:
+            return None
+        await _enforce_wallet_risk(wallet, amount, current_user_id, risk_metadata)
+        prescreened = _risk_fingerprint(wallet)
+
+    delta = amount if kind == EntryType.credit else -amount
+    while True:
+        stmt = (
+            update(Wallet)
+            .where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+            .values(balance=Wallet.balance + delta)
+            .returning(Wallet)
+            .execution_options(populate_existing=True)
+        )
+        if kind == EntryType.debit:
+            stmt = stmt.where(Wallet.balance >= amount)
+            if prescreened is not None:
+                _, currency, wallet_status = prescreened
+                stmt = stmt.where(Wallet.currency == currency, Wallet.status == wallet_status)
+        wallet = (await session.execute(stmt)).scalar_one_or_none()
+        if wallet is not None:
+            break
+
+        # Missing, not owned, a replayed debit, insufficient funds or changed since the risk decision
+        wallet = await _owned_wallet(session, wallet_id, current_user_id)
+        if idempotency_key and (entry := await _applied_entry(session, wallet_id, idempotency_key)) is not None:
+            wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
+            return wallet, entry
+        if wallet.balance_shards:
+            return None
+        if prescreened is not None and prescreened != _risk_fingerprint(wallet):
+            wallet_risk_revalidations_total.inc()
+            await _enforce_wallet_risk(wallet, amount, current_user_id, risk_metadata)
+            prescreened = _risk_fingerprint(wallet)
+            continue
+        wallet_insufficient_funds_total.labels(currency=wallet.currency).inc()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Insufficient funds")
+
+    _mark_locked(session)
+    remember_shards(wallet)
     entry = LedgerEntry(
         wallet_id=wallet.id,
         type=kind.value,
@@ -228,49 +579,314 @@ async def _apply_money_change(
     return wallet, entry
 
 
-async def _lock_wallets(session: AsyncSession, wallet_ids: list[int], current_user_id: int) -> dict[int, Wallet]:
-    locked: dict[int, Wallet] = {}
-    for wid in sorted(wallet_ids):
-        result = await session.execute(
-            select(Wallet).where(Wallet.id == wid, Wallet.owner_user_id == current_user_id).with_for_update()
+async def _replay_money_change(
+    session: AsyncSession, wallet_id: int, kind: EntryType, idempotency_key: str, current_user_id: int
+) -> Wallet | None:
+    """Wallet state for a credit/debit whose key is already in the ledger, or None if it is not."""
+    async with session.begin():
+        wallet = await session.scalar(
+            select(Wallet)
+            .where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+            .execution_options(populate_existing=True)
         )
-        wallet = result.scalar_one_or_none()
+        entry_id = await session.scalar(
+            select(LedgerEntry.id)
+            .where(LedgerEntry.wallet_id == wallet_id, LedgerEntry.idempotency_key == idempotency_key)
+            .limit(1)
+        )
+    if wallet is None or entry_id is None:
+        return None
+    wallet_idempotency_replay_total.labels(currency=wallet.currency, type=kind.value).inc()
+    return wallet
+
+
+async def _change_wallet_balance(
+    session: AsyncSession,
+    wallet_id: int,
+    kind: EntryType,
+    payload: MoneyChangeRequest,
+    current_user_id: int,
+    risk_metadata: dict | None,
+    prescreened: RiskPrescreen = None,
+) -> WalletResponse:
+    """Credit/debit endpoint body: the optimistic path, falling back to row locks for sharded wallets.
+
+    The response is remembered under the idempotency key so later replays are
+    answered by ``_cached_replay``.
+    """
+    args = (session, wallet_id, kind, payload.amount, payload.idempotency_key, payload.details, current_user_id)
+    try:
+        async with _write_transaction(session, kind.value):
+            applied = await _apply_money_change_in_place(*args, risk_metadata, prescreened)
+            if applied is None:
+                applied = await _apply_money_change(*args, risk_metadata, prescreened, trust_key_filter=True)
+        wallet, _ = applied
+    except IntegrityError:
+        if not payload.idempotency_key:
+            raise
+        wallet = await _replay_money_change(session, wallet_id, kind, payload.idempotency_key, current_user_id)
         if wallet is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
-        locked[wid] = wallet
+            raise _key_already_used() from None
+    [response] = await _wallet_responses(session, wallet)
+    cache = get_idempotency_cache()
+    await cache.record("ledger", wallet_id, payload.idempotency_key)
+    cache.remember_response("ledger", wallet_id, payload.idempotency_key, response)
+    return response
+
+
+def _cached_replay(
+    wallet_id: int, kind: EntryType, idempotency_key: str | None, current_user_id: int
+) -> WalletResponse | None:
+    """The remembered response to an earlier credit/debit with this key, if still cached."""
+    response = get_idempotency_cache().response("ledger", wallet_id, idempotency_key)
+    if response is None or response.owner_user_id != current_user_id:
+        return None
+    wallet_idempotency_replay_total.labels(currency=response.currency, type=kind.value).inc()
+    return response
+
+
+async def _lock_wallets(
+    session: AsyncSession,
+    wallet_ids: list[int],
+    current_user_id: int,
+    require_all: bool = True,
+) -> dict[int, Wallet]:
+    """Lock all ``wallet_ids`` in one ``SELECT ... FOR NO KEY UPDATE`` ordered by id.
+
+    Ordering by primary key makes every caller acquire row locks in the same
+    sequence, so concurrent multi-wallet operations cannot deadlock. With
+    ``require_all=False`` wallets that are missing or owned by someone else
+    are left out of the result instead of failing the whole call.
+    """
+    wanted = set(wallet_ids)
+    result = await session.execute(
+        select(Wallet)
+        .where(Wallet.id.in_(wanted), Wallet.owner_user_id == current_user_id)
+        .order_by(Wallet.id)
+        .with_for_update(key_share=True)
+        .execution_options(populate_existing=True)
+    )
+    locked = {wallet.id: wallet for wallet in result.scalars()}
+    for wallet in locked.values():
+        remember_shards(wallet)
+    _mark_locked(session)
+    if require_all and len(locked) != len(wanted):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
     return locked
 
 
-@router.post("/{wallet_id}/credit", response_model=WalletResponse)
-async def credit_wallet(wallet_id: int, payload: MoneyChangeRequest, request: Request, session: SessionDep, current_user_id: int = Depends(get_current_user_id)) -> WalletResponse:
-    async with session.begin():
-        wallet, _ = await _apply_money_change(
+def _batch_chunks(items: Sequence) -> Iterator[tuple[int, Sequence]]:
+    """Validate batch size and yield ``(offset, chunk)`` per transaction."""
+    settings = wallet_settings()
+    if len(items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Batch exceeds the maximum of {settings.batch_max_items} items",
+        )
+    chunk_size = max(1, settings.batch_chunk_size)
+    for start in range(0, len(items), chunk_size):
+        yield start, items[start : start + chunk_size]
+
+
+async def _apply_money_change_batch(
+    session: AsyncSession,
+    items: Sequence[BatchMoneyChangeItem],
+    offset: int,
+    current_user_id: int,
+    risk_metadata: dict | None,
+    prescreened: Sequence[RiskPrescreen],
+    trust_key_filter: bool = False,
+) -> list[BatchMoneyChangeResult]:
+    """Apply a chunk of credits/debits under one set of row locks.
+
+    Each item keeps ``_apply_money_change`` semantics (idempotent replay, risk
+    check on debits, insufficient funds) but the chunk locks its wallets in a
+    single ordered statement, finds replays with one query and inserts all
+    new ledger entries in one flush. Item failures are reported, not raised.
+    With ``trust_key_filter`` keys the idempotency filter has not seen are
+    left out of the replay query and only looked up when their item is
+    rejected, as in ``_apply_money_change``.
+    """
+    locked = await _lock_wallets(session, [item.wallet_id for item in items], current_user_id, require_all=False)
+    keys = {item.idempotency_key for item in items}
+    if trust_key_filter:
+        cache = get_idempotency_cache()
+        keys = {
+            item.idempotency_key
+            for item in items
+            if item.wallet_id in locked and await cache.may_exist("ledger", item.wallet_id, item.idempotency_key)
+        }
+    entries: dict[tuple[int, str], LedgerEntry | int] = {}
+    if keys:
+        existing = await session.execute(
+            select(LedgerEntry.wallet_id, LedgerEntry.idempotency_key, LedgerEntry.id).where(
+                LedgerEntry.wallet_id.in_(locked), LedgerEntry.idempotency_key.in_(keys)
+            )
+        )
+        entries = {(wallet_id, key): entry_id for wallet_id, key, entry_id in existing}
+    # Sub-balances of sharded wallets, reported as part of each item's balance
+    shard_balances = await shard_totals(session, locked.values())
+
+    def balance_of(wallet: Wallet) -> Decimal:
+        return wallet.balance + shard_balances.get(wallet.id, 0)
+
+    outcomes: list[tuple[BatchMoneyChangeItem, str, tuple[int, str] | None, Decimal | None, str | None]] = []
+    for item, risk_check in zip(items, prescreened):
+        wallet = locked.get(item.wallet_id)
+        if wallet is None:
+            outcomes.append((item, "failed", None, None, "Wallet not found or not owned by user"))
+            continue
+        ledger_key = (wallet.id, item.idempotency_key)
+        if ledger_key in entries:
+            wallet_idempotency_replay_total.labels(currency=wallet.currency, type=item.type.value).inc()
+            outcomes.append((item, "replayed", ledger_key, balance_of(wallet), None))
+            continue
+        try:
+            if item.type == EntryType.debit:
+                await _ensure_debit_risk(wallet, item.amount, current_user_id, risk_metadata, risk_check)
+                if await fund_debit(session, wallet, item.amount):
+                    shard_balances.pop(wallet.id, None)
+            entries[ledger_key] = _stage_money_change(
+                session, wallet, item.type, item.amount, item.idempotency_key, item.details
+            )
+        except HTTPException as exc:
+            entry = None
+            if item.idempotency_key not in keys:
+                entry = await _applied_entry(session, wallet.id, item.idempotency_key)
+            if entry is None:
+                outcomes.append((item, "failed", None, balance_of(wallet), str(exc.detail)))
+                continue
+            entries[ledger_key] = entry.id
+            wallet_idempotency_replay_total.labels(currency=wallet.currency, type=item.type.value).inc()
+            outcomes.append((item, "replayed", ledger_key, balance_of(wallet), None))
+            continue
+        outcomes.append((item, "applied", ledger_key, balance_of(wallet), None))
+
+    await session.flush()
+
+    results = []
+    for index, (item, item_status, ledger_key, balance, error) in enumerate(outcomes, start=offset):
+        entry = entries.get(ledger_key) if ledger_key else None
+        results.append(
+            BatchMoneyChangeResult(
+                index=index,
+                wallet_id=item.wallet_id,
+                idempotency_key=item.idempotency_key,
+                status=item_status,
+                entry_id=entry.id if isinstance(entry, LedgerEntry) else entry,
+                balance=balance,
+                error=error,
+            )
+        )
+    return results
+
+
+async def _apply_batch_item_alone(
+    session: AsyncSession,
+    items: Sequence[BatchMoneyChangeItem],
+    offset: int,
+    pos: int,
+    current_user_id: int,
+    risk_metadata: dict | None,
+    prescreened: Sequence[RiskPrescreen],
+) -> BatchMoneyChangeResult:
+    """Apply one batch item in its own transaction, failing it if its key cannot be replayed."""
+    item = items[pos]
+    try:
+        async with _write_transaction(session, "batch"):
+            [result] = await _apply_money_change_batch(
+                session, [item], offset + pos, current_user_id, risk_metadata, [prescreened[pos]]
+            )
+    except IntegrityError:
+        result = BatchMoneyChangeResult(
+            index=offset + pos,
+            wallet_id=item.wallet_id,
+            idempotency_key=item.idempotency_key,
+            status="failed",
+            error=_key_already_used().detail,
+        )
+    return result
+
+
+@router.post("/batch", response_model=BatchMoneyChangeResponse)
+async def batch_money_changes(
+    payload: BatchMoneyChangeRequest,
+    request: Request,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> BatchMoneyChangeResponse:
+    """Apply many credits/debits across the caller's wallets.
+
+    Items are applied in order, in transactions of ``batch_chunk_size`` items;
+    a failed item does not roll back the others.
+    """
+    risk_metadata = _extract_risk_metadata(request)
+    cache = get_idempotency_cache()
+    results: list[BatchMoneyChangeResult] = []
+    for start, chunk in _batch_chunks(payload.items):
+        debit_positions = [pos for pos, item in enumerate(chunk) if item.type == EntryType.debit]
+        debit_checks = await _prescreen_debits(
             session,
-            wallet_id,
-            EntryType.credit,
-            payload.amount,
-            payload.idempotency_key,
-            payload.details,
+            [(chunk[pos].wallet_id, chunk[pos].amount, chunk[pos].idempotency_key) for pos in debit_positions],
             current_user_id,
-            _extract_risk_metadata(request),
+            risk_metadata,
         )
-    return _wallet_response(wallet)
+        prescreened: list[RiskPrescreen] = [None] * len(chunk)
+        for pos, check in zip(debit_positions, debit_checks):
+            prescreened[pos] = check
+        args = (session, chunk, start, current_user_id, risk_metadata, prescreened)
+        try:
+            async with _write_transaction(session, "batch"):
+                chunk_results = await _apply_money_change_batch(*args, trust_key_filter=True)
+        except IntegrityError:
+            # A replayed key the filter did not know about; redo the chunk with the lookup
+            try:
+                async with _write_transaction(session, "batch"):
+                    chunk_results = await _apply_money_change_batch(*args)
+            except IntegrityError:
+                # A key without a ledger entry to replay; apply the items one by
+                # one so only the items reusing such keys fail
+                chunk_results = [
+                    await _apply_batch_item_alone(session, chunk, start, pos, *args[3:])
+                    for pos in range(len(chunk))
+                ]
+        for result in chunk_results:
+            if result.status != "failed":
+                await cache.record("ledger", result.wallet_id, result.idempotency_key)
+        results.extend(chunk_results)
+    counts = Counter(result.status for result in results)
+    return BatchMoneyChangeResponse(
+        applied=counts["applied"],
+        replayed=counts["replayed"],
+        failed=counts["failed"],
+        results=results,
+    )
+
+
+@router.post("/{wallet_id}/credit", response_model=WalletResponse)
+async def credit_wallet(wallet_id: int, payload: MoneyChangeRequest, request: Request, session: SessionDep, current_user_id: int = Depends(get_current_user_id)) -> WalletResponse:
+    cached = _cached_replay(wallet_id, EntryType.credit, payload.idempotency_key, current_user_id)
+    if cached is not None:
+        return cached
+    return await _change_wallet_balance(
+        session, wallet_id, EntryType.credit, payload, current_user_id, _extract_risk_metadata(request)
+    )
 
 
 @router.post("/{wallet_id}/debit", response_model=WalletResponse)
 async def debit_wallet(wallet_id: int, payload: MoneyChangeRequest, request: Request, session: SessionDep, current_user_id: int = Depends(get_current_user_id)) -> WalletResponse:
-    async with session.begin():
-        wallet, _ = await _apply_money_change(
-            session,
-            wallet_id,
-            EntryType.debit,
-            payload.amount,
-            payload.idempotency_key,
-            payload.details,
-            current_user_id,
-            _extract_risk_metadata(request),
-        )
-    return _wallet_response(wallet)
+    cached = _cached_replay(wallet_id, EntryType.debit, payload.idempotency_key, current_user_id)
+    if cached is not None:
+        return cached
+    risk_metadata = _extract_risk_metadata(request)
+    [prescreened] = await _prescreen_debits(
+        session, [(wallet_id, payload.amount, payload.idempotency_key)], current_user_id, risk_metadata
+    )
+    if isinstance(prescreened, HTTPException):
+        raise prescreened
+    return await _change_wallet_balance(
+        session, wallet_id, EntryType.debit, payload, current_user_id, risk_metadata, prescreened
+    )
 
 
 @router.get("/{wallet_id}/balance", response_model=BalanceResponse)
@@ -279,7 +895,42 @@ async def get_balance(wallet_id: int, session: SessionDep, current_user_id: int
     wallet = result.scalar_one_or_none()
     if wallet is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
-    return BalanceResponse(id=wallet.id, currency=wallet.currency, balance=wallet.balance)
+    totals = await shard_totals(session, [wallet])
+    return BalanceResponse(id=wallet.id, currency=wallet.currency, balance=wallet.balance + totals.get(wallet.id, 0))
+
+
+@router.put("/{wallet_id}/shards", response_model=WalletResponse)
+async def configure_wallet_shards(
+    wallet_id: int,
+    payload: WalletShardsRequest,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> WalletResponse:
+    """Spread a hot wallet's credits over ``shards`` sub-balances (0 turns sharding off).
+
+    Shards that are dropped are folded back into the wallet row; the total
+    balance does not change.
+    """
+    max_shards = wallet_settings().shard_max_count
+    if payload.shards > max_shards:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A wallet can have at most {max_shards} balance shards",
+        )
+    async with _write_transaction(session, "shards"):
+        result = await session.execute(
+            select(Wallet)
+            .where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+            .with_for_update(key_share=True)
+            .execution_options(populate_existing=True)
+        )
+        wallet = result.scalar_one_or_none()
+        if wallet is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
+        _mark_locked(session)
+        await configure_shards(session, wallet, payload.shards)
+    [response] = await _wallet_responses(session, wallet)
+    return response
 
 
 def _entry_item(entry: LedgerEntry) -> LedgerEntryItem:
@@ -292,7 +943,104 @@ def _entry_item(entry: LedgerEntry) -> LedgerEntryItem:
     )
 
 
-def _transfer_record(transfer: Transfer) -> TransferRecord:
+_EXPORT_COLUMNS = (
+    LedgerEntry.id,
+    LedgerEntry.type,
+    LedgerEntry.amount,
+    LedgerEntry.details,
+    LedgerEntry.created_at,
+)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """Ledger timestamps are naive UTC; normalise aware query bounds to match."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# Spelled as a literal ``metadata ->> 'type'`` (no bound key, no cast) so the
+# predicate matches the ix_ledger_wallet_details_type_id expression index
+_DETAILS_TYPE = LedgerEntry.details.op("->>", return_type=String())(literal_column("'type'"))
+
+
+def _statement_filters(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    entry_type: EntryType | None = Query(None, alias="type"),
+    min_amount: Decimal | None = Query(None, ge=0),
+    max_amount: Decimal | None = Query(None, ge=0),
+    details_type: str | None = Query(None, max_length=64),
+) -> list[ColumnElement[bool]]:
+    """Ledger entry criteria shared by statement pages and exports.
+
+    ``created_at`` bounds are half-open (``[start, end)``). Every filter is a
+    plain predicate on top of the id-ordered keyset, so pagination stays
+    stable for any combination; each one is backed by a ``wallet_id``-leading
+    index on ``ledger_entries``.
+    """
+    criteria: list[ColumnElement[bool]] = []
+    if start is not None:
+        criteria.append(LedgerEntry.created_at >= _naive_utc(start))
+    if end is not None:
+        criteria.append(LedgerEntry.created_at < _naive_utc(end))
+    if entry_type is not None:
+        criteria.append(LedgerEntry.type == entry_type.value)
+    if min_amount is not None:
+        criteria.append(LedgerEntry.amount >= min_amount)
+    if max_amount is not None:
+        criteria.append(LedgerEntry.amount <= max_amount)
+    if details_type is not None:
+        criteria.append(_DETAILS_TYPE == details_type)
+    return criteria
+
+
+StatementFiltersDep = Annotated[list[ColumnElement[bool]], Depends(_statement_filters)]
+
+
+def _encode_ndjson_rows(rows: Sequence[Row]) -> str:
+    return "".join(
+        json.dumps(
+            {
+                "id": entry_id,
+                "type": entry_type,
+                "amount": str(amount),
+                "details": details,
+                "created_at": created_at.isoformat(),
+            },
+            separators=(",", ":"),
+            default=str,
+        )
+        + "\n"
+        for entry_id, entry_type, amount, details, created_at in rows
+    )
+
+
+def _encode_csv_rows(rows: Sequence[Row]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (
+            entry_id,
+            entry_type,
+            amount,
+            json.dumps(details, default=str) if details is not None else "",
+            created_at.isoformat(),
+        )
+        for entry_id, entry_type, amount, details, created_at in rows
+    )
+    return buffer.getvalue()
+
+
+async def _gzip_stream(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    # Sync-flush after every partition so the client receives data as it is read
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _transfer_record(transfer: Transfer | ArchivedTransfer) -> TransferRecord:
     return TransferRecord(
         id=transfer.id,
         status=TransferStatus(transfer.status),
@@ -320,48 +1068,78 @@ def _transfer_payload(transfer: Transfer) -> dict:
     }
 
 
-@router.post("/{wallet_id}/transfers", response_model=TransferResponse, status_code=status.HTTP_201_CREATED)
-async def transfer_between_wallets(
+async def _find_transfer(session: AsyncSession, idempotency_key: str) -> Transfer | ArchivedTransfer | None:
+    """Transfer by idempotency key, falling back to transfers of detached partitions."""
+    transfer = await session.scalar(select(Transfer).where(Transfer.idempotency_key == idempotency_key))
+    if transfer is None:
+        transfer = await session.scalar(
+            select(ArchivedTransfer).where(ArchivedTransfer.idempotency_key == idempotency_key)
+        )
+    return transfer
+
+
+async def _replay_transfer(
+    session: AsyncSession, existing_transfer: Transfer | ArchivedTransfer, current_user_id: int
+) -> TransferResponse:
+    if existing_transfer.user_id != current_user_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Transfer belongs to another user")
+    wallet_transfer_idempotent_total.labels(currency=existing_transfer.currency).inc()
+    locked = await _lock_wallets(
+        session,
+        [existing_transfer.source_wallet_id, existing_transfer.target_wallet_id],
+        current_user_id,
+    )
+    if existing_transfer.status == TransferStatus.failed.value:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=existing_transfer.failure_reason or "Transfer previously failed",
+        )
+    if existing_transfer.status == TransferStatus.pending.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Transfer is still processing")
+    source_response, target_response = await _wallet_responses(
+        session, locked[existing_transfer.source_wallet_id], locked[existing_transfer.target_wallet_id]
+    )
+    return TransferResponse(
+        transfer=_transfer_record(existing_transfer),
+        source_wallet=source_response,
+        target_wallet=target_response,
+    )
+
+
+async def _transfer_once(
+    session: AsyncSession,
     wallet_id: int,
     payload: TransferRequest,
-    session: SessionDep,
-    current_user_id: int = Depends(get_current_user_id),
+    current_user_id: int,
+    prescreened: RiskPrescreen,
+    transfer_start: float,
 ) -> TransferResponse:
-    if wallet_id == payload.target_wallet_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Source and target wallet must differ")
-
-    transfer_start = perf_counter()
     failure_exc: HTTPException | None = None
-    async with session.begin():
+    async with _write_transaction(session, "transfer"):
         existing_transfer = await session.scalar(
             select(Transfer).where(Transfer.idempotency_key == payload.idempotency_key)
         )
         if existing_transfer is not None:
-            if existing_transfer.user_id != current_user_id:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Transfer belongs to another user")
-            wallet_transfer_idempotent_total.labels(currency=existing_transfer.currency).inc()
-            locked = await _lock_wallets(
-                session,
-                [existing_transfer.source_wallet_id, existing_transfer.target_wallet_id],
-                current_user_id,
-            )
-            if existing_transfer.status == TransferStatus.failed.value:
-                raise HTTPException(
-                    status_code=status.HTTP_409_CONFLICT,
-                    detail=existing_transfer.failure_reason or "Transfer previously failed",
-                )
-            if existing_transfer.status == TransferStatus.pending.value:
-                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Transfer is still processing")
-            transfer_response = TransferResponse(
-                transfer=_transfer_record(existing_transfer),
-                source_wallet=_wallet_response(locked[existing_transfer.source_wallet_id]),
-                target_wallet=_wallet_response(locked[existing_transfer.target_wallet_id]),
+            return await _replay_transfer(session, existing_transfer, current_user_id)
+
+        target_shard = None
+        if known_shards(payload.target_wallet_id):
+            # Sharded hot target: lock the source row, then one target shard
+            # (wallet rows before shards, like every other path)
+            source = (await _lock_wallets(session, [wallet_id], current_user_id))[wallet_id]
+            sharded = await lock_credit_shard(
+                session, payload.target_wallet_id, current_user_id, payload.idempotency_key
             )
-            return transfer_response
-
-        locked = await _lock_wallets(session, [wallet_id, payload.target_wallet_id], current_user_id)
-        source = locked[wallet_id]
-        target = locked[payload.target_wallet_id]
+            if sharded is not None:
+                target, target_shard = sharded
+            else:
+                # Sharding was switched off since it was cached
+                locked = await _lock_wallets(session, [payload.target_wallet_id], current_user_id)
+                target = locked[payload.target_wallet_id]
+        else:
+            locked = await _lock_wallets(session, [wallet_id, payload.target_wallet_id], current_user_id)
+            source = locked[wallet_id]
+            target = locked[payload.target_wallet_id]
 
         if source.currency != target.currency or payload.currency != source.currency:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Currency mismatch")
@@ -396,27 +1174,18 @@ async def transfer_between_wallets(
         debit_key = f"wallet-transfer-debit-{transfer.id}"
         credit_key = f"wallet-transfer-credit-{transfer.id}"
 
+        # The transfer id is new, so its ledger keys cannot have been used yet;
+        # mutate the rows locked above and insert both entries in one flush.
         try:
-            source, debit_entry = await _apply_money_change(
-                session,
-                source.id,
-                EntryType.debit,
-                payload.amount,
-                debit_key,
-                transfer_details,
-                current_user_id,
-                risk_metadata=None,
+            await _ensure_debit_risk(source, payload.amount, current_user_id, None, prescreened)
+            await fund_debit(session, source, payload.amount)
+            debit_entry = _stage_money_change(
+                session, source, EntryType.debit, payload.amount, debit_key, transfer_details
             )
-            target, credit_entry = await _apply_money_change(
-                session,
-                target.id,
-                EntryType.credit,
-                payload.amount,
-                credit_key,
-                reverse_details,
-                current_user_id,
-                risk_metadata=None,
+            credit_entry = _stage_money_change(
+                session, target, EntryType.credit, payload.amount, credit_key, reverse_details, target_shard
             )
+            await session.flush()
         except HTTPException as exc:
             transfer.status = TransferStatus.failed.value
             transfer.failure_reason = str(exc.detail) if exc.detail else "Transfer failed"
@@ -433,10 +1202,12 @@ async def transfer_between_wallets(
             wallet_transfer_completed_total.labels(currency=transfer.currency).inc()
             wallet_transfer_latency_seconds.observe(perf_counter() - transfer_start)
             _record_outbox_event(session, "wallet.transfer.completed", _transfer_payload(transfer))
+            record = _transfer_record(transfer)
+            source_response, target_response = await _wallet_responses(session, source, target)
             response = TransferResponse(
-                transfer=_transfer_record(transfer),
-                source_wallet=_wallet_response(source),
-                target_wallet=_wallet_response(target),
+                transfer=record,
+                source_wallet=source_response,
+                target_wallet=target_response,
             )
 
     if failure_exc:
@@ -444,21 +1215,247 @@ async def transfer_between_wallets(
     return response
 
 
-@router.post("/{wallet_id}/holds", response_model=HoldResponse, status_code=status.HTTP_201_CREATED)
-async def create_hold(
+@router.post("/{wallet_id}/transfers", response_model=TransferResponse, status_code=status.HTTP_201_CREATED)
+async def transfer_between_wallets(
     wallet_id: int,
-    payload: HoldCreateRequest,
+    payload: TransferRequest,
     session: SessionDep,
     current_user_id: int = Depends(get_current_user_id),
-) -> HoldResponse:
-    async with session.begin():
-        existing = await session.execute(
-            select(Hold)
-            .where(Hold.wallet_id == wallet_id, Hold.idempotency_key == payload.idempotency_key)
-            .with_for_update()
+) -> TransferResponse:
+    if wallet_id == payload.target_wallet_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Source and target wallet must differ")
+
+    transfer_start = perf_counter()
+    [prescreened] = await _prescreen_debits(
+        session, [(wallet_id, payload.amount, None)], current_user_id, None, [payload.idempotency_key]
+    )
+    try:
+        return await _transfer_once(session, wallet_id, payload, current_user_id, prescreened, transfer_start)
+    except IntegrityError:
+        # The key registry already holds it: a concurrent request, or a transfer
+        # whose partition was detached and copied to the archive
+        async with _write_transaction(session, "transfer"):
+            existing_transfer = await _find_transfer(session, payload.idempotency_key)
+            if existing_transfer is None:
+                raise _key_already_used() from None
+            return await _replay_transfer(session, existing_transfer, current_user_id)
+
+
+async def _bulk_transfer_chunk(
+    session: AsyncSession,
+    items: Sequence[BulkTransferItem],
+    offset: int,
+    current_user_id: int,
+    prescreened: Sequence[RiskPrescreen],
+    include_archived: bool = False,
+) -> list[BulkTransferResult]:
+    """Execute a chunk of transfers with one lock statement and batched writes.
+
+    Transfers run in request order against the locked rows, so each wallet
+    ends up with a single netted balance UPDATE. Transfer rows, ledger
+    entries and outbox events are each written in one flush. Validation
+    errors (unknown wallet, same wallet, currency mismatch) are reported
+    without creating a transfer, as the single-transfer endpoint does.
+    ``include_archived`` also replays keys from detached partitions; the
+    caller retries with it when the key registry rejects an insert.
+    """
+    results: list[BulkTransferResult | None] = [None] * len(items)
+    first_seen: dict[str, int] = {}
+    duplicates: list[tuple[int, int]] = []
+    for pos, item in enumerate(items):
+        if item.idempotency_key in first_seen:
+            duplicates.append((pos, first_seen[item.idempotency_key]))
+        else:
+            first_seen[item.idempotency_key] = pos
+
+    existing: list[Transfer | ArchivedTransfer] = list(
+        await session.scalars(select(Transfer).where(Transfer.idempotency_key.in_(first_seen)))
+    )
+    if include_archived:
+        found = {transfer.idempotency_key for transfer in existing}
+        existing.extend(
+            await session.scalars(
+                select(ArchivedTransfer).where(ArchivedTransfer.idempotency_key.in_(set(first_seen) - found))
+            )
         )
-        if (hold := existing.scalar_one_or_none()) is not None:
-            return _hold_response(hold)
+    for transfer in existing:
+        pos = first_seen.pop(transfer.idempotency_key)
+        result = BulkTransferResult(index=offset + pos, idempotency_key=transfer.idempotency_key, replayed=True)
+        if transfer.user_id != current_user_id:
+            result.error = "Transfer belongs to another user"
+        else:
+            wallet_transfer_idempotent_total.labels(currency=transfer.currency).inc()
+            result.transfer = _transfer_record(transfer)
+            if transfer.status == TransferStatus.failed.value:
+                result.error = transfer.failure_reason or "Transfer previously failed"
+            elif transfer.status == TransferStatus.pending.value:
+                result.error = "Transfer is still processing"
+        results[pos] = result
+
+    wallet_ids = [
+        wallet_id
+        for pos in first_seen.values()
+        for wallet_id in (items[pos].source_wallet_id, items[pos].target_wallet_id)
+    ]
+    locked = await _lock_wallets(session, wallet_ids, current_user_id, require_all=False) if wallet_ids else {}
+
+    pending: list[tuple[int, Transfer]] = []
+    for pos in sorted(first_seen.values()):
+        item = items[pos]
+        source = locked.get(item.source_wallet_id)
+        target = locked.get(item.target_wallet_id)
+        error = None
+        if item.source_wallet_id == item.target_wallet_id:
+            error = "Source and target wallet must differ"
+        elif source is None or target is None:
+            error = "Wallet not found or not owned by user"
+        elif source.currency != target.currency or item.currency != source.currency:
+            error = "Currency mismatch"
+        if error:
+            results[pos] = BulkTransferResult(index=offset + pos, idempotency_key=item.idempotency_key, error=error)
+            continue
+        transfer = Transfer(
+            user_id=current_user_id,
+            source_wallet_id=source.id,
+            target_wallet_id=target.id,
+            amount=item.amount,
+            currency=source.currency,
+            idempotency_key=item.idempotency_key,
+            external_reference=item.external_reference,
+        )
+        pending.append((pos, transfer))
+
+    session.add_all(transfer for _, transfer in pending)
+    await session.flush()
+
+    staged: list[tuple[int, Transfer, LedgerEntry | None, LedgerEntry | None, HTTPException | None]] = []
+    for pos, transfer in pending:
+        wallet_transfer_created_total.labels(currency=transfer.currency).inc()
+        _record_outbox_event(session, "wallet.transfer.created", _transfer_payload(transfer))
+        transfer_details = {
+            "type": "transfer",
+            "transfer_id": transfer.id,
+            "target_wallet_id": transfer.target_wallet_id,
+            "description": items[pos].description,
+        }
+        reverse_details = {
+            "type": "transfer",
+            "transfer_id": transfer.id,
+            "source_wallet_id": transfer.source_wallet_id,
+            "description": items[pos].description,
+        }
+        try:
+            await _ensure_debit_risk(
+                locked[transfer.source_wallet_id], transfer.amount, current_user_id, None, prescreened[pos]
+            )
+            await fund_debit(session, locked[transfer.source_wallet_id], transfer.amount)
+            debit_entry = _stage_money_change(
+                session,
+                locked[transfer.source_wallet_id],
+                EntryType.debit,
+                transfer.amount,
+                f"wallet-transfer-debit-{transfer.id}",
+                transfer_details,
+            )
+            credit_entry = _stage_money_change(
+                session,
+                locked[transfer.target_wallet_id],
+                EntryType.credit,
+                transfer.amount,
+                f"wallet-transfer-credit-{transfer.id}",
+                reverse_details,
+            )
+        except HTTPException as exc:
+            staged.append((pos, transfer, None, None, exc))
+        else:
+            staged.append((pos, transfer, debit_entry, credit_entry, None))
+    await session.flush()
+
+    for pos, transfer, debit_entry, credit_entry, exc in staged:
+        if exc is not None:
+            transfer.status = TransferStatus.failed.value
+            transfer.failure_reason = str(exc.detail) if exc.detail else "Transfer failed"
+            wallet_transfer_failed_total.labels(
+                currency=transfer.currency,
+                reason="insufficient_funds" if exc.status_code == status.HTTP_409_CONFLICT else "validation_error",
+            ).inc()
+            _record_outbox_event(session, "wallet.transfer.failed", _transfer_payload(transfer))
+        else:
+            transfer.status = TransferStatus.completed.value
+            transfer.ledger_debit_entry_id = debit_entry.id
+            transfer.ledger_credit_entry_id = credit_entry.id
+            wallet_transfer_completed_total.labels(currency=transfer.currency).inc()
+            _record_outbox_event(session, "wallet.transfer.completed", _transfer_payload(transfer))
+        results[pos] = BulkTransferResult(
+            index=offset + pos,
+            idempotency_key=transfer.idempotency_key,
+            transfer=_transfer_record(transfer),
+            error=transfer.failure_reason,
+        )
+
+    for pos, original in duplicates:
+        results[pos] = results[original].model_copy(update={"index": offset + pos, "replayed": True})
+    return results
+
+
+@router.post("/transfers/batch", response_model=BulkTransferResponse)
+async def bulk_transfer(
+    payload: BulkTransferRequest,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> BulkTransferResponse:
+    """Execute many transfers between the caller's wallets.
+
+    Each transfer keeps its own idempotency key and outcome; transfers are
+    committed in chunks of ``batch_chunk_size``.
+    """
+    results: list[BulkTransferResult] = []
+    for start, chunk in _batch_chunks(payload.transfers):
+        prescreened = await _prescreen_debits(
+            session,
+            [(item.source_wallet_id, item.amount, None) for item in chunk],
+            current_user_id,
+            None,
+            [item.idempotency_key for item in chunk],
+        )
+        try:
+            async with _write_transaction(session, "bulk_transfer"):
+                results.extend(await _bulk_transfer_chunk(session, chunk, start, current_user_id, prescreened))
+        except IntegrityError:
+            # A key is already registered, e.g. by a transfer whose partition was detached
+            async with _write_transaction(session, "bulk_transfer"):
+                results.extend(
+                    await _bulk_transfer_chunk(
+                        session, chunk, start, current_user_id, prescreened, include_archived=True
+                    )
+                )
+    return BulkTransferResponse(
+        completed=sum(1 for r in results if not r.replayed and r.error is None),
+        failed=sum(1 for r in results if not r.replayed and r.error is not None),
+        replayed=sum(1 for r in results if r.replayed),
+        results=results,
+    )
+
+
+async def _create_hold_once(
+    session: AsyncSession,
+    wallet_id: int,
+    payload: HoldCreateRequest,
+    current_user_id: int,
+    prescreened: RiskPrescreen,
+    trust_key_filter: bool,
+) -> HoldResponse:
+    async with _write_transaction(session, "hold_create"):
+        if not trust_key_filter or await get_idempotency_cache().may_exist(
+            "hold", wallet_id, payload.idempotency_key
+        ):
+            existing = await session.execute(
+                select(Hold)
+                .where(Hold.wallet_id == wallet_id, Hold.idempotency_key == payload.idempotency_key)
+                .with_for_update()
+            )
+            if (hold := existing.scalar_one_or_none()) is not None:
+                return _hold_response(hold)
 
         wallet, entry = await _apply_money_change(
             session,
@@ -468,7 +1465,13 @@ async def create_hold(
             payload.idempotency_key,
             {"type": "hold", "reference": payload.reference},
             current_user_id,
+            prescreened=prescreened,
+            trust_key_filter=trust_key_filter,
         )
+        ttl_seconds = payload.expires_in_seconds or wallet_settings().hold_default_ttl_seconds
+        expires_at = None
+        if ttl_seconds > 0:
+            expires_at = _naive_utc(datetime.now(timezone.utc)) + timedelta(seconds=ttl_seconds)
         hold = Hold(
             wallet_id=wallet.id,
             amount=payload.amount,
@@ -477,6 +1480,7 @@ async def create_hold(
             reference=payload.reference,
             details=payload.details,
             ledger_entry_id=entry.id,
+            expires_at=expires_at,
         )
         session.add(hold)
         await session.flush()
@@ -484,6 +1488,31 @@ async def create_hold(
         return _hold_response(hold)
 
 
+@router.post("/{wallet_id}/holds", response_model=HoldResponse, status_code=status.HTTP_201_CREATED)
+async def create_hold(
+    wallet_id: int,
+    payload: HoldCreateRequest,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> HoldResponse:
+    [prescreened] = await _prescreen_debits(
+        session, [(wallet_id, payload.amount, payload.idempotency_key)], current_user_id, None
+    )
+    args = (session, wallet_id, payload, current_user_id, prescreened)
+    try:
+        response = await _create_hold_once(*args, trust_key_filter=True)
+    except IntegrityError:
+        # A replayed key the filter did not know about; retry with the lookups
+        try:
+            response = await _create_hold_once(*args, trust_key_filter=False)
+        except IntegrityError:
+            raise _key_already_used() from None
+    cache = get_idempotency_cache()
+    await cache.record("hold", wallet_id, payload.idempotency_key)
+    await cache.record("ledger", wallet_id, payload.idempotency_key)
+    return response
+
+
 @router.post("/{wallet_id}/holds/{hold_id}/release", response_model=HoldResponse)
 async def release_hold(
     wallet_id: int,
@@ -492,14 +1521,14 @@ async def release_hold(
     session: SessionDep,
     current_user_id: int = Depends(get_current_user_id),
 ) -> HoldResponse:
-    async with session.begin():
+    async with _write_transaction(session, "hold_release"):
         hold = await _get_hold(session, wallet_id, hold_id, current_user_id, for_update=True)
         if hold.status == HoldStatus.captured.value:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hold already captured")
         if hold.status == HoldStatus.released.value:
             return _hold_response(hold)
 
-        idem = payload.idempotency_key or f"hold-release-{hold.id}"
+        idem = payload.idempotency_key or release_key(hold)
         await _apply_money_change(
             session,
             wallet_id,
@@ -523,12 +1552,15 @@ async def capture_hold(
     session: SessionDep,
     current_user_id: int = Depends(get_current_user_id),
 ) -> HoldResponse:
-    async with session.begin():
+    async with _write_transaction(session, "hold_capture"):
         hold = await _get_hold(session, wallet_id, hold_id, current_user_id, for_update=True)
         if hold.status == HoldStatus.released.value:
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hold already released")
         if hold.status == HoldStatus.captured.value:
             return _hold_response(hold)
+        # Expired but not swept yet: the sweeper will release it
+        if hold.expires_at is not None and hold.expires_at <= _naive_utc(datetime.now(timezone.utc)):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hold expired")
         hold.status = HoldStatus.captured.value
         session.add(hold)
         await session.flush()
@@ -536,10 +1568,166 @@ async def capture_hold(
         return _hold_response(hold)
 
 
+async def _bulk_hold_action_chunk(
+    session: AsyncSession,
+    items: Sequence[BulkHoldActionItem],
+    offset: int,
+    current_user_id: int,
+    action: Literal["capture", "release"],
+) -> list[BulkHoldActionResult]:
+    """Capture or release a chunk of holds under one set of row locks.
+
+    Holds are locked in one ordered statement and, for releases, their
+    wallets in another, the same hold-then-wallet order as the single-hold
+    endpoints. Outcomes match those endpoints too: a hold already in the
+    requested state is a replay and one in the opposite state fails. Release
+    credits are written with a single multi-row insert.
+    """
+    result = await session.execute(
+        select(Hold)
+        .join(Wallet, Wallet.id == Hold.wallet_id)
+        .where(Hold.id.in_({item.hold_id for item in items}), Wallet.owner_user_id == current_user_id)
+        .order_by(Hold.id)
+        .with_for_update(of=Hold)
+        .execution_options(populate_existing=True)
+    )
+    holds = {hold.id: hold for hold in result.scalars()}
+    _mark_locked(session)
+
+    done, opposite = (
+        (HoldStatus.captured.value, HoldStatus.released.value)
+        if action == "capture"
+        else (HoldStatus.released.value, HoldStatus.captured.value)
+    )
+    wallets: dict[int, Wallet] = {}
+    applied_keys: set[tuple[int, str]] = set()
+    if action == "release":
+        to_release = [hold for hold in holds.values() if hold.status == HoldStatus.active.value]
+        if to_release:
+            wallets = await _lock_wallets(
+                session, [hold.wallet_id for hold in to_release], current_user_id, require_all=False
+            )
+            keys = {
+                item.idempotency_key or release_key(holds[item.hold_id]) for item in items if item.hold_id in holds
+            }
+            existing = await session.execute(
+                select(LedgerEntry.wallet_id, LedgerEntry.idempotency_key).where(
+                    LedgerEntry.wallet_id.in_(wallets), LedgerEntry.idempotency_key.in_(keys)
+                )
+            )
+            applied_keys = {(wallet_id, key) for wallet_id, key in existing}
+
+    now = _naive_utc(datetime.now(timezone.utc))
+    credits: list[dict] = []
+    outcomes: list[tuple[BulkHoldActionItem, str, str | None]] = []
+    for item in items:
+        hold = holds.get(item.hold_id)
+        if hold is None or hold.wallet_id != item.wallet_id:
+            outcomes.append((item, "failed", "Hold not found"))
+        elif hold.status == done:
+            outcomes.append((item, "replayed", None))
+        elif hold.status == opposite:
+            outcomes.append((item, "failed", f"Hold already {opposite}"))
+        elif action == "capture":
+            if hold.expires_at is not None and hold.expires_at <= now:
+                outcomes.append((item, "failed", "Hold expired"))
+                continue
+            hold.status = done
+            outcomes.append((item, "applied", None))
+        else:
+            wallet = wallets[hold.wallet_id]
+            ledger_key = (wallet.id, item.idempotency_key or release_key(hold))
+            if ledger_key in applied_keys:
+                wallet_idempotency_replay_total.labels(currency=wallet.currency, type=EntryType.credit.value).inc()
+            else:
+                wallet.balance = wallet.balance + hold.amount
+                wallet_credit_total.labels(currency=wallet.currency).inc()
+                credits.append(
+                    {
+                        "wallet_id": wallet.id,
+                        "type": EntryType.credit.value,
+                        "amount": hold.amount,
+                        "idempotency_key": ledger_key[1],
+                        "details": {"type": "hold_release", "hold_id": hold.id},
+                    }
+                )
+                applied_keys.add(ledger_key)
+            hold.status = done
+            outcomes.append((item, "applied", None))
+
+    await session.flush()
+    if credits:
+        # Release credits need no entry ids back, so they go out as one multi-row INSERT
+        await session.execute(insert(LedgerEntry).values(credits))
+    changed = {item.hold_id for item, item_status, _ in outcomes if item_status == "applied"}
+    if changed:
+        # Pick up the server-side updated_at of every settled hold in one query
+        await session.execute(
+            select(Hold).where(Hold.id.in_(changed)).execution_options(populate_existing=True)
+        )
+    return [
+        BulkHoldActionResult(
+            index=index,
+            hold_id=item.hold_id,
+            status=item_status,
+            hold=_hold_response(holds[item.hold_id]) if error is None else None,
+            error=error,
+        )
+        for index, (item, item_status, error) in enumerate(outcomes, start=offset)
+    ]
+
+
+async def _bulk_hold_action(
+    session: AsyncSession,
+    payload: BulkHoldActionRequest,
+    current_user_id: int,
+    action: Literal["capture", "release"],
+) -> BulkHoldActionResponse:
+    results: list[BulkHoldActionResult] = []
+    for start, chunk in _batch_chunks(payload.holds):
+        async with _write_transaction(session, f"hold_batch_{action}"):
+            results.extend(await _bulk_hold_action_chunk(session, chunk, start, current_user_id, action))
+    counts = Counter(result.status for result in results)
+    return BulkHoldActionResponse(
+        applied=counts["applied"],
+        replayed=counts["replayed"],
+        failed=counts["failed"],
+        results=results,
+    )
+
+
+@router.post("/holds/batch/capture", response_model=BulkHoldActionResponse)
+async def capture_holds(
+    payload: BulkHoldActionRequest,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> BulkHoldActionResponse:
+    """Capture many holds across the caller's wallets, reporting an outcome per hold.
+
+    Holds are settled in transactions of ``batch_chunk_size`` items; a failed
+    hold does not roll back the others.
+    """
+    return await _bulk_hold_action(session, payload, current_user_id, "capture")
+
+
+@router.post("/holds/batch/release", response_model=BulkHoldActionResponse)
+async def release_holds(
+    payload: BulkHoldActionRequest,
+    session: SessionDep,
+    current_user_id: int = Depends(get_current_user_id),
+) -> BulkHoldActionResponse:
+    """Release many holds across the caller's wallets, crediting each hold's wallet back.
+
+    Same chunking and per-hold outcomes as ``capture_holds``.
+    """
+    return await _bulk_hold_action(session, payload, current_user_id, "release")
+
+
 @router.get("/{wallet_id}/statements", response_model=StatementResponse)
 async def list_statements(
     wallet_id: int,
     session: SessionDep,
+    filters: StatementFiltersDep,
     current_user_id: int = Depends(get_current_user_id),
     limit: int = 50,
     cursor: int | None = None,
@@ -551,7 +1739,12 @@ async def list_statements(
     if wallet_result.scalar_one_or_none() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
 
-    stmt = select(LedgerEntry).where(LedgerEntry.wallet_id == wallet_id).order_by(LedgerEntry.id.desc()).limit(limit)
+    stmt = (
+        select(LedgerEntry)
+        .where(LedgerEntry.wallet_id == wallet_id, *filters)
+        .order_by(LedgerEntry.id.desc())
+        .limit(limit)
+    )
     if cursor:
         stmt = stmt.where(LedgerEntry.id < cursor)
     result = await session.execute(
@@ -562,11 +1755,60 @@ async def list_statements(
     return StatementResponse(wallet_id=wallet_id, entries=[_entry_item(e) for e in entries], next_cursor=next_cursor)
 
 
+@router.get("/{wallet_id}/statements/export")
+async def export_statements(
+    wallet_id: int,
+    request: Request,
+    session: SessionDep,
+    filters: StatementFiltersDep,
+    current_user_id: int = Depends(get_current_user_id),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """Stream every ledger entry matching the statement filters as NDJSON or CSV.
+
+    Rows come from a server-side cursor in ``statement_export_chunk_size``
+    partitions and are encoded straight from the result tuples, so memory
+    stays flat regardless of history length. The body is gzip-compressed
+    on the fly when the client accepts it.
+    """
+    wallet_result = await session.execute(
+        select(Wallet.id).where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
+    )
+    if wallet_result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
+
+    stmt = (
+        select(*_EXPORT_COLUMNS)
+        .where(LedgerEntry.wallet_id == wallet_id, *filters)
+        .order_by(LedgerEntry.id)
+        .execution_options(yield_per=wallet_settings().statement_export_chunk_size)
+    )
+    encode = _encode_csv_rows if export_format == "csv" else _encode_ndjson_rows
+
+    async def chunks() -> AsyncIterator[str]:
+        if export_format == "csv":
+            yield ",".join(column.key for column in _EXPORT_COLUMNS) + "\r\n"
+        result = await session.stream(stmt)
+        async for rows in result.partitions():
+            wallet_statement_export_rows_total.labels(format=export_format).inc(len(rows))
+            yield encode(rows)
+
+    headers = {"content-disposition": f'attachment; filename="wallet-{wallet_id}-statement.{export_format}"'}
+    body: AsyncIterator[bytes] = (chunk.encode("utf-8") async for chunk in chunks())
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        headers["content-encoding"] = "gzip"
+        headers["vary"] = "Accept-Encoding"
+        body = _gzip_stream(chunks())
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
 @router.get("/{wallet_id}/reconciliation", response_model=ReconciliationResponse)
 async def reconcile_wallet(
     wallet_id: int,
     session: SessionDep,
     current_user_id: int = Depends(get_current_user_id),
+    full: bool = False,
 ) -> ReconciliationResponse:
     wallet_result = await session.execute(
         select(Wallet).where(Wallet.id == wallet_id, Wallet.owner_user_id == current_user_id)
@@ -575,27 +1817,17 @@ async def reconcile_wallet(
     if wallet is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Wallet not found or not owned by user")
 
-    ledger_stmt = select(
-        func.coalesce(
-            func.sum(
-                case(
-                    (LedgerEntry.type == EntryType.credit.value, LedgerEntry.amount),
-                    else_=-LedgerEntry.amount,
-                )
-            ),
-            0,
-        ).label("ledger_balance"),
-        func.count(LedgerEntry.id).label("entry_count"),
-    ).where(LedgerEntry.wallet_id == wallet_id)
-    agg = await session.execute(ledger_stmt)
-    ledger_balance, entry_count = agg.one()
-    delta = ledger_balance - wallet.balance
+    totals = await shard_totals(session, [wallet])
+    stored_balance = wallet.balance + totals.get(wallet_id, 0)
+    ledger_balance, entry_count, snapshot_entry_id = await ledger_totals(session, wallet_id, full=full)
+    delta = ledger_balance - stored_balance
     status_text = "balanced" if delta == 0 else "drift_detected"
     return ReconciliationResponse(
         wallet_id=wallet_id,
-        stored_balance=wallet.balance,
+        stored_balance=stored_balance,
         ledger_balance=ledger_balance,
         delta=delta,
         entry_count=entry_count,
         status=status_text,
+        snapshot_entry_id=snapshot_entry_id,
     )
@@ -1,14 +1,27 @@
 from .wallet import (
     WalletCreate,
     WalletResponse,
+    WalletShardsRequest,
     MoneyChangeRequest,
+    BatchMoneyChangeItem,
+    BatchMoneyChangeRequest,
+    BatchMoneyChangeResult,
+    BatchMoneyChangeResponse,
     BalanceResponse,
     TransferRequest,
     TransferRecord,
     TransferResponse,
+    BulkTransferItem,
+    BulkTransferRequest,
+    BulkTransferResult,
+    BulkTransferResponse,
     HoldCreateRequest,
     HoldResponse,
     HoldActionRequest,
+    BulkHoldActionItem,
+    BulkHoldActionRequest,
+    BulkHoldActionResult,
+    BulkHoldActionResponse,
     LedgerEntryItem,
     StatementResponse,
     ReconciliationResponse,
@@ -17,14 +30,27 @@ from .wallet import (
 __all__ = [
     "WalletCreate",
     "WalletResponse",
+    "WalletShardsRequest",
     "MoneyChangeRequest",
+    "BatchMoneyChangeItem",
+    "BatchMoneyChangeRequest",
+    "BatchMoneyChangeResult",
+    "BatchMoneyChangeResponse",
     "BalanceResponse",
     "TransferRequest",
     "TransferRecord",
     "TransferResponse",
+    "BulkTransferItem",
+    "BulkTransferRequest",
+    "BulkTransferResult",
+    "BulkTransferResponse",
     "HoldCreateRequest",
     "HoldActionRequest",
     "HoldResponse",
+    "BulkHoldActionItem",
+    "BulkHoldActionRequest",
+    "BulkHoldActionResult",
+    "BulkHoldActionResponse",
     "LedgerEntryItem",
     "StatementResponse",
     "ReconciliationResponse",
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from decimal import Decimal
 from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, Field
 from pydantic import ConfigDict
 
@@ -22,6 +24,11 @@ class WalletResponse(BaseModel):
     currency: str
     status: str
     balance: Decimal
+    balance_shards: int = 0
+
+
+class WalletShardsRequest(BaseModel):
+    shards: int = Field(..., ge=0, description="Credit sub-balances for a hot wallet; 0 disables sharding")
 
 
 class MoneyChangeRequest(BaseModel):
@@ -44,6 +51,39 @@ class MoneyChangeRequest(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
 
+class BatchMoneyChangeItem(BaseModel):
+    """One credit or debit inside a batch; the idempotency key is required."""
+
+    wallet_id: int
+    type: EntryType
+    amount: Decimal = Field(..., gt=0)
+    idempotency_key: str = Field(..., max_length=64)
+    details: dict | None = Field(None, alias="metadata")
+
+    model_config = ConfigDict(populate_by_name=True)
+
+
+class BatchMoneyChangeRequest(BaseModel):
+    items: list[BatchMoneyChangeItem] = Field(..., min_length=1)
+
+
+class BatchMoneyChangeResult(BaseModel):
+    index: int
+    wallet_id: int
+    idempotency_key: str
+    status: Literal["applied", "replayed", "failed"]
+    entry_id: int | None = None
+    balance: Decimal | None = None
+    error: str | None = None
+
+
+class BatchMoneyChangeResponse(BaseModel):
+    applied: int
+    replayed: int
+    failed: int
+    results: list[BatchMoneyChangeResult]
+
+
 class BalanceResponse(BaseModel):
     id: int
     currency: str
@@ -77,11 +117,42 @@ class TransferResponse(BaseModel):
     target_wallet: WalletResponse
 
 
+class BulkTransferItem(BaseModel):
+    source_wallet_id: int
+    target_wallet_id: int
+    amount: Decimal = Field(..., gt=0)
+    currency: str = Field(..., min_length=3, max_length=3)
+    idempotency_key: str = Field(..., max_length=64)
+    description: str | None = None
+    external_reference: str | None = Field(None, max_length=64)
+
+
+class BulkTransferRequest(BaseModel):
+    transfers: list[BulkTransferItem] = Field(..., min_length=1)
+
+
+class BulkTransferResult(BaseModel):
+    index: int
+    idempotency_key: str
+    replayed: bool = False
+    transfer: TransferRecord | None = None
+    error: str | None = None
+
+
+class BulkTransferResponse(BaseModel):
+    completed: int
+    failed: int
+    replayed: int
+    results: list[BulkTransferResult]
+
+
 class HoldCreateRequest(BaseModel):
     amount: Decimal = Field(..., gt=0)
     idempotency_key: str = Field(..., max_length=64)
     reference: str | None = Field(None, max_length=64)
     details: dict | None = Field(None, alias="metadata")
+    # Seconds until an uncaptured hold is released; defaults to WALLET_HOLD_DEFAULT_TTL_SECONDS
+    expires_in_seconds: int | None = Field(None, gt=0)
 
     model_config = ConfigDict(populate_by_name=True)
 
@@ -96,10 +167,37 @@ class HoldResponse(BaseModel):
     amount: Decimal
     status: str
     reference: str | None
+    expires_at: datetime | None = None
     created_at: datetime
     updated_at: datetime
 
 
+class BulkHoldActionItem(BaseModel):
+    wallet_id: int
+    hold_id: int
+    # Release only: ledger key of the credit, defaulting to ``hold-release-<id>``
+    idempotency_key: str | None = Field(None, max_length=64)
+
+
+class BulkHoldActionRequest(BaseModel):
+    holds: list[BulkHoldActionItem] = Field(..., min_length=1)
+
+
+class BulkHoldActionResult(BaseModel):
+    index: int
+    hold_id: int
+    status: Literal["applied", "replayed", "failed"]
+    hold: HoldResponse | None = None
+    error: str | None = None
+
+
+class BulkHoldActionResponse(BaseModel):
+    applied: int
+    replayed: int
+    failed: int
+    results: list[BulkHoldActionResult]
+
+
 class LedgerEntryItem(BaseModel):
     id: int
     type: EntryType
@@ -121,3 +219,5 @@ class ReconciliationResponse(BaseModel):
     delta: Decimal
     entry_count: int
     status: str
+    # Ledger entry id the snapshot covered; None for a full rebuild or no snapshot yet
+    snapshot_entry_id: int | None = None
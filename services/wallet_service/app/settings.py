@@ -1,3 +1,4 @@
+from decimal import Decimal
 from functools import lru_cache
 from pydantic import AnyUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -22,8 +23,67 @@ class WalletSettings(BaseSettings):
     jwt_audience: str = "fintech-partners"
     jwt_issuer: str = "http://identity-service:8000"
     jwks_url: str = "http://identity-service:8000/api/v1/auth/jwks"
+    # Bounded cache of already-verified access tokens (entries live until token exp)
+    token_cache_max_entries: int = 10_000
+    # Batch credit/debit and bulk transfers: max items per request and items applied per transaction
+    batch_max_items: int = 5_000
+    batch_chunk_size: int = 500
     risk_base_url: str = "http://risk-service:8000/api/v1/risk"
     risk_checks_enabled: bool = False
+    # Risk client: per-call latency budget and shared connection pool size
+    risk_timeout_seconds: float = 0.3
+    risk_max_connections: int = 50
+    # Circuit breaker: consecutive failures to open, seconds before a half-open probe
+    risk_breaker_failure_threshold: int = 5
+    risk_breaker_reset_seconds: float = 10.0
+    # Decision cache keyed by wallet, user, currency, amount bucket and metadata
+    risk_decision_cache_ttl_seconds: float = 5.0
+    risk_decision_cache_max_entries: int = 10_000
+    risk_amount_bucket: Decimal = Decimal("10")
+    # Approve (true) or reject (false) debits when the risk service is unavailable
+    risk_fail_open: bool = False
+    # Concurrent pre-lock risk evaluations per batch request
+    risk_prescreen_concurrency: int = 16
+    # Outbox relay: target stream (approximate MAXLEN trim), claim size and idle poll interval
+    outbox_stream: str = "wallet-events"
+    outbox_stream_maxlen: int = 1_000_000
+    outbox_batch_size: int = 500
+    outbox_poll_interval_seconds: float = 1.0
+    outbox_relay_workers: int = 1
+    # Prometheus port for the relay process; 0 disables it
+    outbox_metrics_port: int = 9102
+    # Outbox compaction: processed events older than the retention window move to gzip NDJSON archives
+    outbox_retention_days: float = 14
+    outbox_archive_dir: str = "/var/lib/wallet/outbox-archive"
+    outbox_archive_batch_size: int = 10_000
+    outbox_delete_chunk_size: int = 1_000
+    # Ledger rows fetched per server-side cursor round-trip in statement exports
+    statement_export_chunk_size: int = 1_000
+    # Monthly partitions (PostgreSQL): months created ahead, months kept attached by the
+    # partitions job (0 = never detach; the service itself never detaches) and seconds between passes
+    partition_months_ahead: int = 3
+    partition_retain_months: int = 0
+    partition_interval_seconds: float = 6 * 3600.0
+    # Balance snapshot job: seconds between passes and wallets per grouped query
+    snapshot_interval_seconds: float = 300.0
+    snapshot_batch_size: int = 1_000
+    # Sharded hot wallets: max shards per wallet, rebalancer interval and wallets swept per transaction
+    shard_max_count: int = 64
+    shard_rebalance_interval_seconds: float = 5.0
+    shard_rebalance_batch_size: int = 100
+    # Idempotency front cache: key filter backend (local, redis or off), keys per window and
+    # false-positive rate, window length (two are kept), keys warmed at startup, replay responses
+    idempotency_filter_backend: str = "local"
+    idempotency_filter_capacity: int = 1_000_000
+    idempotency_filter_error_rate: float = 0.001
+    idempotency_filter_window_seconds: float = 86_400.0
+    idempotency_filter_warm_keys: int = 100_000
+    idempotency_response_cache_ttl_seconds: float = 600.0
+    idempotency_response_cache_max_entries: int = 10_000
+    # Hold expiry: lifetime of holds created without one (0 = never), sweeper interval and batch size
+    hold_default_ttl_seconds: int = 7 * 86_400
+    hold_expiry_interval_seconds: float = 30.0
+    hold_expiry_batch_size: int = 500
     # Observability
     otel_endpoint: AnyUrl = "http://jaeger:4317"
 
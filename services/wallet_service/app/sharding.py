@@ -0,0 +1,259 @@
+"""Sharded sub-balances for hot wallets.
+
+Platform fee and treasury wallets take a credit from almost every transfer,
+and locking their single ``wallets`` row serializes all of those transfers.
+A wallet opted into sharding (``PUT /wallets/{id}/shards``) gets
+``balance_shards`` rows in ``wallet_balance_shards``, and its balance becomes
+``wallets.balance`` plus the sum of its shards:
+
+* Credits lock one shard row and never the wallet row. The shard is derived
+  from the idempotency key when there is one, so retries of a request queue
+  on the same row and the replay check stays race-free; otherwise it is
+  picked at random.
+* Debits lock the wallet row as before and spend ``wallets.balance``. When
+  that is short they lock the shards and fold them in first.
+* ``ShardRebalancer`` sweeps shard balances into the wallet row in the
+  background, skipping shards busy with a credit, so debits rarely have to.
+
+Locks are always taken wallet row first, then shard rows. Wallet rows are
+locked ``FOR NO KEY UPDATE``, which does not block the key-share lock a
+credit's ledger insert takes on the wallet through its foreign key.
+
+Which wallets are sharded is cached per process from the wallet rows the
+money paths load anyway. A stale entry is harmless: crediting the wallet row
+is always correct, and a shard lookup for a wallet that is no longer sharded
+finds no row and falls back to it.
+
+Run the rebalancer with::
+
+    python -m services.wallet_service.app.sharding --interval 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import zlib
+from decimal import Decimal
+from typing import Iterable
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from .metrics import wallet_balance_shard_debit_drains_total, wallet_balance_shards_swept_total
+from .models import Wallet, WalletBalanceShard
+from .settings import wallet_settings
+
+_shard_counts: dict[int, int] = {}
+
+
+def remember_shards(wallet: Wallet) -> None:
+    """Record whether a freshly loaded wallet row is sharded."""
+    if wallet.balance_shards > 0:
+        _shard_counts[wallet.id] = wallet.balance_shards
+    else:
+        _shard_counts.pop(wallet.id, None)
+
+
+def known_shards(wallet_id: int) -> int:
+    return _shard_counts.get(wallet_id, 0)
+
+
+def pick_shard(shards: int, idempotency_key: str | None) -> int:
+    if idempotency_key:
+        return zlib.crc32(idempotency_key.encode()) % shards
+    return random.randrange(shards)
+
+
+async def lock_credit_shard(
+    session: AsyncSession, wallet_id: int, current_user_id: int, idempotency_key: str | None
+) -> tuple[Wallet, WalletBalanceShard] | None:
+    """Lock one shard of a sharded wallet for a credit, leaving the wallet row unlocked.
+
+    Returns ``None`` (without a query) for wallets not known to be sharded, and
+    when the wallet is missing, not owned by the caller or no longer sharded.
+    """
+    shards = known_shards(wallet_id)
+    if not shards:
+        return None
+    result = await session.execute(
+        select(WalletBalanceShard, Wallet)
+        .join(Wallet, Wallet.id == WalletBalanceShard.wallet_id)
+        .where(
+            WalletBalanceShard.wallet_id == wallet_id,
+            WalletBalanceShard.shard == pick_shard(shards, idempotency_key),
+            Wallet.owner_user_id == current_user_id,
+        )
+        .with_for_update(of=WalletBalanceShard)
+        .execution_options(populate_existing=True)
+    )
+    row = result.one_or_none()
+    if row is None:
+        _shard_counts.pop(wallet_id, None)
+        return None
+    shard, wallet = row
+    remember_shards(wallet)
+    return wallet, shard
+
+
+async def fold_shards(session: AsyncSession, wallet: Wallet) -> Decimal:
+    """Move every shard balance of a locked wallet into ``wallets.balance``."""
+    result = await session.execute(
+        select(WalletBalanceShard)
+        .where(WalletBalanceShard.wallet_id == wallet.id)
+        .order_by(WalletBalanceShard.shard)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    moved = Decimal("0")
+    for shard in result.scalars():
+        if shard.balance:
+            moved += shard.balance
+            shard.balance = Decimal("0.00")
+    wallet.balance = wallet.balance + moved
+    return moved
+
+
+async def fund_debit(session: AsyncSession, wallet: Wallet, amount: Decimal) -> bool:
+    """Fold a locked sharded wallet's shards in when its row alone cannot cover ``amount``.
+
+    Returns True when the shards were folded (they are all empty afterwards).
+    """
+    if not wallet.balance_shards or wallet.balance >= amount:
+        return False
+    await fold_shards(session, wallet)
+    wallet_balance_shard_debit_drains_total.inc()
+    return True
+
+
+async def shard_totals(session: AsyncSession, wallets: Iterable[Wallet]) -> dict[int, Decimal]:
+    """Sum of shard balances per sharded wallet; no query when none are sharded."""
+    wallet_ids = [wallet.id for wallet in wallets if wallet.balance_shards]
+    if not wallet_ids:
+        return {}
+    result = await session.execute(
+        select(WalletBalanceShard.wallet_id, func.sum(WalletBalanceShard.balance))
+        .where(WalletBalanceShard.wallet_id.in_(wallet_ids))
+        .group_by(WalletBalanceShard.wallet_id)
+    )
+    return {wallet_id: Decimal(total) for wallet_id, total in result}
+
+
+async def configure_shards(session: AsyncSession, wallet: Wallet, shards: int) -> None:
+    """Resize a locked wallet's shard set; dropped shards are folded into the wallet row."""
+    result = await session.execute(
+        select(WalletBalanceShard)
+        .where(WalletBalanceShard.wallet_id == wallet.id)
+        .order_by(WalletBalanceShard.shard)
+        .with_for_update()
+    )
+    existing = set()
+    for shard in result.scalars():
+        if shard.shard < shards:
+            existing.add(shard.shard)
+            continue
+        wallet.balance = wallet.balance + shard.balance
+        await session.delete(shard)
+    session.add_all(
+        WalletBalanceShard(wallet_id=wallet.id, shard=index, balance=Decimal("0.00"))
+        for index in range(shards)
+        if index not in existing
+    )
+    wallet.balance_shards = shards
+    remember_shards(wallet)
+
+
+class ShardRebalancer:
+    """Sweeps shard balances of sharded wallets into their wallet rows."""
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], *, batch_size: int = 100) -> None:
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+
+    async def run(self) -> int:
+        """Run one pass over all sharded wallets and return the number of shards swept.
+
+        Wallet and shard rows that are locked by in-flight money operations are
+        skipped rather than waited for; the next pass picks them up.
+        """
+        swept = 0
+        after_id = 0
+        while True:
+            async with self.session_factory() as session, session.begin():
+                wallet_ids = list(
+                    await session.scalars(
+                        select(Wallet.id)
+                        .where(Wallet.balance_shards > 0, Wallet.id > after_id)
+                        .order_by(Wallet.id)
+                        .limit(self.batch_size)
+                    )
+                )
+                if not wallet_ids:
+                    break
+                wallets = {
+                    wallet.id: wallet
+                    for wallet in await session.scalars(
+                        select(Wallet)
+                        .where(Wallet.id.in_(wallet_ids), Wallet.balance_shards > 0)
+                        .order_by(Wallet.id)
+                        .with_for_update(key_share=True, skip_locked=True)
+                        .execution_options(populate_existing=True)
+                    )
+                }
+                if wallets:
+                    shards = await session.scalars(
+                        select(WalletBalanceShard)
+                        .where(WalletBalanceShard.wallet_id.in_(wallets), WalletBalanceShard.balance != 0)
+                        .order_by(WalletBalanceShard.wallet_id, WalletBalanceShard.shard)
+                        .with_for_update(skip_locked=True)
+                        .execution_options(populate_existing=True)
+                    )
+                    for shard in shards:
+                        wallet = wallets[shard.wallet_id]
+                        wallet.balance = wallet.balance + shard.balance
+                        shard.balance = Decimal("0.00")
+                        swept += 1
+                        wallet_balance_shards_swept_total.inc()
+            after_id = wallet_ids[-1]
+        return swept
+
+
+async def run_rebalancer(interval_seconds: float, batch_size: int, *, once: bool) -> None:
+    settings = wallet_settings()
+    engine = create_async_engine(settings.async_db_url, pool_pre_ping=True)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    rebalancer = ShardRebalancer(session_factory, batch_size=batch_size)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                swept = await rebalancer.run()
+                logger.info(
+                    "Shard rebalance pass swept {} shards in {:.2f}s", swept, time.perf_counter() - start
+                )
+            except Exception as exc:  # noqa: BLE001
+                if once:
+                    raise
+                logger.warning("wallet.shards.pass_failed: {}", exc)
+            if once:
+                break
+            await asyncio.sleep(interval_seconds)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = wallet_settings()
+    parser = argparse.ArgumentParser(description="Sweep sharded wallet sub-balances into their wallet rows")
+    parser.add_argument("--interval", type=float, default=settings.shard_rebalance_interval_seconds)
+    parser.add_argument("--batch-size", type=int, default=settings.shard_rebalance_batch_size)
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+    asyncio.run(run_rebalancer(args.interval, args.batch_size, once=args.once))
+
+
+if __name__ == "__main__":
+    main()
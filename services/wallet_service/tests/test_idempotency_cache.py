@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import fakeredis
+import pytest
+
+from services.wallet_service.app.idempotency_cache import (
+    BloomFilter,
+    IdempotencyCache,
+    LocalKeyFilter,
+    RedisKeyFilter,
+    ReplayCache,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(1_000, error_rate=0.01)
+    for i in range(1_000):
+        bloom.add(f"key-{i}")
+    assert all(f"key-{i}" in bloom for i in range(1_000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+@pytest.mark.asyncio
+async def test_local_filter_forgets_keys_after_two_windows():
+    clock = FakeClock()
+    key_filter = LocalKeyFilter(capacity=100, window_seconds=60, clock=clock)
+    await key_filter.add("ledger:1:a")
+    assert await key_filter.might_contain("ledger:1:a")
+    assert not await key_filter.might_contain("ledger:1:b")
+
+    clock.now += 60
+    assert await key_filter.might_contain("ledger:1:a")
+    clock.now += 60
+    assert not await key_filter.might_contain("ledger:1:a")
+
+
+@pytest.mark.asyncio
+async def test_redis_filter_is_shared_between_replicas_and_fails_to_maybe():
+    server = fakeredis.FakeServer()
+    clock = FakeClock()
+    first, second = (
+        RedisKeyFilter(
+            fakeredis.FakeAsyncRedis(server=server), capacity=100, window_seconds=60, clock=clock
+        )
+        for _ in range(2)
+    )
+
+    await first.add("hold:1:a")
+    assert await second.might_contain("hold:1:a")
+    assert not await second.might_contain("hold:1:b")
+    clock.now += 60
+    assert await second.might_contain("hold:1:a")
+    clock.now += 60
+    assert not await second.might_contain("hold:1:a")
+
+    server.connected = False
+    assert await second.might_contain("hold:1:b")
+    await first.add("hold:1:c")  # logged, not raised
+
+
+@pytest.mark.asyncio
+async def test_idempotency_cache_scopes_keys_and_replays_responses():
+    clock = FakeClock()
+    responses = ReplayCache(ttl_seconds=10, max_entries=2, clock=clock)
+    cache = IdempotencyCache(LocalKeyFilter(capacity=100), responses)
+    assert not await cache.may_exist("ledger", 1, None)
+    assert not await cache.may_exist("ledger", 1, "k")
+    await cache.record("ledger", 1, "k")
+    assert await cache.may_exist("ledger", 1, "k")
+    assert not await cache.may_exist("ledger", 2, "k")
+    assert not await cache.may_exist("hold", 1, "k")
+
+    cache.remember_response("ledger", 1, "a", "first")
+    cache.remember_response("ledger", 1, "b", "second")
+    cache.remember_response("ledger", 1, "c", "third")
+    assert cache.response("ledger", 1, "a") is None
+    assert cache.response("ledger", 1, "c") == "third"
+    clock.now += 10
+    assert cache.response("ledger", 1, "c") is None
+
+    disabled = IdempotencyCache(None)
+    assert await disabled.may_exist("ledger", 1, "k")
+
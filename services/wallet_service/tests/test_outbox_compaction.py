@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from services.wallet_service.app.db.base import Base
+from services.wallet_service.app.models import OutboxEvent
+from services.wallet_service.app.outbox_compaction import OutboxCompactor
+
+NOW = datetime(2025, 11, 20, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture()
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_compaction_archives_only_expired_processed_events(session_factory, tmp_path):
+    async with session_factory() as session:
+        session.add_all(
+            OutboxEvent(event_type="wallet.old", payload={"n": i}, processed_at=NOW - timedelta(days=30))
+            for i in range(7)
+        )
+        session.add(OutboxEvent(event_type="wallet.recent", payload={}, processed_at=NOW - timedelta(days=1)))
+        session.add(OutboxEvent(event_type="wallet.pending", payload={}))
+        await session.commit()
+
+    compactor = OutboxCompactor(
+        session_factory,
+        tmp_path,
+        retention=timedelta(days=14),
+        batch_size=3,
+        delete_chunk_size=2,
+        clock=lambda: NOW,
+    )
+    report = await compactor.run()
+
+    assert report.rows_archived == report.rows_deleted == 7
+    assert len(report.files) == 3
+    assert report.bytes_archived == sum(path.stat().st_size for path in report.files)
+
+    archived = []
+    for path in report.files:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            archived.extend(json.loads(line) for line in fh)
+    assert [record["payload"]["n"] for record in archived] == list(range(7))
+    assert not list(tmp_path.glob("*.tmp"))
+
+    async with session_factory() as session:
+        remaining = (await session.scalars(select(OutboxEvent.event_type).order_by(OutboxEvent.id))).all()
+    assert remaining == ["wallet.recent", "wallet.pending"]
+
+    assert (await compactor.run()).rows_archived == 0
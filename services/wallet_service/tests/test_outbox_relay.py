@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from redis.exceptions import ConnectionError as RedisConnectionError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from services.wallet_service.app.db.base import Base
+from services.wallet_service.app.models import OUTBOX_NOTIFY_CHANNEL, OutboxEvent
+from services.wallet_service.app.outbox_relay import OutboxRelay, _listen
+
+
+@pytest_asyncio.fixture()
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    await engine.dispose()
+
+
+async def _add_events(session_factory, count: int) -> None:
+    async with session_factory() as session:
+        session.add_all(
+            OutboxEvent(event_type="wallet.transfer.created", payload={"transfer_id": i}) for i in range(count)
+        )
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_batches_and_marks_processed(session_factory):
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    relay = OutboxRelay(session_factory, redis_client, stream="wallet-events", batch_size=3)
+    await _add_events(session_factory, 5)
+    assert await relay.refresh_lag() >= 0
+
+    assert await relay.run_once() == 3
+    assert await relay.run_once() == 2
+    assert await relay.run_once() == 0
+
+    entries = await redis_client.xrange("wallet-events")
+    assert [json.loads(fields["payload"])["transfer_id"] for _, fields in entries] == [0, 1, 2, 3, 4]
+    assert entries[0][1]["event_type"] == "wallet.transfer.created"
+    assert len({fields["id"] for _, fields in entries}) == 5
+
+    async with session_factory() as session:
+        pending = await session.scalars(select(OutboxEvent).where(OutboxEvent.processed_at.is_(None)))
+        assert pending.all() == []
+    assert await relay.refresh_lag() == 0.0
+
+
+@pytest.mark.asyncio
+async def test_relay_leaves_batch_unprocessed_when_publish_fails(session_factory):
+    server = fakeredis.FakeServer()
+    redis_client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    relay = OutboxRelay(session_factory, redis_client, batch_size=10)
+    await _add_events(session_factory, 2)
+
+    server.connected = False
+    with pytest.raises(RedisConnectionError):
+        await relay.run_once()
+    server.connected = True
+
+    assert await relay.run_once() == 2
+
+
+class FlakyListenConnection:
+    """asyncpg connection stand-in whose health checks fail after ``checks`` successes."""
+
+    def __init__(self, checks: int) -> None:
+        self.checks = checks
+        self.listeners: dict[str, object] = {}
+        self.invalidated = False
+
+    async def add_listener(self, channel: str, callback) -> None:
+        self.listeners[channel] = callback
+
+    async def remove_listener(self, channel: str, callback) -> None:
+        self.listeners.pop(channel, None)
+
+    async def execute(self, query: str) -> None:
+        if self.checks <= 0:
+            message = "connection lost"
+            raise ConnectionResetError(message)
+        self.checks -= 1
+
+    async def get_raw_connection(self):
+        return SimpleNamespace(driver_connection=self)
+
+    async def invalidate(self) -> None:
+        self.invalidated = True
+
+
+class ListenEngine:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.connections: list[FlakyListenConnection] = []
+
+    @asynccontextmanager
+    async def connect(self):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        self.connections.append(outcome)
+        yield outcome
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_with_backoff_after_the_connection_drops():
+    dropped, healthy = FlakyListenConnection(checks=1), FlakyListenConnection(checks=1_000)
+    engine = ListenEngine(dropped, OSError("database unavailable"), healthy)
+    wakes, stop = [asyncio.Event(), asyncio.Event()], asyncio.Event()
+    listener = asyncio.create_task(
+        _listen(engine, wakes, stop, check_interval_seconds=0.01, backoff_seconds=0.01, max_backoff_seconds=0.02)
+    )
+    for _ in range(200):
+        await asyncio.sleep(0.01)
+        if engine.connections[-1] is healthy:
+            break
+    assert engine.connections == [dropped, healthy]
+    assert dropped.invalidated and not healthy.invalidated
+    assert list(healthy.listeners) == [OUTBOX_NOTIFY_CHANNEL]
+
+    for wake in wakes:
+        wake.clear()
+    healthy.listeners[OUTBOX_NOTIFY_CHANNEL](None, 1, OUTBOX_NOTIFY_CHANNEL, "")
+    assert all(wake.is_set() for wake in wakes)
+
+    stop.set()
+    await asyncio.wait_for(listener, timeout=1)
+    assert healthy.listeners == {}
+
+
+def test_notify_trigger_uses_the_channel_the_relay_listens_on(monkeypatch):
+    path = Path(__file__).resolve().parents[1] / "app/db/migrations/versions/20251115_0005_outbox_relay.py"
+    spec = importlib.util.spec_from_file_location("outbox_relay_migration", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    executed: list[str] = []
+    bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    monkeypatch.setattr(
+        migration,
+        "op",
+        SimpleNamespace(create_index=lambda *args, **kwargs: None, execute=executed.append, get_bind=lambda: bind),
+    )
+    migration.upgrade()
+    assert f"PERFORM pg_notify('{OUTBOX_NOTIFY_CHANNEL}', '');" in executed[0]
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import importlib.util
+from contextlib import asynccontextmanager
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from services.wallet_service.app.partitions import (
+    PartitionManager,
+    add_months,
+    create_partition_sql,
+    partition_name,
+    planned_partitions,
+)
+
+MIGRATIONS = Path(__file__).resolve().parents[1] / "app" / "db" / "migrations" / "versions"
+
+
+def _sql(statement) -> str:
+    return " ".join(str(statement).split())
+
+
+class StubResult:
+    def __init__(self, rows: list[tuple]) -> None:
+        self._rows = rows
+
+    def first(self) -> tuple | None:
+        return self._rows[0] if self._rows else None
+
+    def all(self) -> list[tuple]:
+        return self._rows
+
+
+class StubPostgres:
+    """Engine and connection stand-in: answers the catalog probes and records every statement."""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, partitions: dict[str, list[tuple[str, str]]], uncovered=(), pending=()) -> None:
+        self.partitions = partitions
+        self.uncovered = set(uncovered)
+        self.pending = set(pending)
+        self.statements: list[tuple[str, dict]] = []
+
+    @asynccontextmanager
+    async def connect(self):
+        yield self
+
+    begin = connect
+
+    async def execution_options(self, **_options) -> StubPostgres:
+        return self
+
+    async def execute(self, statement, params: dict | None = None) -> StubResult:
+        sql, params = _sql(statement), params or {}
+        if "pg_partitioned_table" in sql:
+            return StubResult([(1,)] if params["table"] in self.partitions else [])
+        if "pg_inherits" in sql:
+            return StubResult(list(self.partitions[params["table"]]))
+        if "wallet_balance_snapshots" in sql:
+            return StubResult([(1,)] if sql.split(" FROM ")[1].split()[0] in self.uncovered else [])
+        if "status = 'pending'" in sql:
+            return StubResult([(1,)] if sql.split(" FROM ")[1].split()[0] in self.pending else [])
+        self.statements.append((sql, params))
+        return StubResult([])
+
+    def executed(self) -> list[str]:
+        return [sql for sql, _ in self.statements]
+
+
+def _monthly(table: str, *months: date) -> list[tuple[str, str]]:
+    return [
+        (partition_name(table, month), f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{add_months(month, 1)} 00:00:00+00')")
+        for month in months
+    ]
+
+
+def _legacy(table: str, cutover: date) -> tuple[str, str]:
+    return (f"{table}_legacy", f"FOR VALUES FROM (MINVALUE) TO ('{cutover} 00:00:00+00')")
+
+
+def test_month_arithmetic_and_names():
+    assert add_months(date(2025, 11, 24), 0) == date(2025, 11, 1)
+    assert add_months(date(2025, 11, 1), 2) == date(2026, 1, 1)
+    assert add_months(date(2025, 1, 15), -1) == date(2024, 12, 1)
+    assert partition_name("ledger_entries", date(2026, 1, 1)) == "ledger_entries_p2026_01"
+
+
+def test_planned_partitions_cover_this_month_and_the_months_ahead():
+    assert planned_partitions("wallet_transfers", date(2025, 11, 30), 3) == [
+        ("wallet_transfers_p2025_11", date(2025, 11, 1), date(2025, 12, 1)),
+        ("wallet_transfers_p2025_12", date(2025, 12, 1), date(2026, 1, 1)),
+        ("wallet_transfers_p2026_01", date(2026, 1, 1), date(2026, 2, 1)),
+        ("wallet_transfers_p2026_02", date(2026, 2, 1), date(2026, 3, 1)),
+    ]
+    assert create_partition_sql(
+        "ledger_entries", "ledger_entries_p2026_01", date(2026, 1, 1), date(2026, 2, 1)
+    ) == (
+        "CREATE TABLE IF NOT EXISTS ledger_entries_p2026_01 PARTITION OF ledger_entries "
+        "FOR VALUES FROM ('2026-01-01') TO ('2026-02-01')"
+    )
+
+
+@pytest.mark.asyncio
+async def test_maintenance_is_a_noop_without_partitioned_tables():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    try:
+        report = await PartitionManager(engine, retain_months=12).run()
+    finally:
+        await engine.dispose()
+    assert report == {
+        "ledger_entries": {"created": [], "detached": []},
+        "wallet_transfers": {"created": [], "detached": []},
+    }
+
+
+@pytest.mark.asyncio
+async def test_future_partitions_are_created_for_missing_months_only():
+    db = StubPostgres(
+        {
+            "ledger_entries": [_legacy("ledger_entries", date(2025, 12, 1)), *_monthly("ledger_entries", date(2025, 12, 1))],
+            "wallet_transfers": [],
+        }
+    )
+    manager = PartitionManager(db, months_ahead=2, today=lambda: date(2025, 12, 15))
+    assert await manager.ensure_future_partitions("ledger_entries") == [
+        "ledger_entries_p2026_01",
+        "ledger_entries_p2026_02",
+    ]
+    assert db.executed() == [
+        "CREATE TABLE IF NOT EXISTS ledger_entries_p2026_01 PARTITION OF ledger_entries "
+        "FOR VALUES FROM ('2026-01-01') TO ('2026-02-01')",
+        "CREATE TABLE IF NOT EXISTS ledger_entries_p2026_02 PARTITION OF ledger_entries "
+        "FOR VALUES FROM ('2026-02-01') TO ('2026-03-01')",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cold_ledger_partitions_are_archived_then_detached_oldest_first():
+    months = (date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1))
+    db = StubPostgres(
+        {"ledger_entries": [*_monthly("ledger_entries", *months), _legacy("ledger_entries", date(2025, 12, 1))]},
+        uncovered={"ledger_entries_p2026_01"},
+    )
+    manager = PartitionManager(db, retain_months=12, today=lambda: date(2027, 3, 10))
+    assert await manager.detach_cold_partitions("ledger_entries") == [
+        "ledger_entries_legacy",
+        "ledger_entries_p2025_12",
+    ]
+
+    statements = db.executed()
+    assert len(statements) == 4
+    for (sql, params), (partition, upper) in zip(
+        db.statements[::2],
+        (("ledger_entries_legacy", "2025-12-01"), ("ledger_entries_p2025_12", "2026-01-01")),
+        strict=True,
+    ):
+        assert sql.startswith("INSERT INTO wallet_ledger_archives")
+        assert f"FROM {partition} GROUP BY wallet_id" in sql
+        assert "WHERE wallet_ledger_archives.archived_before < EXCLUDED.archived_before" in sql
+        # archived_before is a naive UTC timestamp, like created_at
+        assert params["upper"].isoformat() == f"{upper}T00:00:00"
+    assert statements[1::2] == [
+        "ALTER TABLE ledger_entries DETACH PARTITION ledger_entries_legacy CONCURRENTLY",
+        "ALTER TABLE ledger_entries DETACH PARTITION ledger_entries_p2025_12 CONCURRENTLY",
+    ]
+    # Not covered by snapshots: it and every newer partition stay attached
+    assert not any("ledger_entries_p2026" in sql for sql in statements)
+
+
+@pytest.mark.asyncio
+async def test_transfer_partitions_with_pending_transfers_stay_attached():
+    months = (date(2025, 12, 1), date(2026, 1, 1), date(2026, 2, 1))
+    db = StubPostgres(
+        {"wallet_transfers": _monthly("wallet_transfers", *months)}, pending={"wallet_transfers_p2025_12"}
+    )
+    manager = PartitionManager(db, retain_months=1, today=lambda: date(2026, 3, 5))
+    assert await manager.detach_cold_partitions("wallet_transfers") == ["wallet_transfers_p2026_01"]
+    archive, detach = db.executed()
+    assert archive.startswith("INSERT INTO wallet_transfers_archive (id, ")
+    assert archive.endswith("FROM wallet_transfers_p2026_01 ON CONFLICT (idempotency_key) DO NOTHING")
+    assert detach == "ALTER TABLE wallet_transfers DETACH PARTITION wallet_transfers_p2026_01 CONCURRENTLY"
+
+
+def _load_migration(filename: str):
+    spec = importlib.util.spec_from_file_location(filename.removesuffix(".py"), MIGRATIONS / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_partition_migration_attaches_legacy_rows_and_registers_keys(monkeypatch):
+    migration = _load_migration("20251124_0008_partition_ledger.py")
+    executed: list[str] = []
+    bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+    monkeypatch.setattr(
+        migration, "op", SimpleNamespace(execute=lambda sql: executed.append(_sql(sql)), get_bind=lambda: bind)
+    )
+    monkeypatch.setattr(migration, "_utc_today", lambda: date(2025, 12, 31))
+    migration.upgrade()
+
+    for table in ("ledger_entries", "wallet_transfers"):
+        legacy = f"{table}_legacy"
+        # The bound is checked NOT VALID, validated, and only then is the table attached
+        check = executed.index(
+            f"ALTER TABLE {legacy} ADD CONSTRAINT {legacy}_bound CHECK (created_at < '2026-01-01') NOT VALID"
+        )
+        validate = executed.index(f"ALTER TABLE {legacy} VALIDATE CONSTRAINT {legacy}_bound")
+        attach = executed.index(
+            f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('2026-01-01')"
+        )
+        assert check < validate < attach
+        monthly = [sql for sql in executed if sql.startswith(f"CREATE TABLE {table}_p")]
+        assert monthly == [
+            f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+            for name, start, end in planned_partitions(table, date(2026, 1, 1), migration.MONTHS_AHEAD)
+        ]
+        assert (
+            f"CREATE TRIGGER {table}_idempotency BEFORE INSERT ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {table}_claim_idempotency_key()"
+        ) in executed
+
+    [ledger_claim] = [sql for sql in executed if sql.startswith("CREATE FUNCTION ledger_entries_claim")]
+    assert (
+        "INSERT INTO ledger_idempotency_keys (wallet_id, idempotency_key) "
+        "VALUES (NEW.wallet_id, NEW.idempotency_key);"
+    ) in ledger_claim
+    [transfer_claim] = [sql for sql in executed if sql.startswith("CREATE FUNCTION wallet_transfers_claim")]
+    assert "INSERT INTO wallet_transfer_idempotency_keys (idempotency_key) VALUES (NEW.idempotency_key);" in transfer_claim
+    assert (
+        "INSERT INTO ledger_idempotency_keys (wallet_id, idempotency_key) "
+        "SELECT wallet_id, idempotency_key FROM ledger_entries_legacy WHERE idempotency_key IS NOT NULL"
+    ) in executed
+
+    executed.clear()
+    bind.dialect.name = "sqlite"
+    migration.upgrade()
+    assert executed == []
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from services.wallet_service.app.balance_snapshots import BalanceSnapshotter
+from services.wallet_service.app.db.base import Base
+from services.wallet_service.app.models import LedgerEntry, Wallet
+from services.wallet_service.app.reconciliation_scan import ReconciliationScanner
+
+
+@pytest_asyncio.fixture()
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    await engine.dispose()
+
+
+async def _seed(session_factory, balances: list[str], drift: dict[int, str]) -> list[int]:
+    async with session_factory() as session:
+        wallets = [Wallet(owner_user_id=7, currency="USD", balance=Decimal(b)) for b in balances]
+        session.add_all(wallets)
+        await session.flush()
+        for index, wallet in enumerate(wallets):
+            session.add(LedgerEntry(wallet_id=wallet.id, type="credit", amount=Decimal(balances[index]) + 1))
+            session.add(LedgerEntry(wallet_id=wallet.id, type="debit", amount=Decimal("1.00")))
+            if index in drift:
+                wallet.balance = Decimal(drift[index])
+        await session.commit()
+        return [wallet.id for wallet in wallets]
+
+
+@pytest.mark.asyncio
+async def test_scan_reports_drift_and_resumes_from_checkpoint(session_factory, tmp_path):
+    wallet_ids = await _seed(session_factory, ["10.00", "20.00", "30.00", "40.00", "50.00"], {1: "21.00", 4: "0.00"})
+    await BalanceSnapshotter(session_factory).run()
+    report_path = tmp_path / "drift.ndjson"
+    checkpoint_path = tmp_path / "scan.json"
+
+    scanner = ReconciliationScanner(
+        session_factory, report_path, checkpoint_path=checkpoint_path, shard_size=2, workers=2
+    )
+    summary = await scanner.run()
+    assert summary.wallets_scanned == 5
+    assert summary.wallets_drifted == 2
+
+    records = [json.loads(line) for line in report_path.read_text().splitlines()]
+    assert sorted((r["wallet_id"], r["delta"]) for r in records) == [
+        (wallet_ids[1], "-1.00"),
+        (wallet_ids[4], "50.00"),
+    ]
+    assert all(r["entry_count"] == 2 for r in records)
+
+    resumed = ReconciliationScanner(session_factory, report_path, checkpoint_path=checkpoint_path, shard_size=2)
+    again = await resumed.run()
+    assert again.shards_scanned == 0
+    assert again.shards_skipped == summary.shards_scanned
+
+    full = await ReconciliationScanner(session_factory, tmp_path / "full.ndjson", shard_size=3, full=True).run()
+    assert full.wallets_drifted == 2
+
+
+@pytest.mark.asyncio
+async def test_scan_is_rate_limited(session_factory, tmp_path):
+    await _seed(session_factory, ["1.00"] * 4, {})
+    now = [0.0]
+    sleeps: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    scanner = ReconciliationScanner(
+        session_factory,
+        tmp_path / "drift.ndjson",
+        shard_size=2,
+        workers=1,
+        max_wallets_per_second=2,
+        clock=lambda: now[0],
+        sleep=fake_sleep,
+    )
+    summary = await scanner.run()
+    assert summary.wallets_scanned == 4
+    # Ids 1..4 fall into aligned shards [0, 1], [2, 3], [4, 5]; each shard
+    # waits for the wallets the previous one scanned at 2 wallets/s
+    assert summary.shards_scanned == 3
+    assert sleeps == [pytest.approx(0.5), pytest.approx(1.0)]
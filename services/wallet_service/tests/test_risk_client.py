@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+
+from services.wallet_service.app.risk_client import (
+    CircuitBreaker,
+    RiskClient,
+    RiskDecisionCache,
+    RiskEvaluationRejected,
+    RiskServiceUnavailable,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeRiskService:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.status_code = 200
+        self.decision = "approve"
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.status_code >= 400:
+            return httpx.Response(self.status_code, request=request)
+        return httpx.Response(200, json={"decision": self.decision}, request=request)
+
+
+def _payload(amount: str = "12.00", wallet_id: int = 1) -> dict:
+    return {
+        "event_type": "wallet_transaction",
+        "subject_id": str(wallet_id),
+        "user_id": "42",
+        "amount": amount,
+        "currency": "USD",
+        "metadata": {"client_ip": "10.0.0.1"},
+    }
+
+
+def _client(service: FakeRiskService, clock: FakeClock, **kwargs) -> RiskClient:
+    return RiskClient(
+        "http://risk/api/v1/risk",
+        breaker=CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock),
+        cache=RiskDecisionCache(ttl_seconds=5, clock=clock),
+        transport=httpx.MockTransport(service.handler),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_decisions_are_cached_per_amount_bucket():
+    clock = FakeClock()
+    service = FakeRiskService()
+    client = _client(service, clock)
+
+    assert await client.evaluate(_payload("12.00")) == "approve"
+    assert await client.evaluate(_payload("17.50")) == "approve"  # same 10-unit bucket
+    assert service.calls == 1
+    await client.evaluate(_payload("21.00"))
+    await client.evaluate(_payload("12.00", wallet_id=2))
+    assert service.calls == 3
+
+    clock.now += 5
+    await client.evaluate(_payload("12.00"))
+    assert service.calls == 4
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_then_probes_half_open():
+    clock = FakeClock()
+    service = FakeRiskService()
+    service.status_code = 503
+    client = _client(service, clock)
+
+    for amount in ("1", "11"):
+        with pytest.raises(RiskServiceUnavailable):
+            await client.evaluate(_payload(amount))
+    assert client.breaker.state == "open"
+
+    # Open: rejected without touching the service
+    with pytest.raises(RiskServiceUnavailable):
+        await client.evaluate(_payload("21"))
+    assert service.calls == 2
+
+    # Half-open probe fails and re-opens the breaker
+    clock.now += 10
+    with pytest.raises(RiskServiceUnavailable):
+        await client.evaluate(_payload("31"))
+    assert service.calls == 3
+    assert client.breaker.state == "open"
+
+    # Next probe succeeds and closes it
+    clock.now += 10
+    service.status_code = 200
+    assert await client.evaluate(_payload("41")) == "approve"
+    assert client.breaker.state == "closed"
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_fail_open_policy_and_client_errors():
+    clock = FakeClock()
+    service = FakeRiskService()
+    service.status_code = 500
+    client = _client(service, clock, fail_open=True)
+    assert await client.evaluate(_payload()) == "approve"
+
+    service.status_code = 422
+    with pytest.raises(RiskEvaluationRejected):
+        await client.evaluate(_payload("100"))
+    assert client.breaker.state == "closed"
+    await client.aclose()
+
+
+def test_breaker_recovers_from_lost_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now += 5
+    assert breaker.allow() is True  # probe goes out but never reports back
+    assert breaker.allow() is False
+    clock.now += 5
+    assert breaker.allow() is True
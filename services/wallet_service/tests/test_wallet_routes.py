@@ -1,18 +1,42 @@
 from __future__ import annotations
 
+import csv
+import gzip
+import io
+import json
+from datetime import UTC, datetime, timedelta
 from decimal import Decimal
 
 import pytest
 import pytest_asyncio
+from fastapi import HTTPException
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import select
+from sqlalchemy import event, select, text
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from services.wallet_service.app import idempotency_cache as idempotency_cache_module
+from services.wallet_service.app import sharding as sharding_module
+from services.wallet_service.app.balance_snapshots import BalanceSnapshotter, ledger_totals
 from services.wallet_service.app.db.base import Base
 from services.wallet_service.app.dependencies import get_current_user_id, get_session
+from services.wallet_service.app.hold_expiry import HoldExpirySweeper
 from services.wallet_service.app.main import create_app
+from services.wallet_service.app.reconciliation_scan import ReconciliationScanner
 from services.wallet_service.app import settings as wallet_settings_module
-from services.wallet_service.app.models import Transfer, TransferStatus, OutboxEvent, Wallet
+from services.wallet_service.app.models import (
+    ArchivedTransfer,
+    BalanceSnapshot,
+    Hold,
+    LedgerArchive,
+    LedgerEntry,
+    OutboxEvent,
+    Transfer,
+    TransferStatus,
+    Wallet,
+    WalletBalanceShard,
+    with_entries,
+    with_holds,
+)
 
 
 def _asgi_client(app):
@@ -55,10 +79,54 @@ async def _adjust_wallet_balance(app, wallet_id: int, delta: Decimal) -> None:
         await session.commit()
 
 
+async def _grow_ledger(app, wallet_id: int, entries: int) -> None:
+    session_factory = app.state._session_factory
+    async with session_factory() as session:
+        session.add_all(
+            LedgerEntry(wallet_id=wallet_id, type="credit", amount=Decimal("1.00"), idempotency_key=f"grow-{wallet_id}-{i}")
+            for i in range(entries)
+        )
+        session.add_all(
+            Hold(wallet_id=wallet_id, amount=Decimal("1.00"), status="released", idempotency_key=f"grow-hold-{wallet_id}-{i}")
+            for i in range(entries // 10)
+        )
+        wallet = await session.get(Wallet, wallet_id)
+        wallet.balance = wallet.balance + entries
+        await session.commit()
+
+
+class _SQLCounter:
+    """Count statements executed and ORM rows loaded while active."""
+
+    def __init__(self, app) -> None:
+        self.engine = app.state._session_factory.kw["bind"].sync_engine
+        self.statements = 0
+        self.rows = 0
+        self.sql: list[str] = []
+
+    def _on_execute(self, _conn, _cursor, statement, *_args) -> None:
+        self.statements += 1
+        self.sql.append(statement)
+
+    def _on_load(self, *_args) -> None:
+        self.rows += 1
+
+    def __enter__(self) -> "_SQLCounter":
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        event.listen(Base, "load", self._on_load, propagate=True)
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        event.remove(Base, "load", self._on_load)
+
+
 @pytest_asyncio.fixture()
 async def wallet_test_app(monkeypatch):
     wallet_settings_module.wallet_settings.cache_clear()
     monkeypatch.setenv("WALLET_RISK_CHECKS_ENABLED", "false")
+    # Wallet ids and keys repeat across tests' in-memory databases
+    monkeypatch.setattr(idempotency_cache_module, "_idempotency_cache", None)
 
     async def fake_run_migrations(*_args, **_kwargs) -> None:  # pragma: no cover - helper
         return None
@@ -213,6 +281,93 @@ async def test_hold_lifecycle_preserves_invariants(wallet_test_app):
         assert Decimal(str(final_balance.json()["balance"])) == Decimal("50.00")
 
 
+@pytest.mark.asyncio
+async def test_expired_holds_are_released_by_the_sweeper(wallet_test_app):
+    session_factory = wallet_test_app.state._session_factory
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "100.00", "expiry-seed")
+
+        holds = []
+        for key, amount, ttl in (("expiry-1", "30.00", 60), ("expiry-2", "20.00", None), ("expiry-3", "10.00", 60)):
+            payload = {"amount": amount, "idempotency_key": key, "expires_in_seconds": ttl}
+            created = await client.post(f"{url}/holds", json=payload)
+            assert created.status_code == 201
+            holds.append(created.json())
+        assert all(hold["expires_at"] is not None for hold in holds)
+
+        # Past its deadline but not swept yet: capture is refused
+        async with session_factory() as session, session.begin():
+            expired = await session.get(Hold, holds[2]["id"])
+            expired.expires_at = datetime(2000, 1, 1)
+        capture = await client.post(f"{url}/holds/{holds[2]['id']}/capture")
+        assert capture.status_code == 409
+
+        sweeper = HoldExpirySweeper(
+            session_factory, batch_size=1, clock=lambda: datetime.utcnow() + timedelta(seconds=120)
+        )
+        assert await sweeper.run() == 2
+        assert await sweeper.run() == 0
+
+        balance = await client.get(f"{url}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("80.00")
+        release = await client.post(f"{url}/holds/{holds[0]['id']}/release", json={})
+        assert release.json()["status"] == "released"
+
+    async with session_factory() as session:
+        statuses = {hold.id: hold.status for hold in await session.scalars(select(Hold))}
+        assert [statuses[hold["id"]] for hold in holds] == ["released", "active", "released"]
+        keys = set(await session.scalars(select(LedgerEntry.idempotency_key)))
+        assert {f"hold-release-{holds[0]['id']}", f"hold-release-{holds[2]['id']}"} <= keys
+        events = list(await session.scalars(select(OutboxEvent).where(OutboxEvent.event_type == "wallet.hold.expired")))
+        assert sorted(event.payload["hold_id"] for event in events) == [holds[0]["id"], holds[2]["id"]]
+
+
+@pytest.mark.asyncio
+async def test_batch_hold_capture_and_release(wallet_test_app):
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "100.00", "bulk-hold-seed")
+        hold_ids = []
+        for i, amount in enumerate(("10.00", "20.00", "30.00", "5.00")):
+            created = await client.post(f"{url}/holds", json={"amount": amount, "idempotency_key": f"bulk-hold-{i}"})
+            hold_ids.append(created.json()["id"])
+        first, second, third, fourth = ({"wallet_id": wallet["id"], "hold_id": hold_id} for hold_id in hold_ids)
+
+        captured = await client.post("/api/v1/wallets/holds/batch/capture", json={"holds": [first, second, first]})
+        assert captured.status_code == 200
+        body = captured.json()
+        assert (body["applied"], body["replayed"], body["failed"]) == (2, 1, 0)
+        assert all(result["hold"]["status"] == "captured" for result in body["results"])
+
+        release_payload = {"holds": [first, third, fourth, third, {"wallet_id": wallet["id"], "hold_id": 9999}]}
+        with _SQLCounter(wallet_test_app) as counter:
+            released = await client.post("/api/v1/wallets/holds/batch/release", json=release_payload)
+        body = released.json()
+        assert [result["status"] for result in body["results"]] == ["failed", "applied", "applied", "replayed", "failed"]
+        assert [result["error"] for result in body["results"]][::4] == ["Hold already captured", "Hold not found"]
+        # Both release credits go out in one multi-row insert
+        assert sum(sql.startswith("INSERT INTO ledger_entries") for sql in counter.sql) == 1
+
+        balance = await client.get(f"{url}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("70.00")
+
+        replay = await client.post("/api/v1/wallets/holds/batch/release", json={"holds": [third, fourth]})
+        assert replay.json()["replayed"] == 2
+        capture_released = await client.post("/api/v1/wallets/holds/batch/capture", json={"holds": [third]})
+        assert capture_released.json()["results"][0]["error"] == "Hold already released"
+        balance = await client.get(f"{url}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("70.00")
+
+    async with wallet_test_app.state._session_factory() as session:
+        entries = await session.scalars(
+            select(LedgerEntry).where(LedgerEntry.idempotency_key.like("hold-release-%")).order_by(LedgerEntry.id)
+        )
+        assert [entry.details["hold_id"] for entry in entries] == hold_ids[2:]
+
+
 @pytest.mark.asyncio
 async def test_statements_paginate_and_require_ownership(wallet_test_app):
     async with _asgi_client(wallet_test_app) as client:
@@ -272,6 +427,94 @@ async def test_transfer_failure_records_state(wallet_test_app):
         assert failed_events == 1
 
 
+@pytest.mark.asyncio
+async def test_statement_filters_keep_keyset_pagination_stable(wallet_test_app):
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _seed_balance(client, wallet_id, "100.00", "filter-seed")
+        for i in range(6):
+            kind = "debit" if i % 2 else "credit"
+            details = {"type": "transfer" if i < 4 else "fee"}
+            response = await client.post(
+                f"/api/v1/wallets/{wallet_id}/{kind}",
+                json={"amount": f"{i + 1}.00", "idempotency_key": f"filter-{i}", "details": details},
+            )
+            assert response.status_code == 200
+
+        async def collect(**params) -> list[dict]:
+            entries, cursor = [], None
+            while True:
+                page_params = {**params, "limit": 2, **({"cursor": cursor} if cursor else {})}
+                page = await client.get(f"/api/v1/wallets/{wallet_id}/statements", params=page_params)
+                assert page.status_code == 200
+                body = page.json()
+                entries.extend(body["entries"])
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    return entries
+
+        debits = await collect(type="debit")
+        assert [Decimal(str(e["amount"])) for e in debits] == [Decimal("6.00"), Decimal("4.00"), Decimal("2.00")]
+
+        transfers = await collect(details_type="transfer", min_amount="2.00", max_amount="3.00")
+        assert [Decimal(str(e["amount"])) for e in transfers] == [Decimal("3.00"), Decimal("2.00")]
+
+        fee_credits = await collect(details_type="fee", type="credit")
+        assert [e["details"] for e in fee_credits] == [{"type": "fee"}]
+
+        everything = await collect(start="2000-01-01T00:00:00Z", end="2999-01-01T00:00:00+02:00")
+        ids = [e["id"] for e in everything]
+        assert len(ids) == 7 and ids == sorted(ids, reverse=True)
+        assert await collect(end="2000-01-01T00:00:00") == []
+
+        invalid = await client.get(f"/api/v1/wallets/{wallet_id}/statements", params={"type": "refund"})
+        assert invalid.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_statement_export_streams_ndjson_and_gzipped_csv(wallet_test_app, monkeypatch):
+    monkeypatch.setenv("WALLET_STATEMENT_EXPORT_CHUNK_SIZE", "10")
+    wallet_settings_module.wallet_settings.cache_clear()
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _seed_balance(client, wallet_id, "30.00", "export-seed")
+        await _grow_ledger(wallet_test_app, wallet_id, 24)
+
+        response = await client.get(
+            f"/api/v1/wallets/{wallet_id}/statements/export", headers={"accept-encoding": "identity"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "content-encoding" not in response.headers
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 25
+        assert [line["id"] for line in lines] == sorted(line["id"] for line in lines)
+        assert lines[0]["amount"] == "30.00" and lines[0]["type"] == "credit"
+
+        async with client.stream(
+            "GET",
+            f"/api/v1/wallets/{wallet_id}/statements/export",
+            params={"format": "csv"},
+            headers={"accept-encoding": "gzip"},
+        ) as streamed:
+            assert streamed.headers["content-encoding"] == "gzip"
+            raw = b"".join([chunk async for chunk in streamed.aiter_raw()])
+        rows = list(csv.reader(io.StringIO(gzip.decompress(raw).decode("utf-8"))))
+        assert rows[0] == ["id", "type", "amount", "details", "created_at"]
+        assert len(rows) == 26
+
+        future = await client.get(
+            f"/api/v1/wallets/{wallet_id}/statements/export", params={"start": "2999-01-01T00:00:00Z"}
+        )
+        assert future.status_code == 200
+        assert future.text == ""
+
+        missing = await client.get("/api/v1/wallets/9999/statements/export")
+        assert missing.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_reconciliation_detects_drift(wallet_test_app):
     async with _asgi_client(wallet_test_app) as client:
@@ -289,3 +532,689 @@ async def test_reconciliation_detects_drift(wallet_test_app):
         body = drift.json()
         assert body["status"] == "drift_detected"
         assert Decimal(str(body["delta"])) == Decimal("-5.00")
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_aggregates_only_entries_after_snapshot(wallet_test_app):
+    snapshotter = BalanceSnapshotter(wallet_test_app.state._session_factory, batch_size=2)
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _create_wallet(client, currency="EUR")
+        await _seed_balance(client, wallet_id, "10.00", "snap-seed")
+        await _grow_ledger(wallet_test_app, wallet_id, 200)
+
+        assert await snapshotter.run() == 1
+        assert await snapshotter.run() == 0
+
+        await _seed_balance(client, wallet_id, "2.50", "snap-after-1")
+        await _seed_balance(client, wallet_id, "2.50", "snap-after-2")
+        with _SQLCounter(wallet_test_app) as counter:
+            response = await client.get(f"/api/v1/wallets/{wallet_id}/reconciliation")
+        body = response.json()
+        assert body["status"] == "balanced"
+        assert body["entry_count"] == 203
+        assert body["snapshot_entry_id"] is not None
+        assert any("ledger_entries.id >" in sql for sql in counter.sql)
+
+        full = (await client.get(f"/api/v1/wallets/{wallet_id}/reconciliation", params={"full": "true"})).json()
+        assert full["snapshot_entry_id"] is None
+        assert (full["entry_count"], full["ledger_balance"]) == (body["entry_count"], body["ledger_balance"])
+
+        assert await snapshotter.run() == 1
+        await _adjust_wallet_balance(wallet_test_app, wallet_id, Decimal("1.00"))
+        drift = (await client.get(f"/api/v1/wallets/{wallet_id}/reconciliation")).json()
+        assert drift["status"] == "drift_detected"
+        assert drift["entry_count"] == 203
+
+        assert await snapshotter.run(full=True) == 1
+        rebuilt = (await client.get(f"/api/v1/wallets/{wallet_id}/reconciliation")).json()
+        assert rebuilt["ledger_balance"] == full["ledger_balance"]
+
+
+@pytest.mark.asyncio
+async def test_money_paths_do_not_scale_with_ledger_size(wallet_test_app):
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _seed_balance(client, wallet_id, "100.00", "loading-seed")
+
+        async def measure(round_no: int) -> list[tuple[int, int]]:
+            samples = []
+            for method, path, payload in (
+                ("post", "credit", {"amount": "5.00", "idempotency_key": f"loading-credit-{round_no}"}),
+                ("post", "debit", {"amount": "1.00", "idempotency_key": f"loading-debit-{round_no}"}),
+                ("get", "balance", None),
+            ):
+                with _SQLCounter(wallet_test_app) as counter:
+                    kwargs = {"json": payload} if payload else {}
+                    response = await getattr(client, method)(f"/api/v1/wallets/{wallet_id}/{path}", **kwargs)
+                assert response.status_code == 200
+                samples.append((counter.statements, counter.rows))
+            return samples
+
+        small = await measure(0)
+        await _grow_ledger(wallet_test_app, wallet_id, 500)
+        large = await measure(1)
+        assert small == large
+        # Only the wallet row itself is materialized on each path
+        assert all(rows <= 1 for _, rows in large)
+
+    session_factory = wallet_test_app.state._session_factory
+    async with session_factory() as session:
+        loaded = await session.scalar(
+            select(Wallet).options(with_entries(), with_holds()).where(Wallet.id == wallet_id)
+        )
+        assert len(loaded.entries) == 505
+        assert len(loaded.holds) == 50
+
+
+@pytest.mark.asyncio
+async def test_credit_and_debit_update_in_place_and_replay_via_unique_key(wallet_test_app, monkeypatch):
+    # Replays must reach the database rather than the response cache
+    monkeypatch.setenv("WALLET_IDEMPOTENCY_RESPONSE_CACHE_MAX_ENTRIES", "0")
+    wallet_settings_module.wallet_settings.cache_clear()
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "20.00", "in-place-seed")
+
+        for path, payload in (
+            ("credit", {"amount": "5.00", "idempotency_key": "in-place-credit"}),
+            ("debit", {"amount": "10.00", "idempotency_key": "in-place-debit"}),
+        ):
+            with _SQLCounter(wallet_test_app) as counter:
+                response = await client.post(f"{url}/{path}", json=payload)
+            assert response.status_code == 200
+            # No read-modify-write: the UPDATE locks the row, the ledger insert follows
+            assert [sql.split()[0] for sql in counter.sql] == ["UPDATE", "INSERT"]
+            assert "RETURNING" in counter.sql[0]
+        assert Decimal(str(response.json()["balance"])) == Decimal("15.00")
+
+        # The ledger's unique key turns repeats into replays, even once funds ran out
+        replay = await client.post(f"{url}/credit", json={"amount": "5.00", "idempotency_key": "in-place-credit"})
+        assert Decimal(str(replay.json()["balance"])) == Decimal("15.00")
+        drain = await client.post(f"{url}/debit", json={"amount": "15.00"})
+        assert Decimal(str(drain.json()["balance"])) == Decimal("0.00")
+        replay = await client.post(f"{url}/debit", json={"amount": "10.00", "idempotency_key": "in-place-debit"})
+        assert replay.status_code == 200
+        insufficient = await client.post(f"{url}/debit", json={"amount": "0.01", "idempotency_key": "in-place-2"})
+        assert insufficient.status_code == 409
+        missing = await client.post("/api/v1/wallets/9999/credit", json={"amount": "1.00"})
+        assert missing.status_code == 404
+
+    async with wallet_test_app.state._session_factory() as session:
+        keys = await session.scalars(select(LedgerEntry.idempotency_key).where(LedgerEntry.wallet_id == wallet["id"]))
+        assert sorted(filter(None, keys)) == ["in-place-credit", "in-place-debit", "in-place-seed"]
+
+
+@pytest.mark.asyncio
+async def test_idempotency_cache_skips_lookups_for_new_keys_and_replays_from_memory(wallet_test_app, monkeypatch):
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "50.00", "cache-seed")
+
+        # A confirmed replay is answered from the response cache without SQL
+        with _SQLCounter(wallet_test_app) as counter:
+            replay = await client.post(f"{url}/credit", json={"amount": "50.00", "idempotency_key": "cache-seed"})
+        assert counter.statements == 0
+        assert Decimal(str(replay.json()["balance"])) == Decimal("50.00")
+
+        # A new hold key skips both the hold and the ledger replay lookups
+        hold_payload = {"amount": "20.00", "idempotency_key": "cache-hold", "reference": "auth-1"}
+        with _SQLCounter(wallet_test_app) as counter:
+            created = await client.post(f"{url}/holds", json=hold_payload)
+        assert created.status_code == 201
+        assert not any("idempotency_key" in sql.partition("WHERE")[2] for sql in counter.sql)
+
+        # A cold filter (restart, another replica) falls back on the unique constraints
+        monkeypatch.setattr(idempotency_cache_module, "_idempotency_cache", None)
+        replayed = await client.post(f"{url}/holds", json=hold_payload)
+        assert replayed.status_code == 201
+        assert replayed.json()["id"] == created.json()["id"]
+        batch = await client.post(
+            "/api/v1/wallets/batch",
+            json={
+                "items": [
+                    {"wallet_id": wallet["id"], "type": "credit", "amount": "1.00", "idempotency_key": "cache-seed"},
+                    {"wallet_id": wallet["id"], "type": "credit", "amount": "1.00", "idempotency_key": "cache-new"},
+                ]
+            },
+        )
+        assert [item["status"] for item in batch.json()["results"]] == ["replayed", "applied"]
+        balance = await client.get(f"{url}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("31.00")
+
+
+@pytest.mark.asyncio
+async def test_transfer_locks_wallets_in_one_statement(wallet_test_app):
+    async with _asgi_client(wallet_test_app) as client:
+        source = await _create_wallet(client)
+        target = await _create_wallet(client, allow_additional=True)
+        await _seed_balance(client, source["id"], "50.00", "lock-seed")
+
+        payload = {
+            "target_wallet_id": target["id"],
+            "amount": "10.00",
+            "currency": "USD",
+            "idempotency_key": "lock-transfer-1",
+        }
+        with _SQLCounter(wallet_test_app) as counter:
+            response = await client.post(f"/api/v1/wallets/{source['id']}/transfers", json=payload)
+        assert response.status_code == 201
+        assert Decimal(str(response.json()["source_wallet"]["balance"])) == Decimal("40.00")
+        assert Decimal(str(response.json()["target_wallet"]["balance"])) == Decimal("10.00")
+
+        wallet_selects = [sql for sql in counter.sql if sql.lstrip().upper().startswith("SELECT") and "FROM wallets" in sql]
+        ledger_selects = [sql for sql in counter.sql if sql.lstrip().upper().startswith("SELECT") and "FROM ledger_entries" in sql]
+        assert len(wallet_selects) == 1
+        assert ledger_selects == []
+
+
+@pytest.mark.asyncio
+async def test_batch_money_changes_report_per_item_results(wallet_test_app, monkeypatch):
+    monkeypatch.setenv("WALLET_BATCH_CHUNK_SIZE", "2")
+    wallet_settings_module.wallet_settings.cache_clear()
+    async with _asgi_client(wallet_test_app) as client:
+        first = await _create_wallet(client)
+        second = await _create_wallet(client, currency="EUR")
+        await _seed_balance(client, first["id"], "10.00", "batch-seed")
+
+        items = [
+            {"wallet_id": first["id"], "type": "credit", "amount": "5.00", "idempotency_key": "batch-1"},
+            {"wallet_id": second["id"], "type": "credit", "amount": "20.00", "idempotency_key": "batch-2"},
+            {"wallet_id": first["id"], "type": "debit", "amount": "50.00", "idempotency_key": "batch-3"},
+            {"wallet_id": first["id"], "type": "credit", "amount": "5.00", "idempotency_key": "batch-seed"},
+            {"wallet_id": 9999, "type": "credit", "amount": "1.00", "idempotency_key": "batch-4"},
+            {"wallet_id": second["id"], "type": "debit", "amount": "7.50", "idempotency_key": "batch-5"},
+            {"wallet_id": second["id"], "type": "debit", "amount": "7.50", "idempotency_key": "batch-5"},
+        ]
+        response = await client.post("/api/v1/wallets/batch", json={"items": items})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["applied"], body["replayed"], body["failed"]) == (3, 2, 2)
+        statuses = [(r["index"], r["status"]) for r in body["results"]]
+        assert statuses == [
+            (0, "applied"),
+            (1, "applied"),
+            (2, "failed"),
+            (3, "replayed"),
+            (4, "failed"),
+            (5, "applied"),
+            (6, "replayed"),
+        ]
+        assert body["results"][2]["error"] == "Insufficient funds"
+        assert body["results"][6]["entry_id"] == body["results"][5]["entry_id"]
+        assert Decimal(str(body["results"][5]["balance"])) == Decimal("12.50")
+
+        # Replaying the whole batch changes nothing
+        replay = await client.post("/api/v1/wallets/batch", json={"items": items})
+        assert replay.json()["applied"] == 0
+
+        balance = await client.get(f"/api/v1/wallets/{first['id']}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("15.00")
+        balance = await client.get(f"/api/v1/wallets/{second['id']}/balance")
+        assert Decimal(str(balance.json()["balance"])) == Decimal("12.50")
+
+
+@pytest.mark.asyncio
+async def test_bulk_transfers_net_balances_and_stay_idempotent(wallet_test_app):
+    async with _asgi_client(wallet_test_app) as client:
+        a = await _create_wallet(client)
+        b = await _create_wallet(client, allow_additional=True)
+        c = await _create_wallet(client, allow_additional=True)
+        eur = await _create_wallet(client, currency="EUR")
+        await _seed_balance(client, a["id"], "100.00", "bulk-seed")
+
+        def transfer(source, target, amount, key, currency="USD"):
+            return {
+                "source_wallet_id": source["id"],
+                "target_wallet_id": target["id"],
+                "amount": amount,
+                "currency": currency,
+                "idempotency_key": key,
+            }
+
+        transfers = [
+            transfer(a, b, "60.00", "bulk-1"),
+            transfer(b, c, "25.00", "bulk-2"),
+            transfer(a, c, "50.00", "bulk-3"),  # only 40.00 left
+            transfer(a, eur, "1.00", "bulk-4"),
+            transfer(a, b, "60.00", "bulk-1"),
+        ]
+        response = await client.post("/api/v1/wallets/transfers/batch", json={"transfers": transfers})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["completed"], body["failed"], body["replayed"]) == (2, 2, 1)
+        results = body["results"]
+        assert results[2]["transfer"]["status"] == "failed"
+        assert results[2]["error"] == "Insufficient funds"
+        assert results[3]["transfer"] is None
+        assert results[3]["error"] == "Currency mismatch"
+        assert results[4]["transfer"]["id"] == results[0]["transfer"]["id"]
+
+        balances = {}
+        for wallet in (a, b, c):
+            resp = await client.get(f"/api/v1/wallets/{wallet['id']}/balance")
+            balances[wallet["id"]] = Decimal(str(resp.json()["balance"]))
+        assert balances == {a["id"]: Decimal("40.00"), b["id"]: Decimal("35.00"), c["id"]: Decimal("25.00")}
+
+        assert await _count_outbox_events(wallet_test_app, "wallet.transfer.created") == 3
+        assert await _count_outbox_events(wallet_test_app, "wallet.transfer.completed") == 2
+        assert await _count_outbox_events(wallet_test_app, "wallet.transfer.failed") == 1
+        row = await _get_transfer_by_key(wallet_test_app, "bulk-2")
+        assert row.ledger_debit_entry_id is not None and row.ledger_credit_entry_id is not None
+
+        replay = await client.post("/api/v1/wallets/transfers/batch", json={"transfers": transfers[:3]})
+        replay_body = replay.json()
+        assert replay_body["replayed"] == 3
+        assert replay_body["results"][2]["error"] == "Insufficient funds"
+        resp = await client.get(f"/api/v1/wallets/{a['id']}/balance")
+        assert Decimal(str(resp.json()["balance"])) == Decimal("40.00")
+
+
+@pytest.mark.asyncio
+async def test_debit_risk_runs_before_lock_and_revalidates_on_change(wallet_test_app, monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from services.wallet_service.app.routes import wallet as wallet_routes
+
+    monkeypatch.setenv("WALLET_RISK_CHECKS_ENABLED", "true")
+    wallet_settings_module.wallet_settings.cache_clear()
+    calls: list[Decimal] = []
+    counter: _SQLCounter | None = None
+
+    async def fake_risk(wallet, amount, current_user_id, risk_metadata):
+        session_factory = wallet_test_app.state._session_factory
+        calls.append(amount)
+        if counter is not None:
+            counter.sql.append("risk")
+        if amount == Decimal("2.00") and len(calls) == 1:
+            # Wallet state changes between the pre-lock check and the lock
+            async with session_factory() as session:
+                row = await session.get(Wallet, wallet.id)
+                row.status = "restricted"
+                await session.commit()
+        if amount == Decimal("99.00"):
+            raise HTTPException(status_code=403, detail="Wallet transaction declined by risk engine")
+
+    def lock_count() -> float:
+        return REGISTRY.get_sample_value("wallet_lock_hold_seconds_count", {"operation": "debit"}) or 0.0
+
+    def revalidations() -> float:
+        return REGISTRY.get_sample_value("wallet_risk_revalidations_total") or 0.0
+
+    monkeypatch.setattr(wallet_routes, "_enforce_wallet_risk", fake_risk)
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _seed_balance(client, wallet_id, "200.00", "risk-seed")
+
+        locks_before = lock_count()
+        declined = await client.post(f"/api/v1/wallets/{wallet_id}/debit", json={"amount": "99.00"})
+        assert declined.status_code == 403
+        assert lock_count() == locks_before  # rejected before any row lock was taken
+
+        ok = await client.post(f"/api/v1/wallets/{wallet_id}/debit", json={"amount": "1.00", "idempotency_key": "risk-1"})
+        assert ok.status_code == 200
+        assert lock_count() == locks_before + 1
+        replay = await client.post(f"/api/v1/wallets/{wallet_id}/debit", json={"amount": "1.00", "idempotency_key": "risk-1"})
+        assert replay.status_code == 200
+        assert len(calls) == 2  # declined + approved; the replay skipped risk
+
+        calls.clear()
+        before = revalidations()
+        with _SQLCounter(wallet_test_app) as counter:
+            changed = await client.post(f"/api/v1/wallets/{wallet_id}/debit", json={"amount": "2.00"})
+        assert changed.status_code == 200
+        assert len(calls) == 2
+        assert revalidations() == before + 1
+        # The stale decision is re-made before the UPDATE that takes the row lock succeeds
+        updates = [pos for pos, sql in enumerate(counter.sql) if sql.startswith("UPDATE wallets SET balance")]
+        assert len(updates) == 2
+        assert updates[0] < max(pos for pos, sql in enumerate(counter.sql) if sql == "risk") < updates[1]
+
+
+@pytest.mark.asyncio
+async def test_debit_replays_unknown_to_a_cold_filter_are_not_rejected(wallet_test_app, monkeypatch):
+    from services.wallet_service.app.routes import wallet as wallet_routes
+
+    monkeypatch.setenv("WALLET_RISK_CHECKS_ENABLED", "true")
+    monkeypatch.setenv("WALLET_IDEMPOTENCY_RESPONSE_CACHE_MAX_ENTRIES", "0")
+    wallet_settings_module.wallet_settings.cache_clear()
+    declining = False
+
+    async def fake_risk(wallet, amount, current_user_id, risk_metadata):
+        if declining:
+            raise HTTPException(status_code=403, detail="Wallet transaction declined by risk engine")
+
+    monkeypatch.setattr(wallet_routes, "_enforce_wallet_risk", fake_risk)
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "10.00", "cold-seed")
+        first = await client.post(f"{url}/debit", json={"amount": "4.00", "idempotency_key": "cold-debit"})
+        assert first.status_code == 200
+        drain = await client.post(f"{url}/debit", json={"amount": "6.00", "idempotency_key": "cold-drain"})
+        assert drain.status_code == 200
+
+        # Applied before a restart (or on another replica): the filter has not seen these keys
+        monkeypatch.setattr(idempotency_cache_module, "_idempotency_cache", None)
+        declining = True
+        replay = await client.post(f"{url}/debit", json={"amount": "4.00", "idempotency_key": "cold-debit"})
+        assert replay.status_code == 200
+        assert Decimal(str(replay.json()["balance"])) == Decimal("0.00")
+
+        monkeypatch.setattr(idempotency_cache_module, "_idempotency_cache", None)
+        declining = False
+        batch = await client.post(
+            "/api/v1/wallets/batch",
+            json={
+                "items": [
+                    {"wallet_id": wallet["id"], "type": "debit", "amount": "6.00", "idempotency_key": "cold-drain"},
+                    {"wallet_id": wallet["id"], "type": "debit", "amount": "1.00", "idempotency_key": "cold-new"},
+                ]
+            },
+        )
+        assert [item["status"] for item in batch.json()["results"]] == ["replayed", "failed"]
+        assert batch.json()["results"][0]["entry_id"] is not None
+
+
+@pytest.mark.asyncio
+async def test_sharded_hot_wallet_takes_credits_on_shards(wallet_test_app, monkeypatch, tmp_path):
+    monkeypatch.setattr(sharding_module, "_shard_counts", {})
+    session_factory = wallet_test_app.state._session_factory
+
+    async def stored_balances(wallet_id: int) -> tuple[Decimal, list[Decimal]]:
+        async with session_factory() as session:
+            wallet = await session.get(Wallet, wallet_id)
+            shards = await session.scalars(
+                select(WalletBalanceShard.balance)
+                .where(WalletBalanceShard.wallet_id == wallet_id)
+                .order_by(WalletBalanceShard.shard)
+            )
+            return wallet.balance, list(shards)
+
+    async with _asgi_client(wallet_test_app) as client:
+        hot = await _create_wallet(client)
+        payer = await _create_wallet(client, allow_additional=True)
+        hot_url = f"/api/v1/wallets/{hot['id']}"
+        await _seed_balance(client, hot["id"], "10.00", "hot-seed")
+        await _seed_balance(client, payer["id"], "50.00", "payer-seed")
+
+        too_many = await client.put(f"{hot_url}/shards", json={"shards": 1_000})
+        assert too_many.status_code == 400
+        enabled = await client.put(f"{hot_url}/shards", json={"shards": 4})
+        assert enabled.status_code == 200
+        assert enabled.json()["balance_shards"] == 4
+        assert Decimal(str(enabled.json()["balance"])) == Decimal("10.00")
+
+        for i in range(8):
+            credit = await client.post(f"{hot_url}/credit", json={"amount": "1.00", "idempotency_key": f"hot-{i}"})
+            assert credit.status_code == 200
+        # Replays answer with the original response and credit nothing
+        replay = await client.post(f"{hot_url}/credit", json={"amount": "1.00", "idempotency_key": "hot-0"})
+        assert Decimal(str(replay.json()["balance"])) == Decimal("11.00")
+
+        transfer = await client.post(
+            f"/api/v1/wallets/{payer['id']}/transfers",
+            json={"target_wallet_id": hot["id"], "amount": "2.00", "currency": "USD", "idempotency_key": "hot-fee-1"},
+        )
+        assert transfer.status_code == 201
+        assert Decimal(str(transfer.json()["target_wallet"]["balance"])) == Decimal("20.00")
+
+        # Credits never touched the wallet row
+        row_balance, shard_balances = await stored_balances(hot["id"])
+        assert row_balance == Decimal("10.00")
+        assert len(shard_balances) == 4
+        assert sum(shard_balances) == Decimal("10.00")
+
+        # A debit the wallet row cannot cover folds the shards in first
+        debit = await client.post(f"{hot_url}/debit", json={"amount": "15.00", "idempotency_key": "hot-debit"})
+        assert debit.status_code == 200
+        assert Decimal(str(debit.json()["balance"])) == Decimal("5.00")
+        assert await stored_balances(hot["id"]) == (Decimal("5.00"), [Decimal("0.00")] * 4)
+
+        await _seed_balance(client, hot["id"], "3.00", "hot-after-debit")
+        balance = (await client.get(f"{hot_url}/balance")).json()
+        assert Decimal(str(balance["balance"])) == Decimal("8.00")
+        reconciliation = (await client.get(f"{hot_url}/reconciliation")).json()
+        assert reconciliation["status"] == "balanced"
+        assert Decimal(str(reconciliation["stored_balance"])) == Decimal("8.00")
+        _, drifted = await ReconciliationScanner(session_factory, tmp_path / "drift.ndjson").scan_shard(0, 100)
+        assert drifted == []
+
+        assert await sharding_module.ShardRebalancer(session_factory).run() == 1
+        assert await stored_balances(hot["id"]) == (Decimal("8.00"), [Decimal("0.00")] * 4)
+
+        await _seed_balance(client, hot["id"], "1.00", "hot-before-disable")
+        disabled = await client.put(f"{hot_url}/shards", json={"shards": 0})
+        assert disabled.json()["balance_shards"] == 0
+        assert await stored_balances(hot["id"]) == (Decimal("9.00"), [])
+    assert sharding_module.known_shards(hot["id"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_waits_out_sharded_debits_and_credits(wallet_test_app, monkeypatch):
+    monkeypatch.setattr(sharding_module, "_shard_counts", {})
+    session_factory = wallet_test_app.state._session_factory
+    engine = session_factory.kw["bind"].sync_engine
+    snapshotter = BalanceSnapshotter(session_factory)
+    locks: list[tuple[str, bool]] = []
+    ledger_reads: list[int] = []
+
+    def on_execute(_conn, clauseelement, *_args) -> None:
+        if not getattr(clauseelement, "is_select", False):
+            return
+        tables = [table.name for table in clauseelement.columns_clause_froms]
+        for_update = getattr(clauseelement, "_for_update_arg", None)
+        if for_update is not None:
+            locks.extend((name, bool(for_update.read)) for name in tables)
+        elif "ledger_entries" in tables:
+            ledger_reads.append(len(locks))
+
+    async def refresh() -> list[tuple[str, bool]]:
+        locks.clear()
+        ledger_reads.clear()
+        event.listen(engine, "before_execute", on_execute)
+        try:
+            await snapshotter.run()
+        finally:
+            event.remove(engine, "before_execute", on_execute)
+        return locks[: ledger_reads[0]]
+
+    async def snapshot_matches_ledger(wallet_id: int) -> bool:
+        async with session_factory() as session:
+            snapshot = await session.get(BalanceSnapshot, wallet_id)
+            ledger_balance, _, _ = await ledger_totals(session, wallet_id, full=True)
+            return snapshot.ledger_balance == ledger_balance
+
+    async with _asgi_client(wallet_test_app) as client:
+        hot = await _create_wallet(client)
+        await _create_wallet(client, currency="EUR")
+        hot_url = f"/api/v1/wallets/{hot['id']}"
+        await _seed_balance(client, hot["id"], "10.00", "interleave-seed")
+        assert (await client.put(f"{hot_url}/shards", json={"shards": 2})).status_code == 200
+
+        # Credit on a shard, debit on the row, then a refresh between the two kinds of writers
+        await _seed_balance(client, hot["id"], "4.00", "interleave-credit-1")
+        debit = await client.post(f"{hot_url}/debit", json={"amount": "3.00", "idempotency_key": "interleave-debit-1"})
+        assert debit.status_code == 200
+        held = await refresh()
+        # Only the sharded wallet row is share-locked, before its shards and before the ledger read
+        assert held[-2:] == [("wallets", True), ("wallet_balance_shards", False)]
+        assert await snapshot_matches_ledger(hot["id"])
+
+        debit = await client.post(f"{hot_url}/debit", json={"amount": "9.00", "idempotency_key": "interleave-debit-2"})
+        assert debit.status_code == 200
+        await _seed_balance(client, hot["id"], "1.50", "interleave-credit-2")
+        assert ("wallets", True) in await refresh()
+        assert await snapshot_matches_ledger(hot["id"])
+        reconciliation = (await client.get(f"{hot_url}/reconciliation")).json()
+        assert reconciliation["status"] == "balanced"
+        assert Decimal(str(reconciliation["ledger_balance"])) == Decimal("3.50")
+
+
+@pytest.mark.asyncio
+async def test_full_reconciliation_counts_detached_ledger_history(wallet_test_app, tmp_path):
+    session_factory = wallet_test_app.state._session_factory
+    archived_before = datetime(2020, 2, 1, tzinfo=UTC)
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        wallet_id = wallet["id"]
+        await _seed_balance(client, wallet_id, "10.00", "recent-credit")
+
+        # Old entries folded into the archive; half of them are detached, the
+        # rest are still attached as after an interrupted maintenance pass
+        async with session_factory() as session:
+            old = [
+                LedgerEntry(
+                    wallet_id=wallet_id,
+                    type="credit",
+                    amount=Decimal("2.00"),
+                    idempotency_key=f"old-{i}",
+                    created_at=datetime(2020, 1, 1 + i, tzinfo=UTC),
+                )
+                for i in range(4)
+            ]
+            session.add_all(old)
+            await session.flush()
+            session.add(
+                LedgerArchive(
+                    wallet_id=wallet_id,
+                    archived_before=archived_before,
+                    last_entry_id=max(entry.id for entry in old),
+                    ledger_balance=Decimal("8.00"),
+                    entry_count=4,
+                )
+            )
+            for entry in old[:2]:
+                await session.delete(entry)
+            (await session.get(Wallet, wallet_id)).balance += Decimal("8.00")
+            await session.commit()
+
+        full = (await client.get(f"/api/v1/wallets/{wallet_id}/reconciliation", params={"full": "true"})).json()
+        assert full["status"] == "balanced"
+        assert (Decimal(str(full["ledger_balance"])), full["entry_count"]) == (Decimal("18.00"), 5)
+
+        scanner = ReconciliationScanner(session_factory, tmp_path / "drift.ndjson", full=True)
+        assert await scanner.scan_shard(wallet_id, wallet_id) == (1, [])
+
+        assert await BalanceSnapshotter(session_factory).run(full=True) == 1
+        async with session_factory() as session:
+            snapshot = await session.get(BalanceSnapshot, wallet_id)
+            assert (snapshot.ledger_balance, snapshot.entry_count) == (Decimal("18.00"), 5)
+
+
+@pytest.mark.asyncio
+async def test_transfer_replays_come_from_the_archive_after_detach(wallet_test_app):
+    session_factory = wallet_test_app.state._session_factory
+    async with _asgi_client(wallet_test_app) as client:
+        source = await _create_wallet(client)
+        target = await _create_wallet(client, allow_additional=True)
+        await _seed_balance(client, source["id"], "20.00", "archive-seed")
+        payload = {"target_wallet_id": target["id"], "amount": "5.00", "currency": "USD"}
+        first = await client.post(
+            f"/api/v1/wallets/{source['id']}/transfers", json={**payload, "idempotency_key": "archived-1"}
+        )
+        assert first.status_code == 201
+        later = await client.post(
+            f"/api/v1/wallets/{source['id']}/transfers", json={**payload, "idempotency_key": "attached-1"}
+        )
+        assert later.status_code == 201
+
+        # Detach: copy the row to the archive and drop it; a trigger stands in
+        # for the PostgreSQL key registry that still holds the key
+        async with session_factory() as session:
+            transfer = await session.scalar(select(Transfer).where(Transfer.idempotency_key == "archived-1"))
+            session.add(
+                ArchivedTransfer(
+                    **{column.name: getattr(transfer, column.name) for column in ArchivedTransfer.__table__.columns}
+                )
+            )
+            await session.delete(transfer)
+            await session.execute(
+                text(
+                    "CREATE TRIGGER transfer_registry BEFORE INSERT ON wallet_transfers "
+                    "WHEN EXISTS (SELECT 1 FROM wallet_transfers_archive a WHERE a.idempotency_key = NEW.idempotency_key) "
+                    "BEGIN SELECT RAISE(ABORT, 'UNIQUE constraint failed: wallet_transfer_idempotency_keys'); END"
+                )
+            )
+            await session.commit()
+
+        replay = await client.post(
+            f"/api/v1/wallets/{source['id']}/transfers", json={**payload, "idempotency_key": "archived-1"}
+        )
+        assert replay.status_code == 201
+        assert replay.json()["transfer"]["id"] == first.json()["transfer"]["id"]
+        assert Decimal(str(replay.json()["source_wallet"]["balance"])) == Decimal("10.00")
+
+        bulk = await client.post(
+            "/api/v1/wallets/transfers/batch",
+            json={
+                "transfers": [
+                    {**payload, "source_wallet_id": source["id"], "idempotency_key": "archived-1"},
+                    {**payload, "source_wallet_id": source["id"], "idempotency_key": "archived-2"},
+                ]
+            },
+        )
+        assert bulk.status_code == 200
+        body = bulk.json()
+        assert (body["replayed"], body["completed"]) == (1, 1)
+        assert body["results"][0]["transfer"]["id"] == first.json()["transfer"]["id"]
+        balance = (await client.get(f"/api/v1/wallets/{source['id']}/balance")).json()
+        assert Decimal(str(balance["balance"])) == Decimal("5.00")
+
+
+@pytest.mark.asyncio
+async def test_ledger_keys_detached_with_their_partition_conflict_instead_of_failing(wallet_test_app):
+    session_factory = wallet_test_app.state._session_factory
+    async with _asgi_client(wallet_test_app) as client:
+        wallet = await _create_wallet(client)
+        url = f"/api/v1/wallets/{wallet['id']}"
+        await _seed_balance(client, wallet["id"], "20.00", "detached-seed")
+
+        # The PostgreSQL key registry keeps keys whose entries were detached;
+        # a stand-in table and trigger reproduce that here
+        async with session_factory() as session:
+            await session.execute(text("CREATE TABLE detached_ledger_keys (wallet_id INTEGER, idempotency_key TEXT)"))
+            await session.execute(
+                text(
+                    "INSERT INTO detached_ledger_keys VALUES "
+                    "(:wallet_id, 'detached-credit'), (:wallet_id, 'detached-hold'), (:wallet_id, 'detached-batch')"
+                ),
+                {"wallet_id": wallet["id"]},
+            )
+            await session.execute(
+                text(
+                    "CREATE TRIGGER ledger_registry BEFORE INSERT ON ledger_entries "
+                    "WHEN EXISTS (SELECT 1 FROM detached_ledger_keys k "
+                    "WHERE k.wallet_id = NEW.wallet_id AND k.idempotency_key = NEW.idempotency_key) "
+                    "BEGIN SELECT RAISE(ABORT, 'UNIQUE constraint failed: ledger_idempotency_keys'); END"
+                )
+            )
+            await session.commit()
+
+        credit = await client.post(f"{url}/credit", json={"amount": "1.00", "idempotency_key": "detached-credit"})
+        assert credit.status_code == 409
+        assert credit.json()["detail"] == "Idempotency key already used"
+
+        hold = await client.post(f"{url}/holds", json={"amount": "1.00", "idempotency_key": "detached-hold"})
+        assert hold.status_code == 409
+
+        batch = await client.post(
+            "/api/v1/wallets/batch",
+            json={
+                "items": [
+                    {"wallet_id": wallet["id"], "type": "credit", "amount": "1.00", "idempotency_key": "detached-batch"},
+                    {"wallet_id": wallet["id"], "type": "debit", "amount": "2.00", "idempotency_key": "fresh-batch"},
+                ]
+            },
+        )
+        assert batch.status_code == 200
+        results = batch.json()["results"]
+        assert [item["status"] for item in results] == ["failed", "applied"]
+        assert results[0]["error"] == "Idempotency key already used"
+        balance = (await client.get(f"{url}/balance")).json()
+        assert Decimal(str(balance["balance"])) == Decimal("18.00")